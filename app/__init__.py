@@ -2,9 +2,11 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_socketio import SocketIO
+from sqlalchemy import inspect
 from config import Config
+from app.storage.engine import RoutingSession, engine_options
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 socketio = SocketIO()
 
@@ -13,25 +15,59 @@ def create_app(config_class=Config):
     app.config.from_object(config_class)
     
     # Initialize extensions
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
     db.init_app(app)
+    
+    from app.storage.engine import engine_profile
+    engine_profile.init_app(app)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please log in to access this page.'
     
-    socketio.init_app(app, cors_allowed_origins="*", async_mode='eventlet')
-    
-    # Register blueprints
+    # Import blueprints before socketio.init_app so their @socketio.on
+    # handlers are queued and attached to every server init_app creates
     from app.auth import auth_bp
     from app.child_dashboard import child_bp
     from app.parent_dashboard import parent_bp
     
+    from app.realtime.broker import socketio_options
+    socketio.init_app(app, cors_allowed_origins="*", async_mode='eventlet', **socketio_options(app))
+    
+    from app.realtime.routing import worker_router
+    worker_router.init_app(app)
+    
+    from app.storage.write_behind import brain_state_writer
+    brain_state_writer.init_app(app)
+    
+    from app.realtime.emitter import brain_state_emitter
+    brain_state_emitter.init_app(app)
+    
+    from app.storage.result_cache import analytics_cache
+    analytics_cache.init_app(app)
+    
+    from app.storage.retention import brain_state_compactor
+    brain_state_compactor.init_app(app)
+    
+    # Register blueprints
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(child_bp, url_prefix='/child')
     app.register_blueprint(parent_bp, url_prefix='/parent')
     
-    # Create database tables
+    # Create database tables. An existing database is only changed by
+    # `flask schema upgrade` (or SCHEMA_AUTO_UPGRADE), never just by importing the app
     with app.app_context():
-        db.create_all()
+        if app.config.get('SCHEMA_AUTO_UPGRADE', False):
+            from app.storage.migrations import upgrade
+            db.create_all()
+            upgrade(db.engine)
+        elif not inspect(db.engine).get_table_names():
+            db.create_all()
+    
+    from app.storage.commands import schema_cli, rollups_cli, retention_cli, quiz_stats_cli
+    app.cli.add_command(schema_cli)
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(retention_cli)
+    app.cli.add_command(quiz_stats_cli)
     
     return app
 
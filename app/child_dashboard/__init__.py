@@ -2,4 +2,4 @@ from flask import Blueprint
 
 child_bp = Blueprint('child', __name__)
 
-from app.child_dashboard import routes
+from app.child_dashboard import routes, commands
@@ -0,0 +1,86 @@
+import json
+import sys
+from datetime import datetime, timezone
+import click
+from app.child_dashboard import child_bp
+from config import Config
+
+
+class ReplayConfig(Config):
+    """Scratch in-memory database so replay never touches real records"""
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
+@child_bp.cli.command('replay')
+@click.option('--children', default=4, show_default=True, help='Simulated headsets.')
+@click.option('--seconds', default=10.0, show_default=True, help='Seconds of signal per child.')
+@click.option('--chunk', default=64, show_default=True, help='New samples per upload.')
+@click.option('--mode', type=click.Choice(['samples', 'raw_signal']), default='samples', show_default=True)
+@click.option('--transport', type=click.Choice(['http', 'socket']), default='http', show_default=True,
+              help='Test-client transport (ignored with --url).')
+@click.option('--artifacts', default=0.1, show_default=True, help='Blink/muscle artifacts per second.')
+@click.option('--seed', default=0, show_default=True)
+@click.option('--url', help='Replay against a running server instead of the test client.')
+@click.option('--email', help='Parent login for --url.')
+@click.option('--password', help='Parent password for --url.')
+@click.option('--child-id', 'child_ids', type=int, multiple=True, help='Existing child ids for --url.')
+@click.option('--realtime', is_flag=True, help='Pace --url uploads at the sampling rate.')
+def replay_command(children, seconds, chunk, mode, transport, artifacts, seed,
+                   url, email, password, child_ids, realtime):
+    """Load-test the EEG ingest path with synthetic headsets."""
+    from app.eeg_processor.replay import replay_server, replay_test_client
+
+    if url:
+        if not (email and password and child_ids):
+            raise click.UsageError('--url needs --email, --password and at least one --child-id')
+        report = replay_server(url, email, password, list(child_ids), seconds, chunk, mode,
+                               realtime, artifact_rate=artifacts, seed=seed)
+    else:
+        from app import create_app
+        report = replay_test_client(create_app(ReplayConfig), children, seconds, chunk, mode,
+                                    transport, artifact_rate=artifacts, seed=seed)
+
+    click.echo(json.dumps(report, indent=2))
+
+
+def _epoch(value):
+    # click.DateTime gives naive datetimes, read as UTC like the rest of the CLI
+    return value.replace(tzinfo=timezone.utc).timestamp() if value is not None else None
+
+
+@child_bp.cli.command('reprocess')
+@click.argument('child_id', type=int)
+@click.option('--from', 'start', type=click.DateTime(), help='Inclusive UTC start time.')
+@click.option('--to', 'end', type=click.DateTime(), help='Exclusive UTC end time.')
+@click.option('--window', type=int, help='Samples per window (default: EEG_STREAM_WINDOW).')
+@click.option('--hop', type=int, help='Samples between window starts (default: the window).')
+@click.option('--batch-size', type=int, help='Windows per classifier call (default: EEG_REPROCESS_BATCH).')
+@click.option('--archive-dir', type=click.Path(file_okay=False), help='Archive root (default: EEG_ARCHIVE_DIR).')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), help='File to write (default: stdout).')
+def reprocess_command(child_id, start, end, window, hop, batch_size, archive_dir, output):
+    """Re-classify a child's archived raw EEG, one NDJSON line per window."""
+    from app.eeg_processor.archive import EEGArchive, eeg_archive
+    from app.eeg_processor.classifier import EEGClassifier
+
+    archive = EEGArchive(archive_dir) if archive_dir else eeg_archive
+    batches = archive.reprocess(child_id, EEGClassifier(), _epoch(start), _epoch(end),
+                                window_size=window, hop_size=hop, batch_size=batch_size)
+
+    windows = 0
+    stream = open(output, 'w') if output else sys.stdout
+    try:
+        for times, result in batches:
+            names = result['state_names']
+            for i, window_time in enumerate(times.tolist()):
+                stream.write(json.dumps({
+                    'timestamp': datetime.utcfromtimestamp(window_time).isoformat(),
+                    'brain_state': str(result['brain_state'][i]),
+                    'dominant_frequency': float(result['dominant_frequency'][i]),
+                    'band_powers': dict(zip(names, result['band_powers'][i].tolist()))
+                }) + '\n')
+            windows += len(times)
+    finally:
+        if output:
+            stream.close()
+    click.echo(f'Reprocessed {windows} windows', err=True)
@@ -2,14 +2,28 @@ from flask import render_template, jsonify, request
 from flask_login import login_required, current_user
 from app import db, socketio
 from app.child_dashboard import child_bp
-from app.models import Child, BrainState, Content, Routine, MoodLog, ActivityLog
+from app.models import Child, Content, ContentState, Routine, MoodLog, ActivityLog
 from app.eeg_processor.classifier import EEGClassifier
+from app.eeg_processor.streaming import StreamRegistry
+from app.eeg_processor.executor import DSPExecutor, DSPQueueFull
+from app.eeg_processor.filter_bank import filter_bank
+from app.eeg_processor.ingest import BINARY_MIMETYPES, decode_eeg_payload, decode_float32
+from app.eeg_processor.archive import eeg_archive
+from app.storage.write_behind import brain_state_writer
+from app.storage import rollups, quiz_stats
+from app.storage.result_cache import analytics_cache
+from app.storage.engine import engine_profile
+from app.realtime.emitter import brain_state_emitter
+from app.realtime.routing import worker_router
 from datetime import datetime
+import numpy as np
 from flask_socketio import emit
 from config import Config
-from app.models import Quiz, QuizQuestion, QuizAttempt
+from app.models import Quiz, QuizQuestion, QuizAttempt, QuizState
 
 eeg_classifier = EEGClassifier()
+eeg_streams = StreamRegistry(eeg_classifier)
+eeg_dsp = DSPExecutor(eeg_classifier)
 
 @child_bp.route('/dashboard/<int:child_id>')
 @login_required
@@ -20,15 +34,12 @@ def dashboard(child_id):
     if child.parent_id != current_user.id:
         return "Unauthorized", 403
     
-    # Get current brain state
-    latest_state = BrainState.query.filter_by(child_id=child_id)\
-        .order_by(BrainState.timestamp.desc()).first()
+    # Get current brain state, kept on the child by every brain state write
+    current_state = child.current_state or 'alpha'
     
-    current_state = latest_state.state if latest_state else 'alpha'
-    
-    # Get suitable content for current state
-    content = Content.query.filter(
-        Content.suitable_states.contains(current_state)
+    # Get suitable content for current state (links are stored lowercase)
+    content = Content.query.join(Content.state_links).filter(
+        ContentState.state == current_state.lower()
     ).limit(6).all()
     
     # Get today's routines
@@ -41,6 +52,91 @@ def dashboard(child_id):
                          routines=routines,
                          brain_states=Config.BRAIN_STATES)
 
+def read_eeg_request():
+    """
+    Normalize JSON and binary EEG uploads to the JSON field layout
+    
+    Binary bodies are decoded zero-copy with np.frombuffer, the child id,
+    sampling rate and mode come from the X-Child-Id, X-Sampling-Rate and
+    X-EEG-Mode ('window' or 'stream') headers.
+    """
+    if request.mimetype not in BINARY_MIMETYPES:
+        return request.json
+    
+    values = decode_eeg_payload(request.get_data(cache=False), request.mimetype)
+    field = 'samples' if request.headers.get('X-EEG-Mode') == 'stream' else 'raw_signal'
+    return {
+        'child_id': request.headers.get('X-Child-Id', type=int),
+        'sampling_rate': request.headers.get('X-Sampling-Rate', type=float),
+        field: values
+    }
+
+def classify_eeg_data(child_id, data):
+    """
+    Run one EEG upload through the DSP executor
+    
+    Args:
+        child_id (int): Child the data belongs to
+        data (dict): Upload in the JSON field layout of receive_eeg_data
+        
+    Returns:
+        dict or None: {'dominant_frequency', 'brain_state', ...}, or None
+        when streamed samples did not complete a new window yet
+        
+    Raises:
+        ValueError: Malformed input
+        DSPQueueFull: Too many frames already being processed
+    """
+    sampling_rate = data.get('sampling_rate')
+    
+    if Config.EEG_ARCHIVE_ENABLED:
+        raw = data.get('samples', data.get('raw_signal'))
+        if raw is not None and np.ndim(raw) == 1:
+            eeg_archive.append(child_id, raw, sampling_rate or eeg_classifier.sampling_rate)
+    
+    if 'samples' in data:
+        # Streaming input, classified from the child's sliding window
+        if np.ndim(data['samples']) != 1:
+            raise ValueError('Streaming input must be single-channel')
+        return eeg_dsp.run(eeg_streams.push, child_id, data['samples'], sampling_rate)
+    
+    if 'raw_signal' in data:
+        if np.ndim(data['raw_signal']) == 2:
+            # Multi-channel window
+            return eeg_dsp.classify('process_channels', data['raw_signal'], sampling_rate)
+        # Process raw signal
+        return eeg_dsp.classify('process_eeg_signal', data['raw_signal'], sampling_rate)
+    
+    # Direct frequency input
+    frequency = data.get('frequency')
+    if frequency is None:
+        raise ValueError('One of frequency, raw_signal or samples is required')
+    return {
+        'dominant_frequency': frequency,
+        'brain_state': eeg_classifier.classify_frequency(frequency)
+    }
+
+def record_brain_state(child_id, brain_state, frequency):
+    """
+    Save an EEG classification, update the child's current state and notify its room
+    
+    Returns:
+        bool: False when the write-behind queue was full and the reading was dropped
+    """
+    # Written now, or queued for the next bulk flush when write-behind is on
+    row = brain_state_writer.add(child_id, brain_state, frequency, 'eeg')
+    if row is None:
+        return False
+    
+    # Broadcast to the child's room if the state changed or a heartbeat is due
+    brain_state_emitter.publish(child_id, {
+        'child_id': child_id,
+        'brain_state': brain_state,
+        'frequency': frequency,
+        'timestamp': row['timestamp'].isoformat()
+    })
+    return True
+
 @child_bp.route('/api/eeg-input', methods=['POST'])
 @login_required
 def receive_eeg_data():
@@ -49,9 +145,17 @@ def receive_eeg_data():
     Expected JSON: {
         'child_id': int,
         'frequency': float OR 'raw_signal': [float, float, ...]
+            OR 'samples': [float, ...] (only the samples new since the last upload),
+        'sampling_rate': int (optional)
     }
+    Binary bodies are also accepted: application/octet-stream (little-endian
+    float32 samples) or application/x-npy (1-D, or channels x samples for
+    windows), with X-Child-Id, X-Sampling-Rate and X-EEG-Mode headers.
     """
-    data = request.json
+    try:
+        data = read_eeg_request()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     child_id = data.get('child_id')
     
     child = Child.query.get_or_404(child_id)
@@ -59,38 +163,29 @@ def receive_eeg_data():
     if child.parent_id != current_user.id:
         return jsonify({'error': 'Unauthorized'}), 403
     
-    # Process EEG data
-    if 'raw_signal' in data:
-        # Process raw signal
-        result = eeg_classifier.process_eeg_signal(data['raw_signal'])
-        frequency = result['dominant_frequency']
-        brain_state = result['brain_state']
-    else:
-        # Direct frequency input
-        frequency = data.get('frequency')
-        brain_state = eeg_classifier.classify_frequency(frequency)
-    
-    # Save to database
-    brain_state_record = BrainState(
-        child_id=child_id,
-        state=brain_state,
-        frequency=frequency,
-        source='eeg'
-    )
-    db.session.add(brain_state_record)
+    # Streams keep state in one worker, send the device to it
+    if 'samples' in data and not worker_router.owns(child.id):
+        return jsonify(dict(worker_router.route(child.id), error='Stream is owned by another worker')), 421
     
-    # Update child's current state
-    child.current_state = brain_state
-    db.session.commit()
+    # Process EEG data
+    try:
+        result = classify_eeg_data(child_id, data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except DSPQueueFull:
+        return jsonify({'error': 'EEG processing is busy, retry shortly'}), 503
+    
+    if result is None:
+        # Not enough new samples for the next classification yet
+        return jsonify({
+            'success': True,
+            'buffered': True
+        })
+    frequency = result['dominant_frequency']
+    brain_state = result['brain_state']
     
-    # Emit real-time update to connected clients
-    socketio.emit('brain_state_update', {
-        'child_id': child_id,
-        'brain_state': brain_state,
-        'frequency': frequency,
-        'timestamp': brain_state_record.timestamp.isoformat(),
-        'state_info': eeg_classifier.get_state_info(brain_state)
-    }, room=f'child_{child_id}')
+    if not record_brain_state(child_id, brain_state, frequency):
+        return jsonify({'error': 'Brain state storage is busy, retry shortly'}), 503
     
     return jsonify({
         'success': True,
@@ -98,6 +193,28 @@ def receive_eeg_data():
         'frequency': frequency
     })
 
+@child_bp.route('/api/eeg-stats')
+@login_required
+def eeg_stats():
+    """Filter cache and DSP pool counters for capacity planning"""
+    return jsonify({
+        'filter_bank': filter_bank.stats(),
+        'dsp_executor': eeg_dsp.stats(),
+        'emitter': brain_state_emitter.stats(),
+        'active_streams': len(eeg_streams),
+        'worker': worker_router.index,
+        'database': engine_profile.stats()
+    })
+
+@child_bp.route('/api/eeg-route/<int:child_id>')
+@login_required
+def eeg_route(child_id):
+    """Worker and port a device should stream a child's EEG to"""
+    child = Child.query.get_or_404(child_id)
+    if child.parent_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify(worker_router.route(child.id))
+
 @child_bp.route('/api/manual-input', methods=['POST'])
 @login_required
 def manual_state_input():
@@ -121,26 +238,20 @@ def manual_state_input():
     if state not in Config.BRAIN_STATES:
         return jsonify({'error': 'Invalid state'}), 400
     
-    # Save to database
-    brain_state_record = BrainState(
-        child_id=child_id,
-        state=state,
-        source='manual'
-    )
-    db.session.add(brain_state_record)
-    
-    # Update child's current state
-    child.current_state = state
-    db.session.commit()
+    # Save to database, flushing right away so the manual choice
+    # lands after any queued EEG frames
+    row = brain_state_writer.add(child_id, state, source='manual')
+    if row is None:
+        return jsonify({'error': 'Brain state storage is busy, retry shortly'}), 503
+    brain_state_writer.flush()
     
     # Emit real-time update
-    socketio.emit('brain_state_update', {
+    brain_state_emitter.publish(child_id, {
         'child_id': child_id,
         'brain_state': state,
         'source': 'manual',
-        'timestamp': brain_state_record.timestamp.isoformat(),
-        'state_info': eeg_classifier.get_state_info(state)
-    }, room=f'child_{child_id}')
+        'timestamp': row['timestamp'].isoformat()
+    })
     
     return jsonify({
         'success': True,
@@ -151,8 +262,8 @@ def manual_state_input():
 @login_required
 def get_content_for_state(brain_state):
     """Get content suitable for specific brain state"""
-    content = Content.query.filter(
-        Content.suitable_states.contains(brain_state)
+    content = Content.query.join(Content.state_links).filter(
+        ContentState.state == brain_state.lower()
     ).all()
     
     return jsonify([{
@@ -174,10 +285,15 @@ def log_mood():
         child_id=data['child_id'],
         mood=data['mood'],
         intensity=data.get('intensity', 3),
-        notes=data.get('notes', '')
+        notes=data.get('notes', ''),
+        timestamp=datetime.utcnow()
     )
     db.session.add(mood_log)
+    rollups.record(db.session.connection(), [rollups.rollup_row(
+        mood_log.child_id, mood_log.timestamp, rollups.MOOD, mood_log.mood, value=mood_log.intensity
+    )])
     db.session.commit()
+    analytics_cache.invalidate(mood_log.child_id, 'analytics', 'dashboard')
     
     return jsonify({'success': True, 'id': mood_log.id})
 
@@ -192,10 +308,16 @@ def log_activity():
         activity_type=data['activity_type'],
         duration_seconds=data.get('duration_seconds', 0),
         completion_rate=data.get('completion_rate', 100),
-        brain_state=data.get('brain_state')
+        brain_state=data.get('brain_state'),
+        timestamp=datetime.utcnow()
     )
     db.session.add(activity_log)
+    rollups.record(db.session.connection(), [rollups.rollup_row(
+        activity_log.child_id, activity_log.timestamp, rollups.ACTIVITY, activity_log.activity_type,
+        seconds=activity_log.duration_seconds, value=activity_log.completion_rate
+    )])
     db.session.commit()
+    analytics_cache.invalidate(activity_log.child_id, 'analytics', 'dashboard')
     
     return jsonify({'success': True, 'id': activity_log.id})
 
@@ -208,6 +330,75 @@ def handle_join_child_room(data):
     from flask_socketio import join_room
     join_room(room)
     emit('joined_room', {'child_id': child_id, 'room': room})
+    # Static state table once per connection, updates then carry only the state key
+    emit('brain_states_info', {'states': Config.BRAIN_STATES})
+    last_update = brain_state_emitter.last_update(child_id)
+    if last_update is not None:
+        emit('brain_state_update', last_update)
+
+# Children each socket may stream EEG for, checked once at subscribe time
+eeg_subscriptions = {}
+
+@socketio.on('eeg_subscribe')
+def handle_eeg_subscribe(data):
+    """
+    Authorize a device connection to stream EEG frames for a child
+    Expected: {'child_id': int}
+    """
+    if not current_user.is_authenticated:
+        return {'success': False, 'error': 'Login required'}
+    
+    child_id = data.get('child_id')
+    child = Child.query.get(child_id)
+    if child is None or child.parent_id != current_user.id:
+        return {'success': False, 'error': 'Unauthorized'}
+    if not worker_router.owns(child.id):
+        return dict(worker_router.route(child.id), success=False, error='Stream is owned by another worker')
+    
+    eeg_subscriptions.setdefault(request.sid, set()).add(child.id)
+    return {'success': True, 'child_id': child.id}
+
+@socketio.on('eeg_frame')
+def handle_eeg_frame(data):
+    """
+    Receive one EEG frame over a subscribed socket
+    Expected: same fields as /child/api/eeg-input JSON; 'samples' and
+    'raw_signal' may also be binary little-endian float32 attachments
+    
+    The return value is sent back as the ack. Devices should wait for it
+    before sending the next frame and back off when 'busy' is set.
+    """
+    child_id = data.get('child_id')
+    if child_id not in eeg_subscriptions.get(request.sid, ()):
+        return {'success': False, 'error': 'Not subscribed'}
+    
+    for field in ('samples', 'raw_signal'):
+        if isinstance(data.get(field), (bytes, bytearray)):
+            data[field] = decode_float32(data[field])
+    
+    try:
+        result = classify_eeg_data(child_id, data)
+    except ValueError as e:
+        return {'success': False, 'error': str(e)}
+    except DSPQueueFull:
+        return {'success': False, 'busy': True, 'pending': eeg_dsp.pending}
+    
+    if result is None:
+        return {'success': True, 'buffered': True, 'pending': eeg_dsp.pending}
+    
+    if not record_brain_state(child_id, result['brain_state'], result['dominant_frequency']):
+        return {'success': False, 'busy': True, 'pending': eeg_dsp.pending}
+    return {
+        'success': True,
+        'brain_state': result['brain_state'],
+        'frequency': result['dominant_frequency'],
+        'pending': eeg_dsp.pending
+    }
+
+@socketio.on('disconnect')
+def handle_disconnect():
+    """Forget the EEG subscriptions of a closed socket"""
+    eeg_subscriptions.pop(request.sid, None)
 
 @child_bp.route('/activity/<int:child_id>/<string:activity_type>')
 @login_required
@@ -242,9 +433,12 @@ def activity(child_id, activity_type):
 @login_required
 def get_quizzes(state):
     """Get quizzes suitable for current brain state"""
-    quizzes = Quiz.query.filter(
-        (Quiz.suitable_states.like(f'%{state}%')) | 
-        (Quiz.suitable_states == None)
+    # Quizzes without suitable_states are linked to every state
+    question_count = db.select(db.func.count(QuizQuestion.id)).where(
+        QuizQuestion.quiz_id == Quiz.id
+    ).scalar_subquery()
+    quizzes = db.session.query(Quiz, question_count).join(Quiz.state_links).filter(
+        QuizState.state == state.lower()
     ).all()
     
     return jsonify([{
@@ -254,8 +448,8 @@ def get_quizzes(state):
         'category': q.category,
         'difficulty_level': q.difficulty_level,
         'icon': q.icon,
-        'question_count': len(q.questions)
-    } for q in quizzes])
+        'question_count': count
+    } for q, count in quizzes])
 
 @child_bp.route('/quiz/<int:child_id>/<int:quiz_id>')
 @login_required
@@ -303,11 +497,15 @@ def save_quiz_attempt():
         total_questions=data['total_questions'],
         percentage=data['percentage'],
         time_taken_seconds=data['time_taken_seconds'],
-        answers=data['answers']
+        answers=data['answers'],
+        completed_at=datetime.utcnow()
     )
     
     db.session.add(attempt)
+    quiz_stats.record_attempt(db.session.connection(), attempt.child_id, attempt.quiz_id,
+                              attempt.percentage, attempt.completed_at)
     db.session.commit()
+    analytics_cache.invalidate(attempt.child_id, 'analytics')
     
     return jsonify({'success': True})
 
@@ -0,0 +1,195 @@
+import os
+import threading
+import time
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from config import Config
+
+# One record per appended chunk: wall-clock time of its first sample and its sample offset
+INDEX_DTYPE = np.dtype([('time', '<f8'), ('offset', '<i8')])
+SAMPLE_DTYPE = np.dtype('<f4')
+
+
+class Segment:
+    """One append-only segment file of a child's raw EEG"""
+
+    def __init__(self, path, start, sampling_rate):
+        self.path = path
+        self.start = start
+        self.sampling_rate = sampling_rate
+
+    @property
+    def index_path(self):
+        return self.path[:-len('.f32')] + '.idx'
+
+    def __len__(self):
+        return os.path.getsize(self.path) // SAMPLE_DTYPE.itemsize
+
+    def samples(self):
+        """Memory-map the whole segment read-only"""
+        if len(self) == 0:
+            return np.empty(0, dtype=SAMPLE_DTYPE)
+        return np.memmap(self.path, dtype=SAMPLE_DTYPE, mode='r')
+
+    def index(self):
+        """Load the chunk time index"""
+        if not os.path.exists(self.index_path) or os.path.getsize(self.index_path) == 0:
+            return np.empty(0, dtype=INDEX_DTYPE)
+        return np.fromfile(self.index_path, dtype=INDEX_DTYPE)
+
+    def offset_at(self, timestamp, index=None):
+        """Sample offset of a wall-clock time within this segment"""
+        index = self.index() if index is None else index
+        if index.size == 0:
+            return 0
+        i = max(int(np.searchsorted(index['time'], timestamp, side='right')) - 1, 0)
+        offset = index['offset'][i] + (timestamp - index['time'][i]) * self.sampling_rate
+        return int(min(max(offset, 0), len(self)))
+
+    def time_at(self, offset, index=None):
+        """Wall-clock time of a sample offset within this segment"""
+        index = self.index() if index is None else index
+        if index.size == 0:
+            return self.start
+        i = max(int(np.searchsorted(index['offset'], offset, side='right')) - 1, 0)
+        return float(index['time'][i] + (offset - index['offset'][i]) / self.sampling_rate)
+
+
+class EEGArchive:
+    """
+    Raw EEG archive with per-child, time-segmented float32 files
+
+    Samples are appended to <root>/child_<id>/<segment start>_<rate>.f32
+    with a sidecar .idx time index of one record per appended chunk. A new
+    segment is started every `segment_seconds` of wall-clock time or when
+    the sampling rate changes. Readers memory-map the segments, so slicing a
+    time range never copies the samples.
+
+    Chunks are stored as they arrive. Devices that upload overlapping
+    windows will therefore have the overlap stored more than once, while
+    streaming uploads ('samples') give a contiguous record.
+    """
+
+    def __init__(self, root=None, segment_seconds=None):
+        self.root = root or Config.EEG_ARCHIVE_DIR
+        self.segment_seconds = segment_seconds or Config.EEG_ARCHIVE_SEGMENT_SECONDS
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _child_dir(self, child_id):
+        return os.path.join(self.root, f'child_{int(child_id)}')
+
+    def _lock(self, child_id):
+        with self._locks_lock:
+            return self._locks.setdefault(child_id, threading.Lock())
+
+    def append(self, child_id, samples, sampling_rate, timestamp=None):
+        """
+        Append raw samples for a child
+
+        Args:
+            child_id (int): Child the samples belong to
+            samples (np.array): 1-D raw EEG amplitudes
+            sampling_rate (float): Sampling rate in Hz
+            timestamp (float): Unix time of the first sample, defaults to
+                now minus the chunk's duration
+        """
+        chunk = np.ascontiguousarray(samples, dtype=SAMPLE_DTYPE).ravel()
+        if chunk.size == 0:
+            return
+        if timestamp is None:
+            timestamp = time.time() - chunk.size / sampling_rate
+
+        segment_start = int(timestamp // self.segment_seconds * self.segment_seconds)
+        directory = self._child_dir(child_id)
+        segment = Segment(
+            os.path.join(directory, f'{segment_start}_{sampling_rate:g}.f32'),
+            segment_start, float(sampling_rate)
+        )
+
+        with self._lock(child_id):
+            os.makedirs(directory, exist_ok=True)
+            with open(segment.path, 'ab') as f:
+                offset = f.tell() // SAMPLE_DTYPE.itemsize
+                f.write(chunk.tobytes())
+            record = np.array([(timestamp, offset)], dtype=INDEX_DTYPE)
+            with open(segment.index_path, 'ab') as f:
+                f.write(record.tobytes())
+
+    def segments(self, child_id, start=None, end=None):
+        """
+        List a child's segments overlapping a time range, oldest first
+
+        Args:
+            start (float): Unix time, inclusive
+            end (float): Unix time, exclusive
+        """
+        directory = self._child_dir(child_id)
+        if not os.path.isdir(directory):
+            return []
+
+        found = []
+        for name in os.listdir(directory):
+            if not name.endswith('.f32'):
+                continue
+            segment_start, rate = name[:-len('.f32')].split('_')
+            segment = Segment(os.path.join(directory, name), int(segment_start), float(rate))
+            if end is not None and segment.start >= end:
+                continue
+            if start is not None and segment.start + self.segment_seconds <= start:
+                continue
+            found.append(segment)
+        found.sort(key=lambda s: (s.start, s.path))
+        return found
+
+    def read(self, child_id, start=None, end=None):
+        """
+        Zero-copy views of a child's raw samples in a time range
+
+        Returns:
+            list: (start time, sampling rate, np.memmap slice) per segment
+        """
+        views = []
+        for segment in self.segments(child_id, start, end):
+            index = segment.index()
+            samples = segment.samples()
+            first = segment.offset_at(start, index) if start is not None else 0
+            last = segment.offset_at(end, index) if end is not None else len(samples)
+            if last > first:
+                views.append((segment.time_at(first, index), segment.sampling_rate, samples[first:last]))
+        return views
+
+    def reprocess(self, child_id, classifier, start=None, end=None, window_size=None, hop_size=None,
+                  batch_size=None):
+        """
+        Re-run a classifier over archived raw data
+
+        Each segment's samples are cut into sliding windows (as strided
+        views over the memory map) and classified with process_batch,
+        batch_size windows at a time, so the float64 copy process_batch
+        makes stays bounded however long the segment is.
+
+        Args:
+            classifier (EEGClassifier): Classifier to apply
+            window_size (int): Samples per window
+            hop_size (int): Samples between window starts
+            batch_size (int): Windows per process_batch call, defaults to
+                EEG_REPROCESS_BATCH
+
+        Yields:
+            tuple: (window start times, process_batch result) per batch
+        """
+        window_size = window_size or Config.EEG_STREAM_WINDOW
+        hop_size = hop_size or window_size
+        batch_size = batch_size or Config.EEG_REPROCESS_BATCH
+        for view_start, sampling_rate, samples in self.read(child_id, start, end):
+            if samples.size < window_size:
+                continue
+            windows = sliding_window_view(samples, window_size)[::hop_size]
+            times = view_start + np.arange(len(windows)) * hop_size / sampling_rate
+            for first in range(0, len(windows), batch_size):
+                batch = slice(first, first + batch_size)
+                yield times[batch], classifier.process_batch(windows[batch], sampling_rate)
+
+
+eeg_archive = EEGArchive()
@@ -1,7 +1,10 @@
+import bisect
 import numpy as np
 from scipy import signal
-from scipy.fft import fft, fftfreq
+from scipy.fft import rfft, rfftfreq
 from config import Config
+from app.eeg_processor.filter_bank import filter_bank
+from app.eeg_processor.fast_path import FastSpectrumPath
 
 class EEGClassifier:
     """
@@ -11,6 +14,52 @@ class EEGClassifier:
     def __init__(self):
         self.brain_states = Config.BRAIN_STATES
         self.sampling_rate = Config.EEG_SAMPLING_RATE
+        self.filter_band = Config.EEG_FILTER_BAND
+        self.filter_order = Config.EEG_FILTER_ORDER
+        self.filter_bank = filter_bank
+        self._build_state_lookup()
+        self._band_layouts = {}
+        self.fast_path = FastSpectrumPath(self) if Config.EEG_FAST_PATH else None
+    
+    def _build_state_lookup(self):
+        """Precompute sorted band edges for vectorized classification"""
+        self.state_names = np.array(list(self.brain_states))
+        lows = np.array([info['range'][0] for info in self.brain_states.values()], dtype=float)
+        highs = np.array([info['range'][1] for info in self.brain_states.values()], dtype=float)
+        
+        order = np.argsort(lows, kind='stable')
+        self._band_order = order
+        self._band_lows = lows[order]
+        self._band_highs = highs[order]
+        # Plain list copies for classify_frequency
+        self._band_low_list = self._band_lows.tolist()
+        self._band_high_list = self._band_highs.tolist()
+        self._band_order_list = order.tolist()
+        self._state_name_list = list(self.brain_states)
+        
+        # Frequencies outside every band (gaps, above the top edge) fall back to gamma
+        names = list(self.brain_states)
+        self._default_state = names.index('gamma') if 'gamma' in names else len(names) - 1
+    
+    def _locate_bands(self, frequencies):
+        """Map frequencies to band columns, returning (index, inside-a-band mask)"""
+        pos = np.searchsorted(self._band_lows, frequencies, side='right') - 1
+        clipped = np.clip(pos, 0, len(self._band_lows) - 1)
+        inside = (pos >= 0) & (frequencies < self._band_highs[clipped])
+        return self._band_order[clipped], inside
+    
+    def classify_frequencies(self, frequencies):
+        """
+        Classify an array of frequencies into brain state indices
+        
+        Args:
+            frequencies (np.array): Frequencies in Hz, any shape
+            
+        Returns:
+            np.array: Indices into self.state_names, same shape as the input
+        """
+        band_index, inside = self._locate_bands(np.asarray(frequencies, dtype=float))
+        return np.where(inside, band_index, self._default_state)
     
     def classify_frequency(self, frequency):
         """
@@ -22,13 +71,11 @@ class EEGClassifier:
         Returns:
             str: Brain state name (delta, theta, alpha, beta, gamma)
         """
-        for state_name, state_info in self.brain_states.items():
-            min_freq, max_freq = state_info['range']
-            if min_freq <= frequency < max_freq:
-                return state_name
-        
-        # Default to gamma if frequency is very high
-        return 'gamma'
+        # Plain bisect over the sorted edges, a numpy round trip costs more than the lookup
+        pos = bisect.bisect_right(self._band_low_list, frequency) - 1
+        if pos >= 0 and frequency < self._band_high_list[pos]:
+            return self._state_name_list[self._band_order_list[pos]]
+        return self._state_name_list[self._default_state]
     
     def process_eeg_signal(self, raw_signal, sampling_rate=None):
         """
@@ -48,31 +95,45 @@ class EEGClassifier:
         if sampling_rate is None:
             sampling_rate = self.sampling_rate
         
+        if self.fast_path is not None:
+            return self.fast_path.process(raw_signal, sampling_rate)
+        
         signal_array = np.array(raw_signal)
         
         # Apply bandpass filter (0.5-50 Hz) to remove noise
-        nyquist = sampling_rate / 2
-        low = 0.5 / nyquist
-        high = 50 / nyquist
-        b, a = signal.butter(4, [low, high], btype='band')
-        filtered_signal = signal.filtfilt(b, a, signal_array)
+        sos = self.filter_bank.get_sos(sampling_rate, self.filter_band, self.filter_order)
+        filtered_signal = signal.sosfiltfilt(sos, signal_array)
         
-        # Compute FFT
+        return self.analyze_spectrum(filtered_signal, sampling_rate)
+    
+    def analyze_spectrum(self, filtered_signal, sampling_rate=None):
+        """
+        Extract dominant frequency and band powers from an already filtered window
+        
+        Args:
+            filtered_signal (np.array): Bandpass filtered EEG window
+            sampling_rate (int): Sampling rate in Hz
+            
+        Returns:
+            dict: Same shape as process_eeg_signal
+        """
+        if sampling_rate is None:
+            sampling_rate = self.sampling_rate
+        
+        # Compute FFT (real input, so only the non-negative half)
         n = len(filtered_signal)
-        yf = fft(filtered_signal)
-        xf = fftfreq(n, 1 / sampling_rate)
+        yf = rfft(filtered_signal)
         
-        # Get positive frequencies only
-        positive_freq_idx = xf > 0
-        frequencies = xf[positive_freq_idx]
-        power = np.abs(yf[positive_freq_idx]) ** 2
+        # Get positive frequencies only (bins 1 .. ceil(n/2) - 1)
+        frequencies, projection = self.band_projection(n, sampling_rate)
+        power = np.abs(yf[1:frequencies.size + 1]) ** 2
         
         # Find dominant frequency
         dominant_idx = np.argmax(power)
         dominant_frequency = frequencies[dominant_idx]
         
         # Calculate band powers
-        band_powers = self.calculate_band_powers(frequencies, power)
+        band_powers = self.band_powers_dict(self.band_power_array(power, projection))
         
         # Classify brain state
         brain_state = self.classify_frequency(dominant_frequency)
@@ -83,6 +144,120 @@ class EEGClassifier:
             'band_powers': band_powers
         }
     
+    def process_batch(self, signals, sampling_rate=None):
+        """
+        Process many EEG windows in a single vectorized pass
+        
+        Args:
+            signals (np.array): 2-D (channels x samples) or
+                3-D (windows x channels x samples) raw EEG amplitudes
+            sampling_rate (int): Sampling rate in Hz
+            
+        Returns:
+            dict: {
+                'dominant_frequency': np.array of shape signals.shape[:-1],
+                'state_index': np.array of indices into 'state_names',
+                'brain_state': np.array of state names,
+                'band_powers': np.array of shape signals.shape[:-1] + (n_states,),
+                'state_names': tuple of band names in 'band_powers' column order
+            }
+        """
+        if sampling_rate is None:
+            sampling_rate = self.sampling_rate
+        
+        signal_array = np.asarray(signals, dtype=float)
+        if signal_array.ndim not in (2, 3):
+            raise ValueError('process_batch expects a 2-D or 3-D array, got %d-D' % signal_array.ndim)
+        
+        sos = self.filter_bank.get_sos(sampling_rate, self.filter_band, self.filter_order)
+        filtered = signal.sosfiltfilt(sos, signal_array, axis=-1)
+        
+        # Same bins as the positive half of the complex FFT in analyze_spectrum
+        n = signal_array.shape[-1]
+        frequencies, projection = self.band_projection(n, sampling_rate)
+        power = np.abs(rfft(filtered, axis=-1)[..., 1:frequencies.size + 1]) ** 2
+        
+        dominant_frequency = frequencies[np.argmax(power, axis=-1)]
+        state_index = self.classify_frequencies(dominant_frequency)
+        
+        return {
+            'dominant_frequency': dominant_frequency,
+            'state_index': state_index,
+            'brain_state': self.state_names[state_index],
+            'band_powers': self.band_power_array(power, projection),
+            'state_names': tuple(self.state_names)
+        }
+    
+    def process_channels(self, signals, sampling_rate=None):
+        """
+        Classify one multi-channel frame into a single brain state
+        
+        Every channel is processed by process_batch and the state held by
+        most channels wins.
+        
+        Args:
+            signals (np.array): 2-D (channels x samples) raw EEG amplitudes
+            sampling_rate (int): Sampling rate in Hz
+            
+        Returns:
+            dict: Same shape as process_eeg_signal, frequency and band powers
+            are averaged over the channels that agree with the result
+        """
+        batch = self.process_batch(signals, sampling_rate)
+        state_index = batch['state_index']
+        winner = int(np.argmax(np.bincount(state_index, minlength=len(self.state_names))))
+        agreeing = state_index == winner
+        
+        return {
+            'dominant_frequency': float(batch['dominant_frequency'][agreeing].mean()),
+            'brain_state': str(self.state_names[winner]),
+            'band_powers': self.band_powers_dict(batch['band_powers'][agreeing].mean(axis=0))
+        }
+    
+    def band_projection(self, n, sampling_rate):
+        """
+        Get the cached positive frequency axis and band projection for a window length
+        
+        The frequency bins of an n-sample FFT never change for a given
+        sampling rate, so the bin-to-band assignment is built once per
+        (n, sampling_rate) and reused by single-frame and batch processing.
+        
+        Returns:
+            tuple: (frequencies, projection) where projection is a
+            (n_bins x n_states) 0/1 matrix, so power @ projection gives
+            the power of every band at once
+        """
+        key = (int(n), float(sampling_rate))
+        layout = self._band_layouts.get(key)
+        if layout is None:
+            frequencies = rfftfreq(n, 1 / sampling_rate)[1:(n - 1) // 2 + 1]
+            band_index, inside = self._locate_bands(frequencies)
+            projection = np.zeros((frequencies.size, len(self.brain_states)))
+            projection[np.flatnonzero(inside), band_index[inside]] = 1.0
+            layout = (frequencies, projection)
+            self._band_layouts[key] = layout
+        return layout
+    
+    def band_power_array(self, power, projection):
+        """
+        Calculate normalized band powers from a power spectrum
+        
+        Args:
+            power (np.array): Power per positive frequency bin, any leading shape
+            projection (np.array): Matrix from band_projection
+            
+        Returns:
+            np.array: Percent of total band power per state, columns in
+            self.state_names order
+        """
+        band_powers = power @ projection
+        total_power = band_powers.sum(axis=-1, keepdims=True)
+        return np.divide(band_powers * 100, total_power, out=band_powers, where=total_power > 0)
+    
+    def band_powers_dict(self, band_powers):
+        """Convert a single row of band_power_array output to the API dict form"""
+        return dict(zip(self.brain_states, band_powers.tolist()))
+    
     def calculate_band_powers(self, frequencies, power):
         """
         Calculate power in each frequency band
@@ -90,19 +265,19 @@ class EEGClassifier:
         Returns:
             dict: Band powers for each brain state
         """
-        band_powers = {}
+        frequencies = np.asarray(frequencies, dtype=float)
+        n_states = len(self.brain_states)
         
-        for state_name, state_info in self.brain_states.items():
-            min_freq, max_freq = state_info['range']
-            band_mask = (frequencies >= min_freq) & (frequencies < max_freq)
-            band_powers[state_name] = float(np.sum(power[band_mask]))
+        # Assign every bin to its band in one pass, bins outside all bands go to an overflow slot
+        band_index, inside = self._locate_bands(frequencies)
+        band_index = np.where(inside, band_index, n_states)
+        band_powers = np.bincount(band_index, weights=power, minlength=n_states + 1)[:n_states]
         
-        # Normalize
-        total_power = sum(band_powers.values())
+        total_power = band_powers.sum()
         if total_power > 0:
-            band_powers = {k: (v / total_power) * 100 for k, v in band_powers.items()}
+            band_powers = band_powers / total_power * 100
         
-        return band_powers
+        return self.band_powers_dict(band_powers)
     
     def get_state_info(self, brain_state):
         """Get detailed information about a brain state"""
@@ -0,0 +1,163 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from eventlet import tpool
+from config import Config
+
+
+class DSPQueueFull(Exception):
+    """Raised when more DSP jobs are waiting than Config.EEG_DSP_MAX_PENDING allows"""
+
+
+_worker_classifier = None
+
+
+def _call_classifier(method, args):
+    """Run an EEGClassifier method inside a process pool worker"""
+    global _worker_classifier
+    if _worker_classifier is None:
+        from app.eeg_processor.classifier import EEGClassifier
+        _worker_classifier = EEGClassifier()
+    return getattr(_worker_classifier, method)(*args)
+
+
+class DSPExecutor:
+    """
+    Runs EEG signal processing off the eventlet hub
+
+    Modes (Config.EEG_DSP_EXECUTOR):
+        'inline'  - run on the calling green thread (blocks the hub)
+        'tpool'   - run in eventlet's native thread pool; scipy and numpy
+                    release the GIL for most of the work
+        'process' - run stateless classifier calls in a process pool;
+                    stateful jobs (streaming) still use tpool
+
+    The calling green thread yields while a job runs, so sockets and other
+    requests keep being served. At most `max_pending` jobs may be queued or
+    running at once, further submissions raise DSPQueueFull.
+    """
+
+    MODES = ('inline', 'tpool', 'process')
+
+    def __init__(self, classifier, mode=None, workers=None, max_pending=None):
+        self.classifier = classifier
+        self.mode = mode or Config.EEG_DSP_EXECUTOR
+        if self.mode not in self.MODES:
+            raise ValueError(f'Unknown DSP executor mode: {self.mode}')
+        self.workers = workers or Config.EEG_DSP_WORKERS
+        self.max_pending = max_pending or Config.EEG_DSP_MAX_PENDING
+
+        self._pool = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.peak_pending = 0
+        self.jobs = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+        self.max_run = 0.0
+
+        if self.mode in ('tpool', 'process'):
+            # Only takes effect before the pool's first use
+            tpool.set_num_threads(self.workers)
+
+    def _process_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._pool
+
+    def _acquire(self):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise DSPQueueFull(f'{self.pending} EEG jobs already pending')
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+
+    def _release(self, wait, run):
+        with self._lock:
+            self.pending -= 1
+            self.jobs += 1
+            self.total_wait += wait
+            self.total_run += run
+            self.max_run = max(self.max_run, run)
+
+    def run(self, fn, *args):
+        """
+        Run a callable in this process, off the hub unless mode is 'inline'
+
+        Args:
+            fn (callable): Thread-safe function, e.g. StreamRegistry.push
+            *args: Positional arguments for fn
+
+        Returns:
+            Whatever fn returns
+        """
+        self._acquire()
+        submitted = time.perf_counter()
+        timing = {}
+
+        def job():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                timing['wait'] = started - submitted
+                timing['run'] = time.perf_counter() - started
+
+        try:
+            if self.mode == 'inline':
+                return job()
+            return tpool.execute(job)
+        finally:
+            self._release(timing.get('wait', 0.0), timing.get('run', 0.0))
+
+    def classify(self, method, *args):
+        """
+        Call a stateless EEGClassifier method through the executor
+
+        Args:
+            method (str): Method name, e.g. 'process_eeg_signal'
+            *args: Picklable positional arguments
+
+        Returns:
+            Whatever the classifier method returns
+        """
+        if self.mode != 'process':
+            return self.run(getattr(self.classifier, method), *args)
+
+        self._acquire()
+        submitted = time.perf_counter()
+        try:
+            future = self._process_pool().submit(_call_classifier, method, args)
+            # Wait in a native thread so the hub keeps running
+            return tpool.execute(future.result)
+        finally:
+            # Queue wait is not observable across processes, count it as run time
+            self._release(0.0, time.perf_counter() - submitted)
+
+    def stats(self):
+        """Get queue depth and per-job timing for sizing the pool"""
+        jobs = self.jobs
+        return {
+            'mode': self.mode,
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'pending': self.pending,
+            'peak_pending': self.peak_pending,
+            'jobs': jobs,
+            'rejected': self.rejected,
+            'avg_wait_ms': (self.total_wait / jobs * 1000) if jobs else 0.0,
+            'avg_run_ms': (self.total_run / jobs * 1000) if jobs else 0.0,
+            'max_run_ms': self.max_run * 1000
+        }
+
+    def shutdown(self):
+        """Stop the process pool, if one was started"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,115 @@
+import threading
+import numpy as np
+from scipy import signal
+from scipy.fft import rfft
+
+
+class _Workspace:
+    """Preallocated float32 buffers for one (window length, sampling rate) pair"""
+
+    def __init__(self, classifier, n, sampling_rate):
+        frequencies, projection = classifier.band_projection(n, sampling_rate)
+        sos = classifier.filter_bank.get_sos(
+            sampling_rate, classifier.filter_band, classifier.filter_order
+        )
+        self.sos = sos.astype(np.float32)
+        # Forward-backward filtering state, as signal.sosfiltfilt builds it on every call
+        self.zi = signal.sosfilt_zi(sos).astype(np.float32)
+        n_zeros = min((sos[:, 2] == 0).sum(), (sos[:, 5] == 0).sum())
+        self.padlen = 3 * (2 * len(sos) + 1 - n_zeros)
+        self.extended = np.empty(n + 2 * self.padlen, dtype=np.float32) if n > self.padlen else None
+        self.zi_scaled = np.empty_like(self.zi)
+        # Kept in float64 so the reported frequency and its band match the reference path exactly
+        self.frequencies = frequencies
+        self.projection = projection.astype(np.float32)
+        self.n_bins = frequencies.size
+
+        self.samples = np.empty(n, dtype=np.float32)
+        self.power = np.empty(self.n_bins, dtype=np.float32)
+        self.scratch = np.empty(self.n_bins, dtype=np.float32)
+        self.band_powers = np.empty(projection.shape[1], dtype=np.float32)
+
+
+class FastSpectrumPath:
+    """
+    Single-precision real-FFT implementation of EEGClassifier.process_eeg_signal
+
+    Uses rfft with the cached frequency axis and band projection of the
+    classifier, and keeps one set of float32 work buffers per thread and
+    window length. Forward-backward filtering reuses a cached odd-extension
+    buffer and initial conditions. In steady state the only per-frame
+    allocations left are the sosfilt outputs and the rfft result.
+    Enabled with Config.EEG_FAST_PATH.
+    """
+
+    def __init__(self, classifier):
+        self.classifier = classifier
+        self._local = threading.local()
+
+    def _workspace(self, n, sampling_rate):
+        workspaces = getattr(self._local, 'workspaces', None)
+        if workspaces is None:
+            workspaces = self._local.workspaces = {}
+        key = (n, float(sampling_rate))
+        workspace = workspaces.get(key)
+        if workspace is None:
+            workspace = workspaces[key] = _Workspace(self.classifier, n, sampling_rate)
+        return workspace
+
+    def process(self, raw_signal, sampling_rate):
+        """
+        Process one raw EEG window, see EEGClassifier.process_eeg_signal
+
+        Args:
+            raw_signal (list or np.array): Raw EEG amplitude values
+            sampling_rate (int): Sampling rate in Hz
+
+        Returns:
+            dict: Same shape as EEGClassifier.process_eeg_signal
+        """
+        n = len(raw_signal)
+        ws = self._workspace(n, sampling_rate)
+        np.copyto(ws.samples, raw_signal, casting='unsafe')
+
+        filtered = self._filtfilt(ws)
+        spectrum = rfft(filtered, overwrite_x=True)[1:ws.n_bins + 1]
+
+        # |X|^2 = re^2 + im^2, written into the preallocated buffers
+        np.multiply(spectrum.real, spectrum.real, out=ws.power)
+        np.multiply(spectrum.imag, spectrum.imag, out=ws.scratch)
+        np.add(ws.power, ws.scratch, out=ws.power)
+
+        dominant_frequency = float(ws.frequencies[np.argmax(ws.power)])
+
+        np.matmul(ws.power, ws.projection, out=ws.band_powers)
+        total_power = ws.band_powers.sum()
+        if total_power > 0:
+            ws.band_powers *= 100 / total_power
+
+        return {
+            'dominant_frequency': dominant_frequency,
+            'brain_state': self.classifier.classify_frequency(dominant_frequency),
+            'band_powers': self.classifier.band_powers_dict(ws.band_powers)
+        }
+
+    def _filtfilt(self, ws):
+        """
+        Zero-phase filter ws.samples, equivalent to signal.sosfiltfilt
+
+        Odd-extends the window into a preallocated buffer and reuses the
+        cached initial conditions instead of recomputing them per call.
+        """
+        if ws.extended is None:
+            return signal.sosfiltfilt(ws.sos, ws.samples)
+
+        x, ext, pad = ws.samples, ws.extended, ws.padlen
+        ext[pad:-pad] = x
+        np.subtract(2 * x[0], x[pad:0:-1], out=ext[:pad])
+        np.subtract(2 * x[-1], x[-2:-pad - 2:-1], out=ext[-pad:])
+
+        np.multiply(ws.zi, ext[0], out=ws.zi_scaled)
+        forward, _ = signal.sosfilt(ws.sos, ext, zi=ws.zi_scaled)
+        backward_input = forward[::-1]
+        np.multiply(ws.zi, backward_input[0], out=ws.zi_scaled)
+        backward, _ = signal.sosfilt(ws.sos, backward_input, zi=ws.zi_scaled)
+        return backward[::-1][pad:-pad]
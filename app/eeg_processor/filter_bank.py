@@ -0,0 +1,74 @@
+import threading
+from scipy import signal
+
+
+class FilterBank:
+    """
+    Designs Butterworth filters once and reuses them across requests
+
+    Filters are keyed by (sampling rate, band, order, type) and stored in
+    second-order-sections form, which stays numerically stable at the
+    orders and narrow passbands EEG work needs.
+    """
+
+    def __init__(self):
+        self._filters = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_sos(self, sampling_rate, band, order=4, btype='band'):
+        """
+        Get a cached filter in second-order-sections form
+
+        Args:
+            sampling_rate (float): Sampling rate in Hz
+            band (tuple or float): (low, high) cutoffs in Hz, or a single
+                cutoff for lowpass/highpass filters
+            order (int): Filter order
+            btype (str): 'band', 'lowpass' or 'highpass'
+
+        Returns:
+            np.ndarray: SOS coefficient array of shape (n_sections, 6)
+        """
+        if isinstance(band, (list, tuple)):
+            band = tuple(float(edge) for edge in band)
+        else:
+            band = float(band)
+        key = (float(sampling_rate), band, int(order), btype)
+
+        sos = self._filters.get(key)
+        if sos is not None:
+            self.hits += 1
+            return sos
+
+        with self._lock:
+            sos = self._filters.get(key)
+            if sos is None:
+                self.misses += 1
+                sos = signal.butter(order, band, btype=btype, output='sos', fs=sampling_rate)
+                self._filters[key] = sos
+            else:
+                self.hits += 1
+        return sos
+
+    def stats(self):
+        """Get cache counters for monitoring"""
+        total = self.hits + self.misses
+        return {
+            'filters': len(self._filters),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / total) if total else 0.0
+        }
+
+    def clear(self):
+        """Drop all designed filters and reset the counters"""
+        with self._lock:
+            self._filters.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Shared across classifier instances so every child reuses the same designs
+filter_bank = FilterBank()
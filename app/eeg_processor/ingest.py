@@ -0,0 +1,80 @@
+import io
+import numpy as np
+
+# Raw little-endian float32 samples, no header
+RAW_FLOAT32_MIMETYPE = 'application/octet-stream'
+NPY_MIMETYPES = ('application/x-npy', 'application/npy')
+BINARY_MIMETYPES = (RAW_FLOAT32_MIMETYPE,) + NPY_MIMETYPES
+# .npy format versions; 2.0 widens the header length field, 3.0 makes the header utf-8
+NPY_VERSIONS = ((1, 0), (2, 0), (3, 0))
+
+
+def decode_float32(body):
+    """
+    Decode a raw little-endian float32 frame without copying
+
+    Args:
+        body (bytes): Request body
+
+    Returns:
+        np.array: Read-only 1-D float32 view over the body
+    """
+    if len(body) % 4:
+        raise ValueError('float32 payload length must be a multiple of 4 bytes')
+    return np.frombuffer(body, dtype='<f4')
+
+
+def decode_npy(body):
+    """
+    Decode a .npy payload without copying the array data
+
+    Only the header is parsed, the samples are viewed in place with
+    np.frombuffer. Format versions 1.0, 2.0 and 3.0 are accepted. Object
+    arrays are rejected since they would need pickle.
+
+    Args:
+        body (bytes): Request body holding a complete .npy file
+
+    Returns:
+        np.array: Read-only 1-D (samples) or 2-D (channels x samples) view
+    """
+    header = io.BytesIO(body)
+    try:
+        version = np.lib.format.read_magic(header)
+        if version not in NPY_VERSIONS:
+            raise ValueError(f'unsupported format version {version[0]}.{version[1]}')
+        # The public readers cover 1.0 and 2.0 only; this one also decodes the 3.0 utf-8 header
+        shape, fortran_order, dtype = np.lib.format._read_array_header(header, version)
+    except ValueError as e:
+        raise ValueError(f'Invalid .npy payload: {e}')
+
+    if dtype.hasobject or dtype.kind != 'f':
+        raise ValueError(f'Unsupported .npy dtype: {dtype}')
+    if len(shape) not in (1, 2):
+        raise ValueError(f'Expected a 1-D or 2-D array, got shape {shape}')
+
+    count = int(np.prod(shape))
+    offset = header.tell()
+    if len(body) - offset < count * dtype.itemsize:
+        raise ValueError('Truncated .npy payload')
+
+    values = np.frombuffer(body, dtype=dtype, count=count, offset=offset)
+    return values.reshape(shape, order='F' if fortran_order else 'C')
+
+
+def decode_eeg_payload(body, mimetype):
+    """
+    Decode a binary EEG upload
+
+    Args:
+        body (bytes): Request body
+        mimetype (str): One of BINARY_MIMETYPES
+
+    Returns:
+        np.array: Samples, 1-D or (channels x samples)
+    """
+    if mimetype == RAW_FLOAT32_MIMETYPE:
+        return decode_float32(body)
+    if mimetype in NPY_MIMETYPES:
+        return decode_npy(body)
+    raise ValueError(f'Unsupported EEG payload type: {mimetype}')
@@ -0,0 +1,294 @@
+import http.cookiejar
+import json
+import re
+import time
+import urllib.parse
+import urllib.request
+import numpy as np
+from config import Config
+from app.eeg_processor.synthetic import SyntheticEEG, state_mixture
+
+
+class ReplayStats:
+    """Collects per-frame timings for a replay run"""
+
+    def __init__(self):
+        self.ack_latencies = []
+        self.update_latencies = []
+        self.classified_ack_latencies = []
+        self.frames = 0
+        self.classified = 0
+        self.errors = 0
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+        self.stopped = None
+
+    def stop(self):
+        """End the timed part of the run; later waiting is left out of the report"""
+        self.stopped = (time.perf_counter(), time.process_time())
+
+    def report(self, in_process=True):
+        """
+        Summarize the run
+
+        Args:
+            in_process (bool): The server ran in this process, so CPU time
+                and update latency cover it. Against a remote server only
+                the client's CPU and the HTTP round trips are known.
+
+        Returns:
+            dict: Frame counts, frames per second, CPU per frame and
+            latency percentiles in milliseconds
+        """
+        stopped, cpu_stopped = self.stopped or (time.perf_counter(), time.process_time())
+        wall = stopped - self.started
+        cpu = cpu_stopped - self.cpu_started
+        cpu_per_frame = round(cpu / self.frames * 1000, 3) if self.frames else 0.0
+        report = {
+            'frames': self.frames,
+            'classified': self.classified,
+            'errors': self.errors,
+            'wall_seconds': round(wall, 3),
+            'frames_per_second': round(self.frames / wall, 1) if wall else 0.0,
+            'ack_latency_ms': _percentiles(self.ack_latencies)
+        }
+        if in_process:
+            report['cpu_ms_per_frame'] = cpu_per_frame
+            report['update_latency_ms'] = _percentiles(self.update_latencies)
+        else:
+            report['client_cpu_ms_per_frame'] = cpu_per_frame
+            report['classified_ack_latency_ms'] = _percentiles(self.classified_ack_latencies)
+        return report
+
+
+def _percentiles(values):
+    if not values:
+        return {'n': 0}
+    ms = np.asarray(values) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {'n': len(values), 'p50': round(p50, 3), 'p95': round(p95, 3),
+            'p99': round(p99, 3), 'max': round(ms.max(), 3)}
+
+
+class SimulatedChild:
+    """One child's synthetic headset, switching brain state every `state_seconds`"""
+
+    def __init__(self, child_id, sampling_rate, state_seconds, artifact_rate, seed):
+        self.child_id = child_id
+        self.sampling_rate = sampling_rate
+        self.state_samples = int(state_seconds * sampling_rate)
+        self.artifact_rate = artifact_rate
+        self.rng = np.random.default_rng(seed)
+        self.window = np.zeros(Config.EEG_STREAM_WINDOW, dtype=np.float32)
+        self.sent = 0
+        self._switch()
+
+    def _switch(self):
+        state = str(self.rng.choice(list(Config.BRAIN_STATES)))
+        self.generator = SyntheticEEG(
+            state_mixture(state), self.sampling_rate,
+            artifact_rate=self.artifact_rate, seed=int(self.rng.integers(1 << 31))
+        )
+        self.remaining = self.state_samples
+
+    def next_chunk(self, chunk_size):
+        """Next chunk of new samples"""
+        if self.remaining <= 0:
+            self._switch()
+        chunk = self.generator.generate(chunk_size)
+        self.remaining -= chunk_size
+        self.sent += chunk_size
+        self.window = np.concatenate([self.window[chunk_size:], chunk])[-self.window.size:]
+        return chunk
+
+    def frame(self, chunk_size, mode):
+        """Payload fields for the next upload in 'samples' or 'raw_signal' mode"""
+        chunk = self.next_chunk(chunk_size)
+        if mode == 'samples':
+            return {'samples': chunk.tolist()}
+        return {'raw_signal': self.window.tolist()}
+
+
+def _simulated_children(child_ids, sampling_rate, state_seconds, artifact_rate, seed):
+    return [SimulatedChild(cid, sampling_rate, state_seconds, artifact_rate, seed + i)
+            for i, cid in enumerate(child_ids)]
+
+
+def replay_test_client(app, n_children=4, seconds=10, chunk_size=64, mode='samples',
+                       transport='http', state_seconds=5, artifact_rate=0.1, seed=0):
+    """
+    Replay synthetic EEG for simulated children through the Flask test client
+
+    Creates a throwaway parent and `n_children` children in the app's
+    database, so `app` should be configured with a scratch database.
+    Frames are sent round-robin as fast as the app accepts them, over HTTP
+    (/child/api/eeg-input) or the Socket.IO eeg_frame channel. Update
+    latency runs from sending a child's latest frame to the emitter
+    broadcasting brain_state_update to the child's room, timed by an
+    emitter listener; updates the emitter coalesces are timed when the
+    window closes. CPU per frame includes the in-process client.
+
+    Args:
+        app (Flask): Application under test
+        n_children (int): Simulated headsets
+        seconds (float): Seconds of signal to send per child
+        chunk_size (int): New samples per upload
+        mode (str): 'samples' (streaming) or 'raw_signal' (full windows)
+        transport (str): 'http' or 'socket'
+
+    Returns:
+        dict: See ReplayStats.report
+
+    Raises:
+        RuntimeError: Frames were sent but no brain_state_update was broadcast
+    """
+    from app import db, socketio
+    from app.models import User, Child
+    from app.realtime.emitter import brain_state_emitter
+
+    with app.app_context():
+        parent = User(username=f'replay-{time.time_ns()}', email=f'replay-{time.time_ns()}@example.com')
+        parent.set_password(str(seed))
+        db.session.add(parent)
+        db.session.flush()
+        children = [Child(name=f'Replay {i}', parent_id=parent.id, eeg_enabled=True)
+                    for i in range(n_children)]
+        db.session.add_all(children)
+        db.session.commit()
+        parent_id = parent.id
+        child_ids = [c.id for c in children]
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(parent_id)
+        session['_fresh'] = True
+
+    device = None
+    if transport == 'socket':
+        device = socketio.test_client(app, flask_test_client=client)
+        for child_id in child_ids:
+            device.emit('eeg_subscribe', {'child_id': child_id}, callback=True)
+
+    sampling_rate = Config.EEG_SAMPLING_RATE
+    simulated = _simulated_children(child_ids, sampling_rate, state_seconds, artifact_rate, seed)
+    steps = int(seconds * sampling_rate // chunk_size)
+
+    stats = ReplayStats()
+    last_sent = {}
+
+    def on_update(room, payload):
+        sent = last_sent.get(room)
+        if sent is not None:
+            stats.update_latencies.append(time.perf_counter() - sent)
+
+    brain_state_emitter.add_listener(on_update)
+    try:
+        _replay_frames(client, device, simulated, steps, chunk_size, mode, stats, last_sent)
+        stats.stop()
+        # Let coalesced sends still waiting for their window go out
+        socketio.sleep(brain_state_emitter.window + 0.05)
+    finally:
+        brain_state_emitter.remove_listener(on_update)
+
+    if stats.frames and not stats.update_latencies:
+        raise RuntimeError(
+            f'{stats.frames} frames sent ({stats.classified} classified) but no brain_state_update '
+            'was broadcast; update latency cannot be measured'
+        )
+
+    report = stats.report()
+    report.update({'children': n_children, 'mode': mode, 'transport': transport,
+                   'chunk_size': chunk_size})
+    return report
+
+
+def _replay_frames(client, device, simulated, steps, chunk_size, mode, stats, last_sent):
+    for _ in range(steps):
+        for child in simulated:
+            payload = child.frame(chunk_size, mode)
+            payload['child_id'] = child.child_id
+            sent = time.perf_counter()
+            last_sent[f'child_{child.child_id}'] = sent
+            if device is not None:
+                ack = device.emit('eeg_frame', payload, callback=True) or {}
+                ok = ack.get('success', False)
+                classified = 'brain_state' in ack
+            else:
+                response = client.post('/child/api/eeg-input', json=payload)
+                body = response.get_json(silent=True) or {}
+                ok = response.status_code == 200
+                classified = 'brain_state' in body
+            acked = time.perf_counter()
+
+            stats.frames += 1
+            stats.ack_latencies.append(acked - sent)
+            stats.errors += not ok
+            stats.classified += classified
+
+
+def replay_server(base_url, email, password, child_ids, seconds=10, chunk_size=64,
+                  mode='samples', realtime=False, state_seconds=5, artifact_rate=0.1, seed=0):
+    """
+    Replay synthetic EEG against a running server over HTTP
+
+    Logs in through /auth/login, then posts frames for existing children
+    to /child/api/eeg-input. The server's broadcasts are not observed, so
+    the report has HTTP round trips (all frames, and those that returned a
+    classification) and the client's own CPU time instead of update
+    latency and server CPU.
+
+    Args:
+        base_url (str): e.g. 'http://127.0.0.1:5000'
+        email, password (str): Parent account owning `child_ids`
+        child_ids (list): Children to stream for
+        realtime (bool): Pace uploads at the real sampling rate instead of
+            sending as fast as possible
+
+    Returns:
+        dict: See ReplayStats.report
+    """
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+
+    login_url = base_url.rstrip('/') + '/auth/login'
+    page = opener.open(login_url).read().decode()
+    token = re.search(r'name="csrf_token" type="hidden" value="([^"]+)"', page)
+    form = {'email': email, 'password': password}
+    if token:
+        form['csrf_token'] = token.group(1)
+    opener.open(login_url, urllib.parse.urlencode(form).encode())
+
+    sampling_rate = Config.EEG_SAMPLING_RATE
+    simulated = _simulated_children(child_ids, sampling_rate, state_seconds, artifact_rate, seed)
+    steps = int(seconds * sampling_rate // chunk_size)
+    ingest_url = base_url.rstrip('/') + '/child/api/eeg-input'
+
+    stats = ReplayStats()
+    for step in range(steps):
+        for child in simulated:
+            payload = child.frame(chunk_size, mode)
+            payload['child_id'] = child.child_id
+            request = urllib.request.Request(
+                ingest_url, json.dumps(payload).encode(), {'Content-Type': 'application/json'}
+            )
+            sent = time.perf_counter()
+            try:
+                body = json.loads(opener.open(request).read() or b'{}')
+                ok = True
+            except (urllib.error.URLError, ValueError):
+                body, ok = {}, False
+            stats.frames += 1
+            stats.ack_latencies.append(time.perf_counter() - sent)
+            stats.errors += not ok
+            if 'brain_state' in body:
+                stats.classified += 1
+                stats.classified_ack_latencies.append(stats.ack_latencies[-1])
+
+        if realtime:
+            due = stats.started + (step + 1) * chunk_size / sampling_rate
+            time.sleep(max(0.0, due - time.perf_counter()))
+
+    report = stats.report(in_process=False)
+    report.update({'children': len(child_ids), 'mode': mode, 'transport': 'server',
+                   'chunk_size': chunk_size})
+    return report
@@ -0,0 +1,159 @@
+import threading
+import time
+import numpy as np
+from scipy import signal
+from config import Config
+
+
+class StreamingClassifier:
+    """
+    Stateful per-child EEG pipeline
+
+    Devices push only the samples recorded since their last upload. Each
+    chunk is filtered causally with the filter state (zi) carried over from
+    the previous chunk, then written into a fixed-size ring buffer. A new
+    classification is produced every `hop_size` samples from the most recent
+    `window_size` filtered samples, so nothing is ever re-filtered.
+    """
+
+    def __init__(self, classifier, sampling_rate=None, window_size=None, hop_size=None):
+        self.classifier = classifier
+        self.sampling_rate = sampling_rate or classifier.sampling_rate
+        self.window_size = window_size or Config.EEG_STREAM_WINDOW
+        self.hop_size = hop_size or Config.EEG_STREAM_HOP
+
+        self.sos = classifier.filter_bank.get_sos(
+            self.sampling_rate, classifier.filter_band, classifier.filter_order
+        )
+        # Every sample is written twice, at i and i + window_size, so the
+        # latest window is always one contiguous slice of the buffer
+        self._buffer = np.zeros(2 * self.window_size)
+        self._zi = None
+        self._pos = 0
+        self.filled = 0
+        self.pending = 0
+        self.samples_received = 0
+        self.last_result = None
+        self.last_seen = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reset(self):
+        """Forget buffered samples and filter state"""
+        self._buffer.fill(0)
+        self._zi = None
+        self._pos = 0
+        self.filled = 0
+        self.pending = 0
+        self.last_result = None
+
+    def push(self, samples):
+        """
+        Feed newly recorded samples into the stream
+
+        Args:
+            samples (list or np.array): Raw EEG amplitudes since the last push
+
+        Returns:
+            dict or None: A fresh classification (same shape as
+            EEGClassifier.process_eeg_signal) if at least one hop completed
+            with a full window buffered, otherwise None
+        """
+        chunk = np.asarray(samples, dtype=float).ravel()
+        self.last_seen = time.monotonic()
+        if chunk.size == 0:
+            return None
+
+        if self._zi is None:
+            # Start the filter in steady state for the first sample to avoid a step transient
+            self._zi = signal.sosfilt_zi(self.sos) * chunk[0]
+        filtered, self._zi = signal.sosfilt(self.sos, chunk, zi=self._zi)
+
+        # Only the tail of an oversized chunk can end up in the window
+        if filtered.size > self.window_size:
+            filtered = filtered[-self.window_size:]
+        self._write(filtered)
+
+        self.samples_received += chunk.size
+        self.pending += chunk.size
+        if self.filled < self.window_size or self.pending < self.hop_size:
+            return None
+
+        self.pending = 0
+        self.last_result = self.classifier.analyze_spectrum(self.window(), self.sampling_rate)
+        return self.last_result
+
+    def window(self):
+        """Get the most recent filtered window, oldest sample first"""
+        start = self._pos
+        return self._buffer[start:start + self.window_size]
+
+    def _write(self, filtered):
+        n = filtered.size
+        size = self.window_size
+        first = min(n, size - self._pos)
+        self._buffer[self._pos:self._pos + first] = filtered[:first]
+        self._buffer[self._pos + size:self._pos + size + first] = filtered[:first]
+        rest = n - first
+        if rest:
+            self._buffer[:rest] = filtered[first:]
+            self._buffer[size:size + rest] = filtered[first:]
+        self._pos = (self._pos + n) % size
+        self.filled = min(size, self.filled + n)
+
+
+class StreamRegistry:
+    """Holds one StreamingClassifier per child"""
+
+    def __init__(self, classifier):
+        self.classifier = classifier
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def get(self, child_id, sampling_rate=None):
+        """
+        Get the stream for a child, creating it on first use
+
+        A stream is rebuilt when the device switches sampling rate, since
+        both the filter and the window no longer apply.
+        """
+        sampling_rate = sampling_rate or self.classifier.sampling_rate
+        with self._lock:
+            stream = self._streams.get(child_id)
+            if stream is None or stream.sampling_rate != sampling_rate:
+                stream = StreamingClassifier(self.classifier, sampling_rate)
+                self._streams[child_id] = stream
+                self._evict_idle_locked(Config.EEG_STREAM_IDLE_TIMEOUT)
+            return stream
+
+    def push(self, child_id, samples, sampling_rate=None):
+        """Push samples into a child's stream, see StreamingClassifier.push"""
+        stream = self.get(child_id, sampling_rate)
+        with stream.lock:
+            return stream.push(samples)
+
+    def drop(self, child_id):
+        """Discard a child's stream"""
+        with self._lock:
+            self._streams.pop(child_id, None)
+
+    def evict_idle(self, max_idle=None):
+        """
+        Discard streams that have not received samples recently
+
+        Returns:
+            int: Number of streams evicted
+        """
+        if max_idle is None:
+            max_idle = Config.EEG_STREAM_IDLE_TIMEOUT
+        with self._lock:
+            return self._evict_idle_locked(max_idle)
+
+    def _evict_idle_locked(self, max_idle):
+        cutoff = time.monotonic() - max_idle
+        idle = [cid for cid, s in self._streams.items() if s.last_seen < cutoff]
+        for cid in idle:
+            del self._streams[cid]
+        return len(idle)
+
+    def __len__(self):
+        return len(self._streams)
@@ -0,0 +1,108 @@
+import numpy as np
+from config import Config
+
+
+def state_mixture(state, strength=0.8):
+    """
+    Band weights for a signal dominated by one brain state
+
+    Args:
+        state (str): Dominant brain state
+        strength (float): Share of the band power given to `state`
+
+    Returns:
+        dict: {state: weight} over all Config.BRAIN_STATES
+    """
+    others = [s for s in Config.BRAIN_STATES if s != state]
+    mixture = {s: (1 - strength) / len(others) for s in others}
+    mixture[state] = strength
+    return mixture
+
+
+class SyntheticEEG:
+    """
+    Generates continuous synthetic EEG from a mixture of brain state bands
+
+    Each band in Config.BRAIN_STATES contributes a few sinusoids at random
+    frequencies inside its range, scaled by its mixture weight, on top of
+    pink (1/f) background noise. Optional artifacts mimic eye blinks (large
+    slow deflections) and muscle bursts (broadband high-frequency noise).
+    Phases carry over between calls to generate(), so consecutive chunks
+    join into one continuous recording.
+    """
+
+    def __init__(self, mixture=None, sampling_rate=None, amplitude=20.0, noise=0.1,
+                 artifact_rate=0.0, components_per_band=3, seed=None):
+        """
+        Args:
+            mixture (dict): {state: weight}, defaults to alpha dominant
+            sampling_rate (float): Sampling rate in Hz
+            amplitude (float): Peak amplitude of the band signal, in microvolts
+            noise (float): Background noise level relative to `amplitude`
+            artifact_rate (float): Expected artifacts per second
+            components_per_band (int): Sinusoids per band
+            seed (int): Random seed for reproducible signals
+        """
+        self.sampling_rate = sampling_rate or Config.EEG_SAMPLING_RATE
+        self.amplitude = amplitude
+        self.noise = noise
+        self.artifact_rate = artifact_rate
+        self.rng = np.random.default_rng(seed)
+        self.position = 0
+
+        mixture = mixture or state_mixture('alpha')
+        # Keep components inside the classifier's passband and below Nyquist
+        top = min(Config.EEG_FILTER_BAND[1], self.sampling_rate / 2) * 0.9
+        frequencies, weights = [], []
+        for state, weight in mixture.items():
+            low, high = Config.BRAIN_STATES[state]['range']
+            high = min(high, top)
+            low = max(low, 0.5)
+            if weight <= 0 or low >= high:
+                continue
+            frequencies.append(self.rng.uniform(low, high, components_per_band))
+            weights.append(np.full(components_per_band, weight / components_per_band))
+        self.frequencies = np.concatenate(frequencies)
+        self.weights = np.sqrt(np.concatenate(weights))
+        self.phases = self.rng.uniform(0, 2 * np.pi, self.frequencies.size)
+
+    def generate(self, n_samples):
+        """
+        Produce the next n_samples of the recording
+
+        Returns:
+            np.array: float32 samples
+        """
+        t = (self.position + np.arange(n_samples)) / self.sampling_rate
+        self.position += n_samples
+
+        waves = np.sin(2 * np.pi * self.frequencies[:, None] * t + self.phases[:, None])
+        samples = self.amplitude * (self.weights @ waves) / max(self.weights.sum(), 1e-9)
+        samples += self.amplitude * self.noise * self._pink_noise(n_samples)
+
+        if self.artifact_rate > 0:
+            self._add_artifacts(samples)
+        return samples.astype(np.float32)
+
+    def _pink_noise(self, n_samples):
+        spectrum = np.fft.rfft(self.rng.standard_normal(n_samples))
+        scale = np.ones(spectrum.size)
+        scale[1:] = 1 / np.sqrt(np.arange(1, spectrum.size))
+        noise = np.fft.irfft(spectrum * scale, n_samples)
+        return noise / (noise.std() or 1.0)
+
+    def _add_artifacts(self, samples):
+        n_samples = samples.size
+        expected = self.artifact_rate * n_samples / self.sampling_rate
+        for _ in range(self.rng.poisson(expected)):
+            start = int(self.rng.integers(0, n_samples))
+            if self.rng.random() < 0.5:
+                # Eye blink: ~300 ms raised-cosine deflection several times the EEG amplitude
+                length = int(0.3 * self.sampling_rate)
+                blink = 5 * self.amplitude * np.hanning(length)
+                end = min(start + length, n_samples)
+                samples[start:end] += blink[:end - start]
+            else:
+                # Muscle burst: ~200 ms of broadband noise
+                end = min(start + int(0.2 * self.sampling_rate), n_samples)
+                samples[start:end] += 2 * self.amplitude * self.rng.standard_normal(end - start)
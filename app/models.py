@@ -1,7 +1,9 @@
 from datetime import datetime
 from flask_login import UserMixin
+from sqlalchemy.orm import validates
 from werkzeug.security import generate_password_hash, check_password_hash
 from app import db, login_manager
+from config import Config
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -40,12 +42,19 @@ class Child(db.Model):
     
     # Relationships
     brain_states = db.relationship('BrainState', backref='child', lazy=True, cascade='all, delete-orphan')
+    brain_state_episodes = db.relationship('BrainStateEpisode', backref='child', lazy=True, cascade='all, delete-orphan')
+    brain_state_summaries = db.relationship('BrainStateSummary', backref='child', lazy=True, cascade='all, delete-orphan')
     routines = db.relationship('Routine', backref='child', lazy=True, cascade='all, delete-orphan')
     mood_logs = db.relationship('MoodLog', backref='child', lazy=True, cascade='all, delete-orphan')
     activities = db.relationship('ActivityLog', backref='child', lazy=True, cascade='all, delete-orphan')
+    daily_rollups = db.relationship('DailyRollup', backref='child', lazy=True, cascade='all, delete-orphan')
+    quiz_stats = db.relationship('QuizStat', backref='child', lazy=True, cascade='all, delete-orphan')
 
 class BrainState(db.Model):
     __tablename__ = 'brain_states'
+    __table_args__ = (
+        db.Index('ix_brain_states_child_timestamp', 'child_id', 'timestamp'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     child_id = db.Column(db.Integer, db.ForeignKey('children.id'), nullable=False)
@@ -57,6 +66,67 @@ class BrainState(db.Model):
     def __repr__(self):
         return f'<BrainState {self.state} at {self.frequency}Hz>'
 
+class BrainStateSummary(db.Model):
+    """Per-minute or per-hour aggregate that replaces compacted BrainState rows"""
+    __tablename__ = 'brain_state_summaries'
+    __table_args__ = (
+        db.UniqueConstraint('child_id', 'resolution', 'bucket_start', 'state', 'source',
+                            name='uq_brain_state_summaries_key'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    child_id = db.Column(db.Integer, db.ForeignKey('children.id'), nullable=False)
+    resolution = db.Column(db.String(10), nullable=False)  # minute or hour
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    state = db.Column(db.String(20), nullable=False)  # delta, theta, alpha, beta, gamma
+    source = db.Column(db.String(20), nullable=False)  # 'eeg' or 'manual'
+    sample_count = db.Column(db.Integer, nullable=False, default=0)
+    frequency_sum = db.Column(db.Float, nullable=False, default=0.0)  # Hz, over readings with a frequency
+    frequency_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<BrainStateSummary {self.state} x{self.sample_count} per {self.resolution} at {self.bucket_start}>'
+
+class BrainStateEpisode(db.Model):
+    """Run of consecutive identical brain state readings (BRAIN_STATE_STORAGE = 'episodes')"""
+    __tablename__ = 'brain_state_episodes'
+    __table_args__ = (
+        db.Index('ix_brain_state_episodes_child_end_time', 'child_id', 'end_time'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    child_id = db.Column(db.Integer, db.ForeignKey('children.id'), nullable=False)
+    state = db.Column(db.String(20), nullable=False)  # delta, theta, alpha, beta, gamma
+    source = db.Column(db.String(20), nullable=False)  # 'eeg' or 'manual'
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)  # timestamp of the last reading
+    sample_count = db.Column(db.Integer, nullable=False, default=1)
+    mean_frequency = db.Column(db.Float)  # Hz, over readings that carried a frequency
+    
+    def __repr__(self):
+        return f'<BrainStateEpisode {self.state} x{self.sample_count} from {self.start_time}>'
+
+class DailyRollup(db.Model):
+    """Per child, per UTC day aggregate of one metric, maintained on every write"""
+    __tablename__ = 'daily_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('child_id', 'day', 'metric', 'dimension', name='uq_daily_rollups_key'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    child_id = db.Column(db.Integer, db.ForeignKey('children.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    metric = db.Column(db.String(20), nullable=False)  # brain_state, activity, mood
+    dimension = db.Column(db.String(100), nullable=False)  # state, activity type or mood
+    count = db.Column(db.Integer, nullable=False, default=0)
+    seconds = db.Column(db.Float, nullable=False, default=0.0)  # time in state / activity
+    value_sum = db.Column(db.Float, nullable=False, default=0.0)  # frequency, completion rate or intensity
+    value_count = db.Column(db.Integer, nullable=False, default=0)  # rows that carried a value
+    value_max = db.Column(db.Float)
+    
+    def __repr__(self):
+        return f'<DailyRollup {self.metric}:{self.dimension} x{self.count} on {self.day}>'
+
 class Routine(db.Model):
     __tablename__ = 'routines'
     
@@ -71,6 +141,9 @@ class Routine(db.Model):
 
 class MoodLog(db.Model):
     __tablename__ = 'mood_logs'
+    __table_args__ = (
+        db.Index('ix_mood_logs_child_timestamp', 'child_id', 'timestamp'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     child_id = db.Column(db.Integer, db.ForeignKey('children.id'), nullable=False)
@@ -81,6 +154,9 @@ class MoodLog(db.Model):
 
 class ActivityLog(db.Model):
     __tablename__ = 'activity_logs'
+    __table_args__ = (
+        db.Index('ix_activity_logs_child_timestamp', 'child_id', 'timestamp'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     child_id = db.Column(db.Integer, db.ForeignKey('children.id'), nullable=False)
@@ -90,6 +166,32 @@ class ActivityLog(db.Model):
     brain_state = db.Column(db.String(20))
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
+def split_states(value, default=()):
+    """
+    Parse a comma-separated suitable_states value
+    
+    Args:
+        value (str): e.g. 'alpha,beta', or None
+        default: States returned when value is None
+    
+    Returns:
+        list: Distinct state names in their original order
+    """
+    if value is None:
+        return list(default)
+    states = []
+    for state in value.split(','):
+        state = state.strip().lower()
+        if state and state not in states:
+            states.append(state)
+    return states
+
+def _sync_state_links(links, link_class, states):
+    # Keep links that still apply so unchanged rows are not deleted and re-inserted
+    kept = [link for link in links if link.state in states]
+    linked = {link.state for link in kept}
+    links[:] = kept + [link_class(state=state) for state in states if state not in linked]
+
 class Content(db.Model):
     __tablename__ = 'content'
     
@@ -102,6 +204,24 @@ class Content(db.Model):
     content_url = db.Column(db.String(500))
     thumbnail = db.Column(db.String(500))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # One indexed row per suitable state, kept in step with suitable_states
+    state_links = db.relationship('ContentState', lazy=True, cascade='all, delete-orphan')
+    
+    @validates('suitable_states')
+    def _link_states(self, key, value):
+        _sync_state_links(self.state_links, ContentState, split_states(value))
+        return value
+
+class ContentState(db.Model):
+    """A brain state a content item suits"""
+    __tablename__ = 'content_states'
+    __table_args__ = (
+        db.Index('ix_content_states_state_content', 'state', 'content_id'),
+    )
+    
+    content_id = db.Column(db.Integer, db.ForeignKey('content.id'), primary_key=True)
+    state = db.Column(db.String(20), primary_key=True)
 
 # Add these new models at the end of the file
 
@@ -114,17 +234,42 @@ class Quiz(db.Model):
     description = db.Column(db.Text)
     category = db.Column(db.String(50))  # math, language, colors, shapes, animals, etc.
     difficulty_level = db.Column(db.Integer, default=1)  # 1=easy, 2=medium, 3=hard
-    suitable_states = db.Column(db.String(200))  # alpha,beta,gamma
+    suitable_states = db.Column(db.String(200))  # alpha,beta,gamma; None suits every state
     icon = db.Column(db.String(50), default='book')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
     questions = db.relationship('QuizQuestion', backref='quiz', lazy=True, cascade='all, delete-orphan')
     attempts = db.relationship('QuizAttempt', backref='quiz', lazy=True, cascade='all, delete-orphan')
+    stats = db.relationship('QuizStat', backref='quiz', lazy=True, cascade='all, delete-orphan')
+    state_links = db.relationship('QuizState', lazy=True, cascade='all, delete-orphan')
+    
+    def __init__(self, **kwargs):
+        # Run the validator for quizzes created without suitable_states too
+        kwargs.setdefault('suitable_states', None)
+        super().__init__(**kwargs)
+    
+    @validates('suitable_states')
+    def _link_states(self, key, value):
+        _sync_state_links(self.state_links, QuizState, split_states(value, Config.BRAIN_STATES))
+        return value
+
+class QuizState(db.Model):
+    """A brain state a quiz suits"""
+    __tablename__ = 'quiz_states'
+    __table_args__ = (
+        db.Index('ix_quiz_states_state_quiz', 'state', 'quiz_id'),
+    )
+    
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.id'), primary_key=True)
+    state = db.Column(db.String(20), primary_key=True)
 
 class QuizQuestion(db.Model):
     """Individual questions in a quiz"""
     __tablename__ = 'quiz_questions'
+    __table_args__ = (
+        db.Index('ix_quiz_questions_quiz_order', 'quiz_id', 'order_number'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.id'), nullable=False)
@@ -138,6 +283,9 @@ class QuizQuestion(db.Model):
 class QuizAttempt(db.Model):
     """Track quiz attempts by children"""
     __tablename__ = 'quiz_attempts'
+    __table_args__ = (
+        db.Index('ix_quiz_attempts_child_completed_at', 'child_id', 'completed_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     child_id = db.Column(db.Integer, db.ForeignKey('children.id'), nullable=False)
@@ -148,3 +296,21 @@ class QuizAttempt(db.Model):
     time_taken_seconds = db.Column(db.Integer, default=0)
     completed_at = db.Column(db.DateTime, default=datetime.utcnow)
     answers = db.Column(db.JSON)  # Store user's answers
+
+class QuizStat(db.Model):
+    """Running totals of a child's attempts at one quiz, updated with every attempt"""
+    __tablename__ = 'quiz_stats'
+    __table_args__ = (
+        db.UniqueConstraint('child_id', 'quiz_id', name='uq_quiz_stats_child_quiz'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    child_id = db.Column(db.Integer, db.ForeignKey('children.id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.id'), nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    avg_score = db.Column(db.Float, nullable=False, default=0.0)  # running mean percentage
+    best_score = db.Column(db.Float, nullable=False, default=0.0)
+    last_attempt_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<QuizStat child {self.child_id} quiz {self.quiz_id} x{self.attempts}>'
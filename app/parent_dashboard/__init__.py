@@ -2,4 +2,4 @@ from flask import Blueprint
 
 parent_bp = Blueprint('parent', __name__)
 
-from app.parent_dashboard import routes
+from app.parent_dashboard import routes, commands
@@ -0,0 +1,34 @@
+import sys
+import click
+from app.parent_dashboard import parent_bp
+from app.storage.export import EXPORT_TABLES, FORMATS
+
+
+@parent_bp.cli.command('export')
+@click.argument('child_id', type=int)
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), default='ndjson', show_default=True)
+@click.option('--table', 'tables', type=click.Choice(list(EXPORT_TABLES)), multiple=True,
+              help='Tables to export (default: all; CSV takes one).')
+@click.option('--from', 'start', type=click.DateTime(), help='Inclusive UTC start time.')
+@click.option('--to', 'end', type=click.DateTime(), help='Exclusive UTC end time.')
+@click.option('--gzip', 'compress', is_flag=True, help='gzip the output.')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), help='File to write (default: stdout).')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows fetched per batch.')
+def export_command(child_id, fmt, tables, start, end, compress, output, batch_size):
+    """Stream a child's full history as NDJSON or CSV."""
+    from app import db
+    from app.storage.export import export_stream
+
+    try:
+        chunks = export_stream(db.session, child_id, list(tables or EXPORT_TABLES), fmt,
+                               start, end, compress, batch_size)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+
+    stream = open(output, 'wb') if output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            stream.write(chunk if isinstance(chunk, bytes) else chunk.encode())
+    finally:
+        if output:
+            stream.close()
@@ -1,39 +1,60 @@
 
-from flask import render_template, request, jsonify, redirect, url_for
+from flask import render_template, request, jsonify, redirect, url_for, Response, stream_with_context
 from flask_login import login_required, current_user
-from app import db
+from app import db, socketio
 from app.parent_dashboard import parent_bp
-from app.models import Child, BrainState, Routine, MoodLog, ActivityLog
+from app.models import Child, Routine, MoodLog, ActivityLog
 from datetime import datetime, timedelta
 from sqlalchemy import func
 from config import Config
-from app.models import Quiz, QuizQuestion, QuizAttempt
+from app.storage import rollups, quiz_stats
+from app.storage.result_cache import analytics_cache
+from app.storage import timeseries
+from app.storage.export import EXPORT_TABLES, export_stream
+from app.storage.retention import brain_state_compactor
 
 @parent_bp.route('/dashboard')
 @login_required
 def dashboard():
     """Parent dashboard showing all children and overview"""
     children = Child.query.filter_by(parent_id=current_user.id).all()
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
     
-    # Get statistics for each child
-    child_stats = []
-    for child in children:
-        # Get today's activity count
-        today = datetime.utcnow().date()
-        activity_count = ActivityLog.query.filter(
-            ActivityLog.child_id == child.id,
-            func.date(ActivityLog.timestamp) == today
-        ).count()
+    # Cached per child and day; only children without an entry are queried
+    stats = {child.id: analytics_cache.get(child.id, 'dashboard', today) for child in children}
+    missing = [child_id for child_id, cached in stats.items() if cached is None]
+    if missing:
+        # Today's activity count per child, as a timestamp range so the
+        # (child_id, timestamp) index can be used
+        activity_counts = dict(db.session.query(
+            ActivityLog.child_id,
+            func.count(ActivityLog.id)
+        ).filter(
+            ActivityLog.child_id.in_(missing),
+            ActivityLog.timestamp >= today,
+            ActivityLog.timestamp < today + timedelta(days=1)
+        ).group_by(ActivityLog.child_id).all())
         
-        # Get latest mood
-        latest_mood = MoodLog.query.filter_by(child_id=child.id)\
-            .order_by(MoodLog.timestamp.desc()).first()
+        # Latest mood per child
+        latest = db.session.query(
+            MoodLog.child_id,
+            func.max(MoodLog.timestamp).label('timestamp')
+        ).filter(
+            MoodLog.child_id.in_(missing)
+        ).group_by(MoodLog.child_id).subquery()
+        latest_moods = dict(db.session.query(MoodLog.child_id, MoodLog.mood).join(
+            latest,
+            (MoodLog.child_id == latest.c.child_id) & (MoodLog.timestamp == latest.c.timestamp)
+        ).all())
         
-        child_stats.append({
-            'child': child,
-            'activity_count': activity_count,
-            'latest_mood': latest_mood.mood if latest_mood else 'N/A'
-        })
+        for child_id in missing:
+            stats[child_id] = {
+                'activity_count': activity_counts.get(child_id, 0),
+                'latest_mood': latest_moods.get(child_id, 'N/A')
+            }
+            analytics_cache.set(child_id, 'dashboard', today, value=stats[child_id])
+    
+    child_stats = [dict(stats[child.id], child=child) for child in children]
     
     return render_template('parent/dashboard.html', 
                          child_stats=child_stats,
@@ -104,6 +125,46 @@ def manage_routines(child_id):
     routines = Routine.query.filter_by(child_id=child_id).all()
     return render_template('parent/routines.html', child=child, routines=routines)
 
+def analytics_results(child_id, since):
+    """
+    Compute the analytics page figures for a child from the daily rollups
+    
+    Args:
+        child_id (int): Child to summarize
+        since (date): First day of the brain state, mood and activity window
+    
+    Returns:
+        dict: Template variables state_distribution, state_unit,
+        mood_counts, activity_stats and quiz_stats
+    """
+    # Brain state distribution, moods and activities since `since`, all-time quizzes
+    brain_state_totals = rollups.totals(db.session, child_id, rollups.BRAIN_STATE, since)
+    if Config.BRAIN_STATE_STORAGE == 'episodes':
+        state_distribution = {row.dimension: round(row.seconds / 60, 1) for row in brain_state_totals}
+        state_unit = 'minutes'
+    else:
+        state_distribution = {row.dimension: row.count for row in brain_state_totals}
+        state_unit = 'records'
+    
+    mood_counts = {row.dimension: row.count for row in rollups.totals(db.session, child_id, rollups.MOOD, since)}
+    
+    activity_stats = [{
+        'type': row.dimension,
+        'count': row.count,
+        'avg_completion': round(row.value_sum / row.value_count, 1) if row.value_count else 0
+    } for row in rollups.totals(db.session, child_id, rollups.ACTIVITY, since)]
+    
+    # All-time quiz statistics, one row per quiz
+    quiz_results = quiz_stats.for_child(db.session, child_id)
+    
+    return {
+        'state_distribution': state_distribution,
+        'state_unit': state_unit,
+        'mood_counts': mood_counts,
+        'activity_stats': activity_stats,
+        'quiz_stats': quiz_results
+    }
+
 @parent_bp.route('/child/<int:child_id>/analytics')
 @login_required
 def analytics(child_id):
@@ -113,60 +174,103 @@ def analytics(child_id):
     if child.parent_id != current_user.id:
         return "Unauthorized", 403
     
-    # Get brain state distribution (last 7 days)
-    week_ago = datetime.utcnow() - timedelta(days=7)
-    brain_states_data = db.session.query(
-        BrainState.state,
-        func.count(BrainState.id).label('count')
-    ).filter(
-        BrainState.child_id == child_id,
-        BrainState.timestamp >= week_ago
-    ).group_by(BrainState.state).all()
-    
-    state_distribution = {state: count for state, count in brain_states_data}
-    
-    # Get mood trends
-    moods = MoodLog.query.filter(
-        MoodLog.child_id == child_id,
-        MoodLog.timestamp >= week_ago
-    ).order_by(MoodLog.timestamp).all()
-    
-    mood_data = [{
-        'timestamp': m.timestamp.isoformat(),
-        'mood': m.mood,
-        'intensity': m.intensity
-    } for m in moods]
-    
-    # Get activity statistics
-    activities = db.session.query(
-        ActivityLog.activity_type,
-        func.count(ActivityLog.id).label('count'),
-        func.avg(ActivityLog.completion_rate).label('avg_completion')
-    ).filter(
-        ActivityLog.child_id == child_id,
-        ActivityLog.timestamp >= week_ago
-    ).group_by(ActivityLog.activity_type).all()
+    # Cached per child and window start; writes for the child drop the entry
+    since = datetime.utcnow().date() - timedelta(days=6)
+    results = analytics_cache.get(child_id, 'analytics', since)
+    if results is None:
+        results = analytics_results(child_id, since)
+        analytics_cache.set(child_id, 'analytics', since, value=results)
     
-    activity_stats = [{
-        'type': act_type,
-        'count': count,
-        'avg_completion': round(avg_comp, 1) if avg_comp else 0
-    } for act_type, count, avg_comp in activities]
-
-    # NEW: Quiz statistics
-    quiz_stats = db.session.query(
-        Quiz.title,
-        func.count(QuizAttempt.id).label('attempts'),
-        func.avg(QuizAttempt.percentage).label('avg_score'),
-        func.max(QuizAttempt.percentage).label('best_score')
-    ).join(QuizAttempt).filter(
-        QuizAttempt.child_id == child_id
-    ).group_by(Quiz.title).all()
-
     return render_template('parent/analytics.html',
                          child=child,
-                         state_distribution=state_distribution,
-                         mood_data=mood_data,
-                         activity_stats=activity_stats,
                          brain_states=Config.BRAIN_STATES,
-                         quiz_stats=quiz_stats)
+                         **results)
+
+@parent_bp.route('/api/cache-stats')
+@login_required
+def cache_stats():
+    """Analytics cache hit rate, for tuning ANALYTICS_CACHE_SIZE and ANALYTICS_CACHE_TTL"""
+    return jsonify(analytics_cache.stats())
+
+@parent_bp.route('/api/child/<int:child_id>/series')
+@login_required
+def analytics_series(child_id):
+    """
+    Bucketed analytics for an arbitrary time range
+    Query parameters:
+        from, to: ISO 8601 UTC times (default: the last 7 days)
+        bucket: minute, hour or day (default: hour); coarsened when the
+            range would need more than ANALYTICS_SERIES_MAX_BUCKETS, and to
+            at least hour when it reaches into hourly-compacted history
+        max_points: cap for the brain state and frequency series
+            (default 500, at most ANALYTICS_SERIES_MAX_POINTS)
+    """
+    child = Child.query.get_or_404(child_id)
+    
+    if child.parent_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    try:
+        end = datetime.fromisoformat(request.args['to']) if 'to' in request.args else datetime.utcnow()
+        start = datetime.fromisoformat(request.args['from']) if 'from' in request.args else end - timedelta(days=7)
+        max_points = min(request.args.get('max_points', 500, type=int), Config.ANALYTICS_SERIES_MAX_POINTS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    bucket = request.args.get('bucket', 'hour')
+    if bucket not in timeseries.BUCKET_SECONDS:
+        return jsonify({'error': f'Unknown bucket: {bucket}'}), 400
+    if start.tzinfo is not None or end.tzinfo is not None:
+        return jsonify({'error': 'Give from/to as naive UTC times'}), 400
+    if start >= end or max_points < 3:
+        return jsonify({'error': 'Need from < to and max_points >= 3'}), 400
+    
+    finest = brain_state_compactor.finest_bucket(db.session, child_id, start, end)
+    bucket = timeseries.effective_bucket(bucket, start, end, Config.ANALYTICS_SERIES_MAX_BUCKETS, finest=finest)
+    series = timeseries.brain_state_series(db.session, child_id, start, end, bucket, max_points)
+    
+    return jsonify({
+        'child_id': child_id,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'bucket': bucket,
+        'brain_states': series['states'],
+        'frequency': series['frequency'],
+        'moods': timeseries.mood_series(db.session, child_id, start, end, bucket),
+        'activities': timeseries.activity_series(db.session, child_id, start, end, bucket)
+    })
+
+@parent_bp.route('/api/child/<int:child_id>/export')
+@login_required
+def export_history(child_id):
+    """
+    Stream a child's history as a download
+    Query parameters:
+        format: ndjson (default) or csv
+        tables: comma-separated EXPORT_TABLES keys (default: all; csv takes one)
+        from, to: optional ISO 8601 UTC range, to exclusive
+        gzip: 1 to compress the stream
+    """
+    child = Child.query.get_or_404(child_id)
+    
+    if child.parent_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    fmt = request.args.get('format', 'ndjson')
+    tables = [t for t in request.args.get('tables', ','.join(EXPORT_TABLES)).split(',') if t]
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    try:
+        start = datetime.fromisoformat(request.args['from']) if 'from' in request.args else None
+        end = datetime.fromisoformat(request.args['to']) if 'to' in request.args else None
+        # Yield to the eventlet hub after every chunk so other clients keep being served
+        chunks = export_stream(db.session, child_id, tables, fmt, start, end, compress,
+                               pause=lambda: socketio.sleep(0))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    filename = f'child_{child_id}_history.{"csv" if fmt == "csv" else "ndjson"}'
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    if compress:
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
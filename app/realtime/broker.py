@@ -0,0 +1,90 @@
+import pickle
+import threading
+import socketio as python_socketio
+
+LOCAL_SCHEME = 'local://'
+
+
+class LocalBroker:
+    """
+    In-process stand-in for a Socket.IO message queue
+
+    Every subscriber of a channel gets its own queue and receives each
+    published message once. Messages are pickled on publish, as they are
+    for Redis, so payloads that would not survive a real broker fail here
+    too. Only servers in the same process can share it, which makes it
+    suitable for tests that run several Socket.IO servers side by side.
+    """
+
+    def __init__(self):
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel, queue):
+        with self._lock:
+            self._channels.setdefault(channel, []).append(queue)
+
+    def unsubscribe(self, channel, queue):
+        with self._lock:
+            subscribers = self._channels.get(channel, [])
+            if queue in subscribers:
+                subscribers.remove(queue)
+
+    def publish(self, channel, message):
+        data = pickle.dumps(message)
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for queue in subscribers:
+            queue.put(data)
+
+
+local_broker = LocalBroker()
+
+
+class LocalPubSubManager(python_socketio.PubSubManager):
+    """Socket.IO client manager that shares rooms and emits through local_broker"""
+
+    name = 'local'
+
+    def __init__(self, channel='socketio', write_only=False, logger=None, broker=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.broker = broker or local_broker
+
+    def _publish(self, data):
+        self.broker.publish(self.channel, data)
+
+    def _listen(self):
+        # Queue type matches the server's async mode, so get() yields to the hub
+        queue = self.server.eio.create_queue()
+        self.broker.subscribe(self.channel, queue)
+        try:
+            while True:
+                yield queue.get()
+        finally:
+            self.broker.unsubscribe(self.channel, queue)
+
+
+def socketio_options(app):
+    """
+    Message queue options for socketio.init_app
+
+    SOCKETIO_MESSAGE_QUEUE selects the backend: a redis://, amqp://,
+    kafka:// or zmq:// URL is handed to Flask-SocketIO, 'local://<name>'
+    uses the in-process LocalBroker and an empty value keeps the single
+    process manager. Options are always passed explicitly, since
+    Flask-SocketIO keeps them between init_app calls.
+
+    Args:
+        app (Flask): Application being created
+
+    Returns:
+        dict: Keyword arguments for socketio.init_app
+    """
+    url = app.config.get('SOCKETIO_MESSAGE_QUEUE')
+    channel = app.config.get('SOCKETIO_CHANNEL', 'flask-socketio')
+    if not url:
+        return {'message_queue': None, 'client_manager': None}
+    if url.startswith(LOCAL_SCHEME):
+        channel = url[len(LOCAL_SCHEME):] or channel
+        return {'message_queue': None, 'client_manager': LocalPubSubManager(channel=channel)}
+    return {'message_queue': url, 'channel': channel}
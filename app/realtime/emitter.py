@@ -0,0 +1,132 @@
+import threading
+import time
+from app import socketio
+
+
+class BrainStateEmitter:
+    """
+    Change-only, coalescing broadcaster for brain_state_update
+
+    An update is sent to a child's room only when the state differs from
+    the last one sent there, or when BRAIN_STATE_HEARTBEAT_SECONDS have
+    passed since the last send. Updates arriving within
+    BRAIN_STATE_COALESCE_MS of the previous send are held back and only
+    the newest one is sent when the window closes, so a burst becomes one
+    message per room. Manual state changes are never suppressed, only
+    coalesced.
+
+    The static band table (labels, colors) is no longer attached to every
+    update; clients get it once in the 'brain_states_info' handshake sent
+    by join_child_room.
+    """
+
+    def __init__(self, app=None):
+        self.heartbeat = 10.0
+        self.window = 0.25
+        self._rooms = {}
+        self._lock = threading.Lock()
+        self.published = 0
+        self.sent = 0
+        self.suppressed = 0
+        self.coalesced = 0
+        self._listeners = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.heartbeat = app.config.get('BRAIN_STATE_HEARTBEAT_SECONDS', 10)
+        self.window = app.config.get('BRAIN_STATE_COALESCE_MS', 250) / 1000
+
+    def publish(self, child_id, payload):
+        """
+        Offer an update for a child's room
+
+        Args:
+            child_id (int): Child the update is about
+            payload (dict): brain_state_update body, must contain 'brain_state'
+        """
+        room = f'child_{child_id}'
+        now = time.monotonic()
+        forced = payload.get('source') == 'manual'
+
+        with self._lock:
+            self.published += 1
+            state = self._rooms.setdefault(room, {
+                'last_state': None, 'last_sent': float('-inf'), 'last_payload': None,
+                'pending': None, 'timer': False
+            })
+            unchanged = payload['brain_state'] == state['last_state']
+            heartbeat_due = now - state['last_sent'] >= self.heartbeat
+            if unchanged and not heartbeat_due and not forced and state['pending'] is None:
+                self.suppressed += 1
+                return
+
+            if state['timer']:
+                # A send is already scheduled for this window, just replace its payload
+                if state['pending'] is not None:
+                    self.coalesced += 1
+                state['pending'] = payload
+                return
+
+            wait = state['last_sent'] + self.window - now
+            if wait > 0:
+                state['pending'] = payload
+                state['timer'] = True
+            else:
+                self._mark_sent(state, payload, now)
+
+        if wait > 0:
+            socketio.start_background_task(self._send_later, room, wait)
+        else:
+            self._emit(room, payload)
+
+    def add_listener(self, listener):
+        """Call listener(room, payload) whenever an update is actually sent"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self._listeners.remove(listener)
+
+    def last_update(self, child_id):
+        """Most recent update sent to a child's room, for late joiners"""
+        state = self._rooms.get(f'child_{child_id}')
+        return state['last_payload'] if state else None
+
+    def stats(self):
+        """Counters for tuning the heartbeat and coalescing window"""
+        return {
+            'rooms': len(self._rooms),
+            'published': self.published,
+            'sent': self.sent,
+            'suppressed': self.suppressed,
+            'coalesced': self.coalesced
+        }
+
+    def _mark_sent(self, state, payload, now):
+        state['last_state'] = payload['brain_state']
+        state['last_sent'] = now
+        state['last_payload'] = payload
+        self.sent += 1
+
+    def _send_later(self, room, wait):
+        socketio.sleep(wait)
+        with self._lock:
+            state = self._rooms[room]
+            payload, state['pending'], state['timer'] = state['pending'], None, False
+            if payload is None:
+                return
+            if payload['brain_state'] == state['last_state'] and payload.get('source') != 'manual' \
+                    and time.monotonic() - state['last_sent'] < self.heartbeat:
+                # The burst settled back on the state the room already shows
+                self.suppressed += 1
+                return
+            self._mark_sent(state, payload, time.monotonic())
+        self._emit(room, payload)
+
+    def _emit(self, room, payload):
+        socketio.emit('brain_state_update', payload, room=room)
+        for listener in list(self._listeners):
+            listener(room, payload)
+
+
+brain_state_emitter = BrainStateEmitter()
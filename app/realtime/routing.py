@@ -0,0 +1,63 @@
+import hashlib
+
+
+class WorkerRouter:
+    """
+    Maps each child to the worker process that owns its EEG stream
+
+    Streaming classification keeps per-child state (ring buffer, filter
+    state) in the process that receives the frames, so every 'samples'
+    frame for a child has to reach the same worker. Ownership uses
+    rendezvous hashing over SOCKETIO_WORKERS: any process computes the
+    same owner without coordination, and changing the worker count only
+    moves the children of the added or removed workers.
+
+    Worker i listens on SOCKETIO_WORKER_BASE_PORT + i. Devices look up
+    their worker with /child/api/eeg-route/<child_id>, and frames sent to
+    the wrong worker are refused with 421 and the owner's port.
+    """
+
+    def __init__(self, app=None):
+        self.workers = 1
+        self.index = 0
+        self.base_port = 5000
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.workers = max(int(app.config.get('SOCKETIO_WORKERS', 1)), 1)
+        self.index = int(app.config.get('SOCKETIO_WORKER_INDEX', 0))
+        self.base_port = int(app.config.get('SOCKETIO_WORKER_BASE_PORT', 5000))
+        if not 0 <= self.index < self.workers:
+            raise ValueError(f'Worker index {self.index} outside 0..{self.workers - 1}')
+
+    def owner(self, child_id):
+        """
+        Worker index that owns a child's stream
+
+        Args:
+            child_id (int): Child to route
+
+        Returns:
+            int: Worker index in range(self.workers)
+        """
+        if self.workers == 1:
+            return 0
+        return max(range(self.workers), key=lambda worker: _score(worker, child_id))
+
+    def owns(self, child_id):
+        """Whether this process should handle the child's stream"""
+        return self.owner(child_id) == self.index
+
+    def route(self, child_id):
+        """Owner worker and port for a child, as returned to devices"""
+        worker = self.owner(child_id)
+        return {'child_id': int(child_id), 'worker': worker, 'port': self.base_port + worker}
+
+
+def _score(worker, child_id):
+    digest = hashlib.blake2b(f'{worker}:{int(child_id)}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+worker_router = WorkerRouter()
@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+from config import Config, basedir
+from app.realtime.broker import LOCAL_SCHEME
+
+
+def serve_workers(workers=None, host='0.0.0.0'):
+    """
+    Start one eventlet server process per worker and wait for them
+
+    Worker i runs create_app() with SOCKETIO_WORKER_INDEX=i and listens on
+    SOCKETIO_WORKER_BASE_PORT + i. Browsers may connect to any worker
+    (behind a proxy with sticky sessions, which Socket.IO polling needs);
+    room updates reach them through the message queue. Devices streaming
+    'samples' must use their child's worker, see WorkerRouter.
+
+    Migrate first (`flask schema upgrade`, or create_app() in this process
+    with SCHEMA_AUTO_UPGRADE): the workers start with SCHEMA_AUTO_UPGRADE=0
+    so they never race each other to upgrade the same database.
+
+    Args:
+        workers (int): Number of processes, defaults to SOCKETIO_WORKERS
+        host (str): Interface every worker binds to
+    """
+    workers = workers or Config.SOCKETIO_WORKERS
+    queue = Config.SOCKETIO_MESSAGE_QUEUE
+    if workers > 1 and (not queue or queue.startswith(LOCAL_SCHEME)):
+        raise RuntimeError('Multiple workers need SOCKETIO_MESSAGE_QUEUE set to a shared broker, e.g. redis://')
+
+    processes = []
+    for index in range(workers):
+        env = dict(os.environ, SOCKETIO_WORKERS=str(workers), SOCKETIO_WORKER_INDEX=str(index),
+                   SCHEMA_AUTO_UPGRADE='0')
+        processes.append(subprocess.Popen(
+            [sys.executable, '-m', 'app.realtime.serve', host], cwd=basedir, env=env
+        ))
+        print(f' * Worker {index} on port {Config.SOCKETIO_WORKER_BASE_PORT + index}')
+
+    try:
+        for process in processes:
+            process.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+
+
+def run_worker(host='0.0.0.0'):
+    """Serve this process's worker, configured by the SOCKETIO_WORKER_* environment"""
+    # run.py builds the app and adds its top-level routes
+    from run import app
+    from app import socketio
+    socketio.run(app, host=host, port=Config.SOCKETIO_WORKER_BASE_PORT + Config.SOCKETIO_WORKER_INDEX)
+
+
+if __name__ == '__main__':
+    run_worker(*sys.argv[1:2])
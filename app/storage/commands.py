@@ -0,0 +1,91 @@
+import click
+from flask.cli import AppGroup
+
+schema_cli = AppGroup('schema', help='Database schema versions and query plan checks.')
+rollups_cli = AppGroup('rollups', help='Daily analytics rollups.')
+retention_cli = AppGroup('retention', help='Brain state history retention.')
+quiz_stats_cli = AppGroup('quiz-stats', help='Per child, per quiz statistics.')
+
+
+@schema_cli.command('upgrade')
+def upgrade_command():
+    """Create missing tables and apply pending schema migrations."""
+    from app import db
+    from app.storage.migrations import upgrade
+
+    db.create_all()
+    applied = upgrade(db.engine)
+    for version, description in applied:
+        click.echo(f'Applied {version}: {description}')
+    if not applied:
+        click.echo('Schema is up to date')
+
+
+@schema_cli.command('status')
+def status_command():
+    """List pending schema migrations."""
+    from app import db
+    from app.storage.migrations import pending_migrations
+
+    pending = pending_migrations(db.engine)
+    for version, description in pending:
+        click.echo(f'Pending {version}: {description}')
+    if not pending:
+        click.echo('Schema is up to date')
+
+
+@schema_cli.command('explain')
+@click.option('--verbose', is_flag=True, help='Print every plan, not just failures.')
+def explain_command(verbose):
+    """Fail if a hot time-series query does not use its index."""
+    from app import db
+    from app.storage.query_plans import check_query_plans
+
+    with db.engine.connect() as connection:
+        results = check_query_plans(connection)
+
+    failed = 0
+    for result in results:
+        status = 'ok' if result['uses_index'] else 'NO INDEX'
+        click.echo(f"{status:8} {result['name']} ({result['index']})")
+        if verbose or not result['uses_index']:
+            click.echo('         ' + result['plan'].replace('\n', '\n         '))
+        failed += not result['uses_index']
+    if failed:
+        raise SystemExit(1)
+
+
+@rollups_cli.command('backfill')
+def backfill_command():
+    """Rebuild the daily rollups from raw history (pause ingest first)."""
+    from flask import current_app
+    from app.storage.engine import engine_profile
+    from app.storage.rollups import backfill
+
+    with engine_profile.write_engine().begin() as connection:
+        written = backfill(connection, current_app.config['EEG_UPDATE_INTERVAL'])
+    click.echo(f'Wrote {written} rollup rows')
+
+
+@retention_cli.command('compact')
+@click.option('--vacuum/--no-vacuum', default=None,
+              help='VACUUM SQLite afterwards (blocks writers; default BRAIN_STATE_COMPACTION_VACUUM).')
+def compact_command(vacuum):
+    """Downsample brain state history past its retention tiers."""
+    from app.storage.retention import brain_state_compactor
+
+    raw_cutoff, minute_cutoff = brain_state_compactor.cutoffs()
+    stats = brain_state_compactor.run(vacuum=vacuum)
+    click.echo(f"Folded {stats['raw_rows']} readings before {raw_cutoff} into minute summaries")
+    click.echo(f"Folded {stats['minute_rows']} minute summaries before {minute_cutoff} into hour summaries")
+
+
+@quiz_stats_cli.command('rebuild')
+def rebuild_quiz_stats_command():
+    """Recompute quiz statistics from every attempt (pause quiz saving first)."""
+    from app.storage.engine import engine_profile
+    from app.storage.quiz_stats import rebuild
+
+    with engine_profile.write_engine().begin() as connection:
+        written = rebuild(connection)
+    click.echo(f'Wrote {written} quiz stat rows')
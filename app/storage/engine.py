@@ -0,0 +1,161 @@
+import sqlalchemy as sa
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql.dml import UpdateBase
+
+
+def _in_memory(url):
+    return url.database in (None, '', ':memory:') or 'mode=memory' in str(url)
+
+
+def engine_options(config):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for the configured database
+
+    The default engine is the read pool, DATABASE_POOL_SIZE connections
+    plus DATABASE_MAX_OVERFLOW on demand. PostgreSQL connections are
+    pre-pinged, since they go through the network and can be dropped.
+
+    Args:
+        config (dict): Flask config
+
+    Returns:
+        dict: Keyword arguments for create_engine
+    """
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite' and _in_memory(url):
+        return {}
+    options = {
+        'pool_size': config.get('DATABASE_POOL_SIZE', 5),
+        'max_overflow': config.get('DATABASE_MAX_OVERFLOW', 10)
+    }
+    if url.get_backend_name() != 'sqlite':
+        options['pool_pre_ping'] = True
+    return options
+
+
+class RoutingSession(Session):
+    """
+    Session that sends ORM writes to the single SQLite writer connection
+
+    A session reads through the default pool until it has something to
+    write: pending changes, a flush, or an INSERT/UPDATE/DELETE statement.
+    From then until the transaction ends every statement goes to the
+    writer, so reads see the session's own uncommitted rows. Without a
+    writer engine (PostgreSQL, in-memory SQLite) it behaves like the
+    Flask-SQLAlchemy session.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        writer = engine_profile.writer
+        if bind is None and writer is not None and self._writes(clause):
+            return writer
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _writes(self, clause):
+        return (self.info.get('writing') or self._flushing or isinstance(clause, UpdateBase)
+                or bool(self.new or self.deleted or self.dirty))
+
+
+@event.listens_for(RoutingSession, 'after_begin')
+def _joined(session, transaction, connection):
+    if connection.engine is engine_profile.writer:
+        session.info['writing'] = True
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _ended(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('writing', None)
+
+
+class EngineProfile:
+    """
+    Connection setup for the application database
+
+    On file-based SQLite every connection gets SQLITE_PRAGMAS (WAL
+    journaling, synchronous level, busy timeout, mmap and cache size)
+    when it is opened. With SQLITE_SINGLE_WRITER, writes go through a
+    separate engine holding one connection: its pool is the queue writers
+    wait in (up to SQLITE_WRITE_TIMEOUT seconds), and it starts every
+    transaction with BEGIN IMMEDIATE, so a write never fails on a read
+    lock it cannot upgrade. WAL lets the read pool keep reading meanwhile.
+    The writer alone sets journal_mode, which persists in the file, so the
+    database switches to WAL on its first write rather than on any read.
+
+    Any other database (PostgreSQL through psycopg2) uses the plain pool
+    from engine_options() for both reads and writes.
+    """
+
+    def __init__(self, app=None):
+        self.writer = None
+        self.pragmas = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Set up the engines db.init_app created for `app`"""
+        from app import db
+
+        if self.writer is not None:
+            self.writer.dispose()
+            self.writer = None
+        with app.app_context():
+            engine = db.engine
+        if engine.dialect.name != 'sqlite' or _in_memory(engine.url):
+            return
+
+        self.pragmas = dict(app.config.get('SQLITE_PRAGMAS', {}))
+        if not app.config.get('SQLITE_SINGLE_WRITER', True):
+            event.listen(engine, 'connect', _pragma_setter(self.pragmas))
+            return
+
+        # journal_mode is stored in the database file, so only the writer sets
+        # it: read-only use (CLI commands, reports) leaves the file untouched
+        event.listen(engine, 'connect', _pragma_setter(
+            {name: value for name, value in self.pragmas.items() if name != 'journal_mode'}
+        ))
+        self.writer = sa.create_engine(
+            engine.url, pool_size=1, max_overflow=0,
+            pool_timeout=app.config.get('SQLITE_WRITE_TIMEOUT', 30)
+        )
+        event.listen(self.writer, 'connect', _pragma_setter(self.pragmas))
+        event.listen(self.writer, 'connect', _manual_transactions)
+        event.listen(self.writer, 'begin', _begin_immediate)
+
+    def write_engine(self):
+        """Engine for Core-level write transactions (the writer, or db.engine)"""
+        from app import db
+        return self.writer if self.writer is not None else db.engine
+
+    def stats(self):
+        """Pool status of the read and write engines"""
+        from app import db
+        return {
+            'dialect': db.engine.dialect.name,
+            'read_pool': db.engine.pool.status(),
+            'write_pool': self.writer.pool.status() if self.writer is not None else None,
+            'pragmas': self.pragmas
+        }
+
+
+def _pragma_setter(pragmas):
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+    return apply_pragmas
+
+
+def _manual_transactions(dbapi_connection, connection_record):
+    # Stop pysqlite from issuing its own deferred BEGIN
+    dbapi_connection.isolation_level = None
+
+
+def _begin_immediate(connection):
+    connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+
+engine_profile = EngineProfile()
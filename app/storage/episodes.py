@@ -0,0 +1,120 @@
+from datetime import timedelta
+from sqlalchemy import select
+from app.models import BrainStateEpisode
+
+episodes = BrainStateEpisode.__table__
+
+
+def append_episodes(connection, rows, max_gap, interval=timedelta(0)):
+    """
+    Fold brain state readings into run-length encoded episodes
+
+    A reading extends the child's latest episode in place when it has the
+    same state and source and arrives within `max_gap` of the episode's last
+    reading; otherwise it opens a new episode. Each child's latest episode
+    is read once per call, however many of its readings are in `rows`.
+
+    Args:
+        connection: SQLAlchemy connection inside an open transaction
+        rows (list): Dicts with child_id, state, frequency, source, timestamp
+        max_gap (timedelta): Longest silence an episode may span
+        interval (timedelta): Time one reading covers
+    
+    Returns:
+        list: (row, seconds) pairs, the time each reading added to its
+        episode's duration of (end - start) + interval
+    """
+    credits = []
+    by_child = {}
+    for row in rows:
+        by_child.setdefault(row['child_id'], []).append(row)
+
+    for child_id, child_rows in by_child.items():
+        child_rows.sort(key=lambda r: r['timestamp'])
+        open_episode = connection.execute(
+            select(episodes)
+            .where(episodes.c.child_id == child_id)
+            .order_by(episodes.c.end_time.desc())
+            .limit(1)
+        ).mappings().first()
+        current = dict(open_episode) if open_episode else None
+        dirty = False
+        # frequency-bearing readings in the open episode, for the running mean
+        freq_count = current['sample_count'] if current and current['mean_frequency'] is not None else 0
+
+        for row in child_rows:
+            if (current is not None
+                    and current['state'] == row['state']
+                    and current['source'] == row['source']
+                    and row['timestamp'] - current['end_time'] <= max_gap):
+                extended = max(row['timestamp'] - current['end_time'], timedelta(0))
+                credits.append((row, extended.total_seconds()))
+                current['end_time'] = max(current['end_time'], row['timestamp'])
+                current['sample_count'] += 1
+                if row['frequency'] is not None:
+                    mean = current['mean_frequency'] or 0.0
+                    freq_count += 1
+                    current['mean_frequency'] = mean + (row['frequency'] - mean) / freq_count
+                dirty = True
+                continue
+
+            _save(connection, current, dirty)
+            current = {
+                'id': None,
+                'child_id': child_id,
+                'state': row['state'],
+                'source': row['source'],
+                'start_time': row['timestamp'],
+                'end_time': row['timestamp'],
+                'sample_count': 1,
+                'mean_frequency': row['frequency']
+            }
+            freq_count = 1 if row['frequency'] is not None else 0
+            credits.append((row, interval.total_seconds()))
+            dirty = True
+
+        _save(connection, current, dirty)
+    return credits
+
+
+def _save(connection, episode, dirty):
+    if episode is None or not dirty:
+        return
+    values = {k: v for k, v in episode.items() if k != 'id'}
+    if episode['id'] is None:
+        connection.execute(episodes.insert().values(**values))
+    else:
+        connection.execute(
+            episodes.update().where(episodes.c.id == episode['id']).values(**values)
+        )
+
+
+def episode_durations(child_id, since, until, update_interval):
+    """
+    Seconds spent in each brain state between two times
+
+    Every reading is taken to cover one update interval, so an episode
+    lasts (end - start) + update_interval. Episodes straddling the window
+    edges are clipped.
+
+    Returns:
+        dict: {state: seconds}
+    """
+    from app import db
+
+    result = db.session.execute(
+        select(episodes.c.state, episodes.c.start_time, episodes.c.end_time)
+        .where(
+            episodes.c.child_id == child_id,
+            episodes.c.end_time >= since,
+            episodes.c.start_time < until
+        )
+    )
+    interval = timedelta(seconds=update_interval)
+    durations = {}
+    for state, start_time, end_time in result:
+        start = max(start_time, since)
+        end = min(end_time + interval, until)
+        if end > start:
+            durations[state] = durations.get(state, 0.0) + (end - start).total_seconds()
+    return durations
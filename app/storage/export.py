@@ -0,0 +1,156 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from sqlalchemy import select
+from app.models import (ActivityLog, BrainState, BrainStateEpisode, BrainStateSummary, MoodLog,
+                        QuizAttempt)
+
+# Exportable table name -> (table, time column used for range filters)
+EXPORT_TABLES = {
+    'brain_states': (BrainState.__table__, 'timestamp'),
+    'brain_state_episodes': (BrainStateEpisode.__table__, 'start_time'),
+    'brain_state_summaries': (BrainStateSummary.__table__, 'bucket_start'),
+    'mood_logs': (MoodLog.__table__, 'timestamp'),
+    'activity_logs': (ActivityLog.__table__, 'timestamp'),
+    'quiz_attempts': (QuizAttempt.__table__, 'completed_at'),
+}
+
+FORMATS = ('ndjson', 'csv')
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def export_batches(session, child_id, table_name, start=None, end=None, batch_size=1000):
+    """
+    Stream a child's rows of one table in time order, batch by batch
+
+    Rows are fetched with yield_per, which keeps a server-side cursor open
+    on PostgreSQL and uses fetchmany on SQLite, so only one batch is held
+    in memory at a time.
+
+    Args:
+        session: SQLAlchemy session
+        child_id (int): Child to export
+        table_name (str): Key of EXPORT_TABLES
+        start (datetime): Inclusive lower bound on the table's time column
+        end (datetime): Exclusive upper bound
+        batch_size (int): Rows per batch
+
+    Yields:
+        list: Up to batch_size rows as dicts of JSON-ready values
+    """
+    table, time_column = EXPORT_TABLES[table_name]
+    time_column = table.c[time_column]
+    query = select(table).where(table.c.child_id == child_id).order_by(time_column, table.c.id)
+    if start is not None:
+        query = query.where(time_column >= start)
+    if end is not None:
+        query = query.where(time_column < end)
+
+    result = session.execute(query.execution_options(yield_per=batch_size))
+    for partition in result.mappings().partitions():
+        yield [{key: _plain(value) for key, value in row.items()} for row in partition]
+
+
+def ndjson_chunks(batches_by_table):
+    """
+    Encode batches as newline-delimited JSON, one text chunk per batch
+
+    Args:
+        batches_by_table: Iterable of (table name, batch iterator) pairs
+
+    Yields:
+        str: Lines of {"table": ..., column: value, ...} objects
+    """
+    for table_name, batches in batches_by_table:
+        for batch in batches:
+            yield ''.join(json.dumps(dict(row, table=table_name)) + '\n' for row in batch)
+
+
+def csv_chunks(table_name, batches):
+    """
+    Encode one table's batches as CSV, header first
+
+    JSON columns (quiz answers) are written as JSON strings.
+
+    Yields:
+        str: CSV text per batch
+    """
+    table, _ = EXPORT_TABLES[table_name]
+    columns = [column.name for column in table.columns]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    for batch in batches:
+        for row in batch:
+            writer.writerow({key: json.dumps(value) if isinstance(value, (list, dict)) else value
+                             for key, value in row.items()})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress text chunks into a gzip stream on the fly"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(session, child_id, tables, fmt='ndjson', start=None, end=None,
+                  compress=False, batch_size=1000, pause=None):
+    """
+    Chunks of a child's history export
+
+    Args:
+        session: SQLAlchemy session
+        child_id (int): Child to export
+        tables (list): Keys of EXPORT_TABLES; CSV takes exactly one
+        fmt (str): 'ndjson' or 'csv'
+        start, end (datetime): Optional time range, end exclusive
+        compress (bool): gzip the stream
+        batch_size (int): Rows fetched and encoded per chunk
+        pause (callable): Called after every chunk, e.g. socketio.sleep(0)
+            so the eventlet hub serves other requests between chunks
+
+    Returns:
+        generator: str chunks, or bytes when compressed. Arguments are
+        checked before it is returned, so errors surface before streaming.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown export format: {fmt}')
+    unknown = [t for t in tables if t not in EXPORT_TABLES]
+    if unknown:
+        raise ValueError(f'Unknown export tables: {", ".join(unknown)}')
+    if fmt == 'csv' and len(tables) != 1:
+        raise ValueError('CSV exports take exactly one table')
+
+    def batches(table_name):
+        return export_batches(session, child_id, table_name, start, end, batch_size)
+
+    if fmt == 'csv':
+        chunks = csv_chunks(tables[0], batches(tables[0]))
+    else:
+        chunks = ndjson_chunks((t, batches(t)) for t in tables)
+    if compress:
+        chunks = gzip_chunks(chunks)
+
+    return _paced(chunks, pause)
+
+
+def _paced(chunks, pause):
+    for chunk in chunks:
+        yield chunk
+        if pause is not None:
+            pause()
@@ -0,0 +1,124 @@
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select
+
+# Kept out of db.metadata so create_all never treats it as a model table
+schema_metadata = MetaData()
+schema_versions = Table(
+    'schema_versions', schema_metadata,
+    Column('version', Integer, primary_key=True),
+    Column('description', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Register a schema migration; versions are applied in ascending order"""
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+
+def _create_model_indexes(connection, names):
+    from app import db
+    for table in db.metadata.tables.values():
+        for index in table.indexes:
+            if index.name in names:
+                index.create(connection, checkfirst=True)
+
+
+@migration(1, 'Composite (child_id, time) indexes on time-series tables')
+def add_time_series_indexes(connection):
+    _create_model_indexes(connection, {
+        'ix_brain_states_child_timestamp',
+        'ix_brain_state_episodes_child_end_time',
+        'ix_mood_logs_child_timestamp',
+        'ix_activity_logs_child_timestamp',
+        'ix_quiz_attempts_child_completed_at'
+    })
+
+
+def applied_versions(connection):
+    """Versions already recorded in schema_versions"""
+    schema_versions.create(connection, checkfirst=True)
+    return set(connection.execute(select(schema_versions.c.version)).scalars())
+
+
+def pending_migrations(engine):
+    """(version, description) of migrations not yet applied"""
+    with engine.begin() as connection:
+        applied = applied_versions(connection)
+    return [(version, description) for version, description, _ in MIGRATIONS if version not in applied]
+
+
+def upgrade(engine):
+    """
+    Apply pending migrations, each in its own transaction
+
+    db.create_all() builds new databases with the current schema, but never
+    alters existing tables. Migrations bring older databases up to date and
+    must therefore be safe to run against a freshly created schema too
+    (e.g. create indexes with checkfirst).
+
+    Args:
+        engine: SQLAlchemy engine of the application database
+
+    Returns:
+        list: (version, description) of the migrations applied
+    """
+    with engine.begin() as connection:
+        applied = applied_versions(connection)
+
+    done = []
+    for version, description, fn in MIGRATIONS:
+        if version in applied:
+            continue
+        with engine.begin() as connection:
+            fn(connection)
+            connection.execute(schema_versions.insert().values(
+                version=version, description=description, applied_at=datetime.utcnow()
+            ))
+        done.append((version, description))
+    return done
+
+
+# Brain state rollups carry frequency sums from the start, so version 3 is unused
+@migration(2, 'Backfill daily rollups from existing history')
+def backfill_daily_rollups(connection):
+    from config import Config
+    from app.models import DailyRollup
+    from app.storage.rollups import backfill
+    DailyRollup.__table__.create(connection, checkfirst=True)
+    backfill(connection, Config.EEG_UPDATE_INTERVAL)
+
+
+@migration(4, 'Per child, per quiz statistics')
+def build_quiz_stats(connection):
+    from app.models import QuizStat
+    from app.storage.quiz_stats import rebuild
+    QuizStat.__table__.create(connection, checkfirst=True)
+    rebuild(connection)
+
+
+@migration(5, 'Indexed brain state links for content and quizzes')
+def link_suitable_states(connection):
+    from config import Config
+    from app.models import Content, ContentState, Quiz, QuizState, split_states
+    for table in (ContentState.__table__, QuizState.__table__):
+        table.create(connection, checkfirst=True)
+        connection.execute(table.delete())
+    _create_model_indexes(connection, {'ix_quiz_questions_quiz_order'})
+
+    content_rows = [{'content_id': content_id, 'state': state}
+                    for content_id, value in connection.execute(select(Content.id, Content.suitable_states))
+                    for state in split_states(value)]
+    quiz_rows = [{'quiz_id': quiz_id, 'state': state}
+                 for quiz_id, value in connection.execute(select(Quiz.id, Quiz.suitable_states))
+                 for state in split_states(value, Config.BRAIN_STATES)]
+    if content_rows:
+        connection.execute(ContentState.__table__.insert(), content_rows)
+    if quiz_rows:
+        connection.execute(QuizState.__table__.insert(), quiz_rows)
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+from sqlalchemy import text
+
+# (name, index expected in the plan, SQL) for the per-child time-series
+# queries behind the dashboards, analytics and brain state storage, and
+# the per-state content and quiz lookups
+HOT_QUERIES = [
+    ('brain_state_distribution', 'ix_brain_states_child_timestamp',
+     'SELECT state, count(id) FROM brain_states '
+     'WHERE child_id = :child_id AND timestamp >= :since GROUP BY state'),
+    ('latest_brain_state', 'ix_brain_states_child_timestamp',
+     'SELECT state FROM brain_states WHERE child_id = :child_id '
+     'ORDER BY timestamp DESC LIMIT 1'),
+    ('open_episode', 'ix_brain_state_episodes_child_end_time',
+     'SELECT * FROM brain_state_episodes WHERE child_id = :child_id '
+     'ORDER BY end_time DESC LIMIT 1'),
+    ('episode_durations', 'ix_brain_state_episodes_child_end_time',
+     'SELECT state, start_time, end_time FROM brain_state_episodes '
+     'WHERE child_id = :child_id AND end_time >= :since AND start_time < :until'),
+    ('mood_trend', 'ix_mood_logs_child_timestamp',
+     'SELECT mood, intensity, timestamp FROM mood_logs '
+     'WHERE child_id = :child_id AND timestamp >= :since ORDER BY timestamp'),
+    ('latest_mood', 'ix_mood_logs_child_timestamp',
+     'SELECT child_id, max(timestamp) FROM mood_logs '
+     'WHERE child_id IN (:child_id) GROUP BY child_id'),
+    ('activities_today', 'ix_activity_logs_child_timestamp',
+     'SELECT child_id, count(id) FROM activity_logs '
+     'WHERE child_id IN (:child_id) AND timestamp >= :since AND timestamp < :until GROUP BY child_id'),
+    ('activity_stats', 'ix_activity_logs_child_timestamp',
+     'SELECT activity_type, count(id), avg(completion_rate) FROM activity_logs '
+     'WHERE child_id = :child_id AND timestamp >= :since GROUP BY activity_type'),
+    ('quiz_attempts', 'ix_quiz_attempts_child_completed_at',
+     'SELECT quiz_id, count(id), avg(percentage) FROM quiz_attempts '
+     'WHERE child_id = :child_id GROUP BY quiz_id'),
+    ('content_for_state', 'ix_content_states_state_content',
+     'SELECT content.id, content.title FROM content '
+     'JOIN content_states ON content_states.content_id = content.id WHERE content_states.state = :state'),
+    ('quizzes_for_state', 'ix_quiz_states_state_quiz',
+     'SELECT quizzes.id, quizzes.title FROM quizzes '
+     'JOIN quiz_states ON quiz_states.quiz_id = quizzes.id WHERE quiz_states.state = :state'),
+    ('quiz_question_count', 'ix_quiz_questions_quiz_order',
+     'SELECT count(id) FROM quiz_questions WHERE quiz_id = :quiz_id'),
+]
+
+
+def explain(connection, sql, params):
+    """
+    Query plan of a statement as text
+
+    Uses EXPLAIN QUERY PLAN on SQLite and EXPLAIN elsewhere (PostgreSQL).
+    """
+    if connection.dialect.name == 'sqlite':
+        rows = connection.execute(text('EXPLAIN QUERY PLAN ' + sql), params)
+        return '\n'.join(row[-1] for row in rows)
+    rows = connection.execute(text('EXPLAIN ' + sql), params)
+    return '\n'.join(row[0] for row in rows)
+
+
+def check_query_plans(connection):
+    """
+    Check that each hot query is planned through its composite index
+
+    On PostgreSQL the planner may still prefer a sequential scan for tiny
+    tables, so run this against realistic data (after ANALYZE) there.
+
+    Returns:
+        list: Dicts with name, index, uses_index and plan per query
+    """
+    now = datetime.utcnow()
+    params = {'child_id': 1, 'quiz_id': 1, 'state': 'alpha', 'since': now - timedelta(days=7), 'until': now}
+    results = []
+    for name, index, sql in HOT_QUERIES:
+        plan = explain(connection, sql, params)
+        results.append({'name': name, 'index': index, 'uses_index': index in plan, 'plan': plan})
+    return results
@@ -0,0 +1,79 @@
+from sqlalchemy import case, func, select
+from app.models import Quiz, QuizAttempt, QuizStat
+from app.storage.rollups import upsert
+
+quiz_stats = QuizStat.__table__
+
+
+def record_attempt(connection, child_id, quiz_id, percentage, completed_at):
+    """
+    Fold one quiz attempt into the child's stats for that quiz
+
+    Runs one upsert in the caller's transaction, so on PostgreSQL and
+    SQLite concurrent attempts cannot lose an update.
+
+    Args:
+        connection: SQLAlchemy connection inside an open transaction
+        child_id (int): Child who took the quiz
+        quiz_id (int): Quiz taken
+        percentage (float): Score of the attempt
+        completed_at (datetime): UTC time the attempt finished
+    """
+    score = float(percentage or 0.0)
+    row = {'child_id': child_id, 'quiz_id': quiz_id, 'attempts': 1, 'avg_score': score,
+           'best_score': score, 'last_attempt_at': completed_at}
+    upsert(connection, quiz_stats, [row], ['child_id', 'quiz_id'], lambda excluded: {
+        'attempts': quiz_stats.c.attempts + 1,
+        'avg_score': quiz_stats.c.avg_score
+        + (excluded.avg_score - quiz_stats.c.avg_score) / (quiz_stats.c.attempts + 1),
+        'best_score': case((excluded.best_score > quiz_stats.c.best_score, excluded.best_score),
+                           else_=quiz_stats.c.best_score),
+        'last_attempt_at': case(
+            (quiz_stats.c.last_attempt_at.is_(None), excluded.last_attempt_at),
+            (excluded.last_attempt_at > quiz_stats.c.last_attempt_at, excluded.last_attempt_at),
+            else_=quiz_stats.c.last_attempt_at
+        )
+    })
+
+
+def for_child(session, child_id):
+    """
+    A child's stats per quiz, with the quiz title
+
+    Returns:
+        list: Dicts with quiz_id, title, attempts, avg_score, best_score
+        and last_attempt_at, ordered by title
+    """
+    query = select(
+        quiz_stats.c.quiz_id, Quiz.title, quiz_stats.c.attempts, quiz_stats.c.avg_score,
+        quiz_stats.c.best_score, quiz_stats.c.last_attempt_at
+    ).join(Quiz, Quiz.id == quiz_stats.c.quiz_id).where(
+        quiz_stats.c.child_id == child_id
+    ).order_by(Quiz.title, quiz_stats.c.quiz_id)
+    return [dict(row) for row in session.execute(query).mappings()]
+
+
+def rebuild(connection):
+    """
+    Recompute every quiz stat from quiz_attempts
+
+    Run it in one transaction, with quiz saving paused, so attempts made
+    meanwhile are not lost.
+
+    Args:
+        connection: SQLAlchemy connection inside an open transaction
+
+    Returns:
+        int: Stat rows written
+    """
+    connection.execute(quiz_stats.delete())
+    connection.execute(quiz_stats.insert().from_select(
+        ['child_id', 'quiz_id', 'attempts', 'avg_score', 'best_score', 'last_attempt_at'],
+        select(
+            QuizAttempt.child_id, QuizAttempt.quiz_id, func.count(QuizAttempt.id),
+            func.avg(func.coalesce(QuizAttempt.percentage, 0.0)),
+            func.max(func.coalesce(QuizAttempt.percentage, 0.0)),
+            func.max(QuizAttempt.completed_at)
+        ).group_by(QuizAttempt.child_id, QuizAttempt.quiz_id)
+    ))
+    return connection.execute(select(func.count()).select_from(quiz_stats)).scalar()
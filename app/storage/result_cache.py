@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    Per-child LRU cache with a TTL for computed dashboard and analytics results
+
+    Entries are keyed by (child_id, view, *key) and dropped when the child's
+    data changes: the write paths call invalidate() for the views a write
+    affects once it is committed. The TTL bounds how stale an entry can get
+    through writes this process never sees, such as those handled by
+    another worker or made directly in the database.
+    """
+
+    def __init__(self, app=None):
+        self.max_entries = 512
+        self.ttl = 60.0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('ANALYTICS_CACHE_SIZE', 512)
+        self.ttl = app.config.get('ANALYTICS_CACHE_TTL', 60)
+        self.clear()
+
+    def get(self, child_id, view, *key):
+        """
+        Look up a cached result
+
+        Returns:
+            The cached value, or None on a miss or expired entry
+        """
+        full_key = (child_id, view) + key
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, value = entry
+            if expires <= now:
+                del self._entries[full_key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(full_key)
+            self.hits += 1
+            return value
+
+    def set(self, child_id, view, *key, value):
+        """Store a result, evicting the least recently used entries when full"""
+        if self.max_entries <= 0:
+            return
+        full_key = (child_id, view) + key
+        with self._lock:
+            self._entries[full_key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(full_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, child_id, *views):
+        """
+        Drop a child's cached results
+
+        Args:
+            child_id (int): Child whose data changed
+            *views (str): Views to drop, all of the child's views when omitted
+        """
+        with self._lock:
+            stale = [k for k in self._entries if k[0] == child_id and (not views or k[1] in views)]
+            for k in stale:
+                del self._entries[k]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit rate and eviction counters for sizing the cache"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'expirations': self.expirations,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations
+        }
+
+
+analytics_cache = ResultCache()
@@ -0,0 +1,237 @@
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import delete, exists, select, text
+from app import db, socketio
+from app.models import BrainState, BrainStateSummary
+from app.storage.engine import engine_profile
+from app.storage.rollups import upsert
+
+logger = logging.getLogger(__name__)
+
+summaries = BrainStateSummary.__table__
+
+KEY = ('child_id', 'resolution', 'bucket_start', 'state', 'source')
+
+
+def _truncate(timestamp, resolution):
+    if resolution == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(second=0, microsecond=0)
+
+
+def _add_summaries(connection, rows):
+    """Add (child, resolution, bucket, state, source) aggregates onto existing summary rows"""
+    if not rows:
+        return
+    upsert(connection, summaries, list(rows.values()), list(KEY), lambda excluded: {
+        'sample_count': summaries.c.sample_count + excluded.sample_count,
+        'frequency_sum': summaries.c.frequency_sum + excluded.frequency_sum,
+        'frequency_count': summaries.c.frequency_count + excluded.frequency_count
+    })
+
+
+def _fold(rows, key, sample_count, frequency_sum, frequency_count):
+    row = rows.get(key)
+    if row is None:
+        rows[key] = row = dict(zip(KEY, key), sample_count=0, frequency_sum=0.0, frequency_count=0)
+    row['sample_count'] += sample_count
+    row['frequency_sum'] += frequency_sum
+    row['frequency_count'] += frequency_count
+
+
+class BrainStateCompactor:
+    """
+    Retention policy for per-frame brain state history
+
+    BrainState rows older than BRAIN_STATE_RAW_DAYS are folded into
+    per-minute BrainStateSummary rows, and minute summaries older than
+    BRAIN_STATE_MINUTE_DAYS into per-hour ones. Summaries keep the reading
+    count and frequency sum per state and source, so the daily rollups and
+    the series API give the same totals on either side of a boundary; only
+    the time resolution drops.
+
+    Each batch of at most BRAIN_STATE_COMPACTION_BATCH rows is summarized
+    and deleted in its own transaction, so ingest is never blocked for
+    long. Cutoffs are aligned to the target resolution, and summaries are
+    upserted additively, so a bucket split across batches or runs ends up
+    in one row. Afterwards the database is analyzed through the write
+    engine. On SQLite it can also be vacuumed to hand the freed pages
+    back, but VACUUM rewrites the whole file while holding the write lock,
+    so BRAIN_STATE_COMPACTION_VACUUM is off by default and meant for
+    offline runs (`flask retention compact --vacuum`).
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self.raw_days = 7
+        self.minute_days = 90
+        self.runs = 0
+        self.last_run = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('BRAIN_STATE_COMPACTION', False)
+        self.raw_days = app.config.get('BRAIN_STATE_RAW_DAYS', 7)
+        self.minute_days = app.config.get('BRAIN_STATE_MINUTE_DAYS', 90)
+        if self.minute_days < self.raw_days:
+            raise ValueError('BRAIN_STATE_MINUTE_DAYS must not be shorter than BRAIN_STATE_RAW_DAYS')
+        self.batch_size = app.config.get('BRAIN_STATE_COMPACTION_BATCH', 5000)
+        self.interval = app.config.get('BRAIN_STATE_COMPACTION_INTERVAL', 3600)
+        self.vacuum = app.config.get('BRAIN_STATE_COMPACTION_VACUUM', False)
+        # With several Socket.IO workers only the first one runs the job
+        if self.enabled and app.config.get('SOCKETIO_WORKER_INDEX', 0) == 0:
+            socketio.start_background_task(self._run_periodically)
+
+    def cutoffs(self, now=None):
+        """
+        Oldest timestamps kept at full and at minute resolution
+
+        Returns:
+            tuple: (raw cutoff aligned to the minute, minute cutoff aligned to the hour)
+        """
+        now = now or datetime.utcnow()
+        return (_truncate(now - timedelta(days=self.raw_days), 'minute'),
+                _truncate(now - timedelta(days=self.minute_days), 'hour'))
+
+    def finest_bucket(self, session, child_id, start, end):
+        """
+        Finest series bucket a child's stored history in [start, end) supports
+
+        Looks for hourly summaries in the range, so the answer holds
+        whether compaction ran in the background or from the CLI.
+
+        Returns:
+            str: 'hour' when part of the range only survives as hourly
+            summaries, 'minute' otherwise
+        """
+        hourly = session.execute(select(exists().where(
+            summaries.c.child_id == child_id,
+            summaries.c.resolution == 'hour',
+            summaries.c.bucket_start >= _truncate(start, 'hour'),
+            summaries.c.bucket_start < end
+        ))).scalar()
+        return 'hour' if hourly else 'minute'
+
+    def run(self, now=None, vacuum=None):
+        """
+        Apply the retention policy once
+
+        Args:
+            now (datetime): Reference time for the cutoffs, default utcnow
+            vacuum (bool): VACUUM SQLite afterwards, default
+                BRAIN_STATE_COMPACTION_VACUUM
+
+        Returns:
+            dict: Rows compacted into minute and hour summaries, and batches used
+        """
+        raw_cutoff, minute_cutoff = self.cutoffs(now)
+        stats = {'raw_rows': 0, 'minute_rows': 0, 'batches': 0}
+
+        engine = engine_profile.write_engine()
+        with db.engine.connect() as connection:
+            child_ids = connection.execute(
+                select(BrainState.child_id).where(BrainState.timestamp < raw_cutoff).distinct()
+            ).scalars().all()
+        for child_id in child_ids:
+            while True:
+                with engine.begin() as connection:
+                    compacted = self._compact_raw(connection, child_id, raw_cutoff)
+                if not compacted:
+                    break
+                stats['raw_rows'] += compacted
+                stats['batches'] += 1
+
+        with db.engine.connect() as connection:
+            child_ids = connection.execute(
+                select(summaries.c.child_id).where(
+                    summaries.c.resolution == 'minute',
+                    summaries.c.bucket_start < minute_cutoff
+                ).distinct()
+            ).scalars().all()
+        for child_id in child_ids:
+            while True:
+                with engine.begin() as connection:
+                    compacted = self._compact_minutes(connection, child_id, minute_cutoff)
+                if not compacted:
+                    break
+                stats['minute_rows'] += compacted
+                stats['batches'] += 1
+
+        if stats['batches']:
+            self.maintain(self.vacuum if vacuum is None else vacuum)
+        self.runs += 1
+        self.last_run = datetime.utcnow()
+        return stats
+
+    def _compact_raw(self, connection, child_id, cutoff):
+        rows = connection.execute(
+            select(BrainState.id, BrainState.timestamp, BrainState.state, BrainState.source,
+                   BrainState.frequency)
+            .where(BrainState.child_id == child_id, BrainState.timestamp < cutoff)
+            .order_by(BrainState.timestamp)
+            .limit(self.batch_size)
+        ).all()
+        if not rows:
+            return 0
+
+        folded = {}
+        for _, timestamp, state, source, frequency in rows:
+            key = (child_id, 'minute', _truncate(timestamp, 'minute'), state, source or 'eeg')
+            _fold(folded, key, 1, frequency or 0.0, 1 if frequency is not None else 0)
+        _add_summaries(connection, folded)
+        connection.execute(delete(BrainState.__table__).where(BrainState.id.in_([row[0] for row in rows])))
+        return len(rows)
+
+    def _compact_minutes(self, connection, child_id, cutoff):
+        rows = connection.execute(
+            select(summaries.c.id, summaries.c.bucket_start, summaries.c.state, summaries.c.source,
+                   summaries.c.sample_count, summaries.c.frequency_sum, summaries.c.frequency_count)
+            .where(summaries.c.child_id == child_id, summaries.c.resolution == 'minute',
+                   summaries.c.bucket_start < cutoff)
+            .order_by(summaries.c.bucket_start)
+            .limit(self.batch_size)
+        ).all()
+        if not rows:
+            return 0
+
+        folded = {}
+        for _, bucket_start, state, source, sample_count, frequency_sum, frequency_count in rows:
+            key = (child_id, 'hour', _truncate(bucket_start, 'hour'), state, source)
+            _fold(folded, key, sample_count, frequency_sum, frequency_count)
+        _add_summaries(connection, folded)
+        connection.execute(delete(summaries).where(summaries.c.id.in_([row[0] for row in rows])))
+        return len(rows)
+
+    def maintain(self, vacuum=False):
+        """
+        Refresh planner statistics, and on SQLite optionally VACUUM
+
+        Both go through the write engine, so with the single SQLite writer
+        they queue behind (and hold up) other writes instead of racing them.
+        """
+        engine = engine_profile.write_engine()
+        with engine.begin() as connection:
+            connection.execute(text('ANALYZE'))
+        if vacuum and engine.dialect.name == 'sqlite':
+            # VACUUM cannot run inside a transaction, so bypass the begin handling
+            connection = engine.raw_connection()
+            try:
+                connection.cursor().execute('VACUUM')
+            finally:
+                connection.close()
+
+    def _run_periodically(self):
+        while True:
+            socketio.sleep(self.interval)
+            try:
+                with self.app.app_context():
+                    stats = self.run()
+                logger.info('Brain state compaction: %s', stats)
+            except Exception:
+                logger.exception('Brain state compaction failed')
+
+
+brain_state_compactor = BrainStateCompactor()
@@ -0,0 +1,249 @@
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from sqlalchemy import case, func, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+from app.models import (ActivityLog, BrainState, BrainStateEpisode, BrainStateSummary,
+                        DailyRollup, MoodLog)
+
+rollups = DailyRollup.__table__
+
+BRAIN_STATE = 'brain_state'
+ACTIVITY = 'activity'
+MOOD = 'mood'
+
+KEY = ('child_id', 'day', 'metric', 'dimension')
+
+
+def rollup_row(child_id, timestamp, metric, dimension, seconds=0.0, value=None, count=1):
+    """
+    One increment to a daily rollup
+
+    Args:
+        child_id (int): Child the event belongs to
+        timestamp (datetime): UTC time of the event, selects the day
+        metric (str): BRAIN_STATE, ACTIVITY or MOOD
+        dimension: Brain state, activity type or mood
+        seconds (float): Time to add
+        value (float): Frequency, completion rate or intensity, if any
+        count (int): Events to add
+
+    Returns:
+        dict: Increment for record()
+    """
+    return {
+        'child_id': child_id,
+        'day': timestamp.date() if isinstance(timestamp, datetime) else timestamp,
+        'metric': metric,
+        'dimension': str(dimension),
+        'count': count,
+        'seconds': float(seconds or 0.0),
+        'value_sum': float(value) if value is not None else 0.0,
+        'value_count': 1 if value is not None else 0,
+        'value_max': float(value) if value is not None else None
+    }
+
+
+def _merge(into, row):
+    into['count'] += row['count']
+    into['seconds'] += row['seconds']
+    into['value_sum'] += row['value_sum']
+    into['value_count'] += row['value_count']
+    if row['value_max'] is not None and (into['value_max'] is None or row['value_max'] > into['value_max']):
+        into['value_max'] = row['value_max']
+
+
+def upsert(connection, table, rows, index_elements, updates):
+    """
+    Insert rows, folding each into the existing row with the same key
+
+    PostgreSQL and SQLite get one INSERT ... ON CONFLICT DO UPDATE. Other
+    databases update each row and insert it where nothing matched, which
+    is only safe while one writer at a time touches a key.
+
+    Args:
+        connection: SQLAlchemy connection inside an open transaction
+        table (Table): Target table
+        rows (list): Dicts of column values
+        index_elements (list): Columns of the unique key
+        updates: Function of `excluded` (the incoming row's values as
+            attributes) returning the SET clause for an existing row
+    """
+    if connection.dialect.name in ('postgresql', 'sqlite'):
+        dialect = postgresql if connection.dialect.name == 'postgresql' else sqlite
+        insert = dialect.insert(table)
+        connection.execute(
+            insert.on_conflict_do_update(index_elements=index_elements, set_=updates(insert.excluded)),
+            rows
+        )
+    else:
+        _update_or_insert(connection, table, rows, index_elements, updates)
+
+
+def _update_or_insert(connection, table, rows, index_elements, updates):
+    for row in rows:
+        excluded = SimpleNamespace(**{name: literal(value, table.c[name].type) for name, value in row.items()})
+        updated = connection.execute(
+            table.update()
+            .where(*(table.c[name] == row[name] for name in index_elements))
+            .values(updates(excluded))
+        )
+        if updated.rowcount == 0:
+            connection.execute(table.insert().values(row))
+
+
+def record(connection, rows):
+    """
+    Add increments to the daily rollups in the caller's transaction
+
+    Increments for the same (child, day, metric, dimension) are merged
+    first, then added onto the stored rows with upsert().
+
+    Args:
+        connection: SQLAlchemy connection inside an open transaction
+        rows (list): Increments built with rollup_row()
+    """
+    merged = {}
+    for row in rows:
+        key = tuple(row[k] for k in KEY)
+        if key in merged:
+            _merge(merged[key], row)
+        else:
+            merged[key] = dict(row)
+    if not merged:
+        return
+
+    upsert(connection, rollups, list(merged.values()), list(KEY), lambda excluded: {
+        'count': rollups.c.count + excluded.count,
+        'seconds': rollups.c.seconds + excluded.seconds,
+        'value_sum': rollups.c.value_sum + excluded.value_sum,
+        'value_count': rollups.c.value_count + excluded.value_count,
+        'value_max': case(
+            (rollups.c.value_max.is_(None), excluded.value_max),
+            (excluded.value_max > rollups.c.value_max, excluded.value_max),
+            else_=rollups.c.value_max
+        )
+    })
+
+
+def totals(session, child_id, metric, since=None):
+    """
+    Sum a child's rollups per dimension
+
+    Args:
+        session: SQLAlchemy session or connection
+        child_id (int): Child to read
+        metric (str): BRAIN_STATE, ACTIVITY or MOOD
+        since (date): First day to include, all history when None
+
+    Returns:
+        list: Rows with dimension, count, seconds, value_sum, value_count, value_max
+    """
+    query = select(
+        rollups.c.dimension,
+        func.sum(rollups.c.count).label('count'),
+        func.sum(rollups.c.seconds).label('seconds'),
+        func.sum(rollups.c.value_sum).label('value_sum'),
+        func.sum(rollups.c.value_count).label('value_count'),
+        func.max(rollups.c.value_max).label('value_max')
+    ).where(
+        rollups.c.child_id == child_id,
+        rollups.c.metric == metric
+    ).group_by(rollups.c.dimension)
+    if since is not None:
+        query = query.where(rollups.c.day >= since)
+    return session.execute(query).all()
+
+
+def _day(value):
+    # func.date() gives a string on SQLite and a date on PostgreSQL
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _grouped(connection, model, time_column, dimension, metric, seconds=None, value=None):
+    day = func.date(time_column)
+    query = select(
+        model.child_id, day, dimension,
+        func.count(model.id),
+        func.sum(seconds) if seconds is not None else func.sum(0),
+        func.sum(value) if value is not None else func.sum(0),
+        func.count(value) if value is not None else func.sum(0),
+        func.max(value) if value is not None else func.max(None)
+    ).group_by(model.child_id, day, dimension)
+    for child_id, day_value, dim, count, secs, value_sum, value_count, value_max in connection.execute(query):
+        yield {
+            'child_id': child_id, 'day': _day(day_value), 'metric': metric, 'dimension': str(dim),
+            'count': count, 'seconds': float(secs or 0.0), 'value_sum': float(value_sum or 0.0),
+            'value_count': value_count or 0, 'value_max': value_max
+        }
+
+
+def _episode_rows(connection, update_interval):
+    """Split each episode's duration over the UTC days it covers"""
+    interval = timedelta(seconds=update_interval)
+    query = select(
+        BrainStateEpisode.child_id, BrainStateEpisode.state, BrainStateEpisode.start_time,
+        BrainStateEpisode.end_time, BrainStateEpisode.sample_count, BrainStateEpisode.mean_frequency
+    )
+    for child_id, state, start, end, sample_count, mean_frequency in connection.execute(query).yield_per(1000):
+        row = rollup_row(child_id, start, BRAIN_STATE, state, count=sample_count)
+        if mean_frequency is not None:
+            # Per-reading frequencies are gone, the mean stands in for them (and for the max)
+            row.update(value_sum=mean_frequency * sample_count, value_count=sample_count,
+                       value_max=mean_frequency)
+        yield row
+        end += interval
+        while start < end:
+            midnight = datetime.combine(start.date() + timedelta(days=1), datetime.min.time())
+            stop = min(end, midnight)
+            yield rollup_row(child_id, start, BRAIN_STATE, state,
+                             seconds=(stop - start).total_seconds(), count=0)
+            start = stop
+
+
+def _summary_rows(connection, update_interval):
+    """Readings folded into compacted summaries, one interval each"""
+    day = func.date(BrainStateSummary.bucket_start)
+    query = select(
+        BrainStateSummary.child_id, day, BrainStateSummary.state,
+        func.sum(BrainStateSummary.sample_count),
+        func.sum(BrainStateSummary.frequency_sum),
+        func.sum(BrainStateSummary.frequency_count)
+    ).group_by(BrainStateSummary.child_id, day, BrainStateSummary.state)
+    for child_id, day_value, state, count, freq_sum, freq_count in connection.execute(query):
+        # The per-reading maximum frequency does not survive compaction
+        yield {
+            'child_id': child_id, 'day': _day(day_value), 'metric': BRAIN_STATE, 'dimension': state,
+            'count': count, 'seconds': float(count * update_interval), 'value_sum': float(freq_sum or 0.0),
+            'value_count': freq_count or 0, 'value_max': None
+        }
+
+
+def backfill(connection, update_interval):
+    """
+    Rebuild every daily rollup from the raw tables
+
+    Brain state time counts each BrainState sample, live or folded into a
+    compacted summary, as one update interval and each episode as
+    (end - start) + one interval, matching how the rows are credited when
+    they are written. Run it in one transaction,
+    with ingest paused, to avoid double counting writes that land meanwhile.
+
+    Args:
+        connection: SQLAlchemy connection inside an open transaction
+        update_interval (float): Seconds one brain state reading covers
+
+    Returns:
+        int: Rollup rows written
+    """
+    connection.execute(rollups.delete())
+    rows = []
+    rows.extend(_grouped(connection, BrainState, BrainState.timestamp, BrainState.state, BRAIN_STATE,
+                         seconds=literal(float(update_interval)), value=BrainState.frequency))
+    rows.extend(_summary_rows(connection, update_interval))
+    rows.extend(_episode_rows(connection, update_interval))
+    rows.extend(_grouped(connection, ActivityLog, ActivityLog.timestamp, ActivityLog.activity_type, ACTIVITY,
+                         seconds=ActivityLog.duration_seconds, value=ActivityLog.completion_rate))
+    rows.extend(_grouped(connection, MoodLog, MoodLog.timestamp, MoodLog.mood, MOOD,
+                         value=MoodLog.intensity))
+    record(connection, rows)
+    return connection.execute(select(func.count()).select_from(rollups)).scalar()
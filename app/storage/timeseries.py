@@ -0,0 +1,235 @@
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import func, select
+from config import Config
+from app.models import ActivityLog, BrainState, BrainStateEpisode, BrainStateSummary, MoodLog
+from app.storage import rollups
+
+BUCKET_SECONDS = {'minute': 60, 'hour': 3600, 'day': 86400}
+
+_SQLITE_FORMATS = {'minute': '%Y-%m-%d %H:%M:00', 'hour': '%Y-%m-%d %H:00:00', 'day': '%Y-%m-%d 00:00:00'}
+
+
+def effective_bucket(bucket, start, end, max_buckets, finest='minute'):
+    """
+    Coarsen a bucket size until the range fits in `max_buckets` buckets
+
+    `finest` raises the floor, e.g. to 'hour' when part of the range has
+    been compacted to hourly summaries.
+
+    Returns:
+        str: 'minute', 'hour' or 'day'
+    """
+    sizes = list(BUCKET_SECONDS)
+    index = max(sizes.index(bucket), sizes.index(finest))
+    span = (end - start).total_seconds()
+    while index < len(sizes) - 1 and span / BUCKET_SECONDS[sizes[index]] > max_buckets:
+        index += 1
+    return sizes[index]
+
+
+def bucket_column(column, bucket, dialect):
+    """SQL expression truncating a timestamp column to the start of its bucket"""
+    if dialect == 'postgresql':
+        return func.date_trunc(bucket, column)
+    return func.strftime(_SQLITE_FORMATS[bucket], column)
+
+
+def _as_datetime(value):
+    # strftime() gives strings on SQLite, date_trunc() datetimes on PostgreSQL
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value
+    return datetime.combine(value, datetime.min.time())
+
+
+def _dialect(session):
+    return session.get_bind().dialect.name
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling
+
+    Keeps the first and last points and, from each of `threshold - 2`
+    equal slices in between, the point forming the largest triangle with
+    the previously kept point and the mean of the next slice. Peaks and
+    state changes survive while flat stretches are thinned.
+
+    Args:
+        x (np.array): Increasing x values
+        y (np.array): y values
+        threshold (int): Points to keep
+
+    Returns:
+        np.array: Indices of the kept points
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    kept = np.empty(threshold, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_lo:next_hi].mean() if next_hi > next_lo else x[-1]
+        avg_y = y[next_lo:next_hi].mean() if next_hi > next_lo else y[-1]
+        area = np.abs(
+            (x[previous] - avg_x) * (y[lo:hi] - y[previous])
+            - (x[previous] - x[lo:hi]) * (avg_y - y[previous])
+        )
+        previous = lo + int(area.argmax())
+        kept[i + 1] = previous
+    return kept
+
+
+def brain_state_buckets(session, child_id, start, end, bucket):
+    """
+    Readings per bucket and brain state, with the mean frequency
+
+    Day buckets come from the daily rollups. Finer buckets are grouped in
+    SQL from BrainState rows plus the summaries compaction folded older
+    rows into, or from episodes (by their start time) when
+    BRAIN_STATE_STORAGE is 'episodes'.
+
+    Returns:
+        dict: {bucket start: {state: (count, frequency sum, frequency count)}}
+    """
+    if bucket == 'day':
+        table = rollups.rollups
+        query = select(
+            table.c.day, table.c.dimension, table.c.count, table.c.value_sum, table.c.value_count
+        ).where(
+            table.c.child_id == child_id,
+            table.c.metric == rollups.BRAIN_STATE,
+            table.c.day >= start.date(),
+            table.c.day <= (end - timedelta(microseconds=1)).date()
+        )
+    elif Config.BRAIN_STATE_STORAGE == 'episodes':
+        slot = bucket_column(BrainStateEpisode.start_time, bucket, _dialect(session))
+        query = select(
+            slot, BrainStateEpisode.state,
+            func.sum(BrainStateEpisode.sample_count),
+            func.sum(BrainStateEpisode.mean_frequency * BrainStateEpisode.sample_count),
+            func.sum(BrainStateEpisode.sample_count).filter(BrainStateEpisode.mean_frequency.isnot(None))
+        ).where(
+            BrainStateEpisode.child_id == child_id,
+            BrainStateEpisode.start_time >= start,
+            BrainStateEpisode.start_time < end
+        ).group_by(slot, BrainStateEpisode.state)
+    else:
+        slot = bucket_column(BrainState.timestamp, bucket, _dialect(session))
+        query = select(
+            slot, BrainState.state,
+            func.count(BrainState.id),
+            func.sum(BrainState.frequency),
+            func.count(BrainState.frequency)
+        ).where(
+            BrainState.child_id == child_id,
+            BrainState.timestamp >= start,
+            BrainState.timestamp < end
+        ).group_by(slot, BrainState.state)
+        summary_slot = bucket_column(BrainStateSummary.bucket_start, bucket, _dialect(session))
+        query = query.union_all(select(
+            summary_slot, BrainStateSummary.state,
+            func.sum(BrainStateSummary.sample_count),
+            func.sum(BrainStateSummary.frequency_sum),
+            func.sum(BrainStateSummary.frequency_count)
+        ).where(
+            BrainStateSummary.child_id == child_id,
+            BrainStateSummary.bucket_start >= start,
+            BrainStateSummary.bucket_start < end
+        ).group_by(summary_slot, BrainStateSummary.state))
+
+    buckets = {}
+    for slot_value, state, count, freq_sum, freq_count in session.execute(query):
+        # A bucket on a retention boundary has both live and summarized readings
+        states = buckets.setdefault(_as_datetime(slot_value), {})
+        previous = states.get(state, (0, 0.0, 0))
+        states[state] = (previous[0] + count, previous[1] + (freq_sum or 0.0), previous[2] + (freq_count or 0))
+    return buckets
+
+
+def brain_state_series(session, child_id, start, end, bucket, max_points):
+    """
+    Dominant brain state and mean frequency per bucket, downsampled
+
+    Both series are thinned with LTTB to at most `max_points`. The state
+    series uses the band order (delta=0 ... gamma=4) of the dominant state
+    as its y value, so state changes are the points it keeps.
+
+    Returns:
+        dict: 'states' and 'frequency' point lists
+    """
+    buckets = brain_state_buckets(session, child_id, start, end, bucket)
+    order = list(Config.BRAIN_STATES)
+    times = sorted(buckets)
+
+    state_points, freq_points, freq_x = [], [], []
+    for slot in times:
+        counts = buckets[slot]
+        dominant = max(counts, key=lambda state: counts[state][0])
+        freq_sum = sum(c[1] for c in counts.values())
+        freq_count = sum(c[2] for c in counts.values())
+        state_points.append({
+            't': slot.isoformat(),
+            'state': dominant,
+            'count': sum(c[0] for c in counts.values()),
+            'counts': {state: c[0] for state, c in counts.items()}
+        })
+        if freq_count:
+            freq_points.append({'t': slot.isoformat(), 'frequency': round(freq_sum / freq_count, 3)})
+            freq_x.append(slot.timestamp())
+
+    if len(state_points) > max_points:
+        x = np.array([slot.timestamp() for slot in times])
+        y = np.array([order.index(p['state']) if p['state'] in order else 0 for p in state_points], dtype=float)
+        state_points = [state_points[i] for i in lttb(x, y, max_points)]
+    if len(freq_points) > max_points:
+        y = np.array([p['frequency'] for p in freq_points])
+        freq_points = [freq_points[i] for i in lttb(np.array(freq_x), y, max_points)]
+
+    return {'states': state_points, 'frequency': freq_points}
+
+
+def mood_series(session, child_id, start, end, bucket):
+    """Mood counts and mean intensity per bucket, from column-only grouped selects"""
+    slot = bucket_column(MoodLog.timestamp, bucket, _dialect(session))
+    query = select(
+        slot, MoodLog.mood, func.count(MoodLog.id), func.avg(MoodLog.intensity)
+    ).where(
+        MoodLog.child_id == child_id,
+        MoodLog.timestamp >= start,
+        MoodLog.timestamp < end
+    ).group_by(slot, MoodLog.mood).order_by(slot)
+
+    points = {}
+    for slot_value, mood, count, intensity in session.execute(query):
+        point = points.setdefault(slot_value, {'t': _as_datetime(slot_value).isoformat(), 'moods': {}})
+        point['moods'][mood] = {'count': count,
+                                'avg_intensity': round(intensity, 2) if intensity is not None else None}
+    return list(points.values())
+
+
+def activity_series(session, child_id, start, end, bucket):
+    """Activity counts, time and mean completion per bucket"""
+    slot = bucket_column(ActivityLog.timestamp, bucket, _dialect(session))
+    query = select(
+        slot, func.count(ActivityLog.id), func.sum(ActivityLog.duration_seconds),
+        func.avg(ActivityLog.completion_rate)
+    ).where(
+        ActivityLog.child_id == child_id,
+        ActivityLog.timestamp >= start,
+        ActivityLog.timestamp < end
+    ).group_by(slot).order_by(slot)
+
+    return [{
+        't': _as_datetime(slot_value).isoformat(),
+        'count': count,
+        'duration_seconds': duration or 0,
+        'avg_completion': round(completion, 1) if completion is not None else None
+    } for slot_value, count, duration, completion in session.execute(query)]
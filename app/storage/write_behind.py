@@ -0,0 +1,208 @@
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from app import db, socketio
+
+logger = logging.getLogger(__name__)
+
+
+class BrainStateWriter:
+    """
+    Persistence layer for brain state readings
+
+    Readings are stored either as one BrainState row each
+    (BRAIN_STATE_STORAGE = 'samples') or folded into BrainStateEpisode runs
+    ('episodes'). Without write-behind every reading is written as it
+    arrives.
+
+    With BRAIN_STATE_WRITE_BEHIND, frames are queued in memory and written with one bulk INSERT when
+    BRAIN_STATE_FLUSH_SIZE rows are waiting or the oldest row is
+    BRAIN_STATE_FLUSH_INTERVAL_MS old, whichever comes first. Each child's
+    current_state is updated once per flush, to its newest queued state.
+    Rows still queued at shutdown are flushed by an atexit hook, so at most
+    one durability window of frames is lost on a hard crash.
+
+    A failed flush puts its rows back at the front of the queue. After
+    BRAIN_STATE_FLUSH_RETRIES failures in a row they are written one by
+    one instead, and rows that still fail are logged and dropped, so one
+    bad row cannot hold every newer reading back. The queue holds at most
+    BRAIN_STATE_BUFFER_MAX rows; readings arriving while it is full are
+    dropped with a warning, and add() returns None for them.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self.storage = 'samples'
+        self.update_interval = 1
+        self._queue = []
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.flush_retries = 3
+        self.buffer_max = 10000
+        self._failures = 0
+        self._started = False
+        self.flushes = 0
+        self.rows_written = 0
+        self.dropped = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('BRAIN_STATE_WRITE_BEHIND', False)
+        self.flush_size = app.config.get('BRAIN_STATE_FLUSH_SIZE', 200)
+        self.flush_interval = app.config.get('BRAIN_STATE_FLUSH_INTERVAL_MS', 1000) / 1000
+        self.storage = app.config.get('BRAIN_STATE_STORAGE', 'samples')
+        if self.storage not in ('samples', 'episodes'):
+            raise ValueError(f'Unknown BRAIN_STATE_STORAGE: {self.storage}')
+        self.episode_max_gap = timedelta(seconds=app.config.get('BRAIN_STATE_EPISODE_MAX_GAP', 60))
+        self.update_interval = app.config.get('EEG_UPDATE_INTERVAL', 1)
+        self.flush_retries = app.config.get('BRAIN_STATE_FLUSH_RETRIES', 3)
+        self.buffer_max = app.config.get('BRAIN_STATE_BUFFER_MAX', 10000)
+        # The flusher and exit hook only read self.app, so one of each serves every init_app
+        if self.enabled and not self._started:
+            self._started = True
+            socketio.start_background_task(self._flush_periodically)
+            atexit.register(self.flush)
+
+    def add(self, child_id, state, frequency=None, source='eeg', timestamp=None):
+        """
+        Store a brain state reading, or queue it when write-behind is on
+
+        Returns:
+            dict: The reading, including the timestamp it is stored with,
+            or None when the queue was full and it was dropped
+        """
+        row = {
+            'child_id': child_id,
+            'state': state,
+            'frequency': frequency,
+            'source': source,
+            'timestamp': timestamp or datetime.utcnow()
+        }
+        if not self.enabled:
+            self.write([row])
+            return row
+
+        with self._lock:
+            if len(self._queue) >= self.buffer_max:
+                self._drop(1, 'buffer full')
+                return None
+            if not self._queue:
+                self._oldest = time.monotonic()
+            self._queue.append(row)
+            full = len(self._queue) >= self.flush_size
+        if full:
+            self.flush()
+        return row
+
+    def pending(self):
+        """Number of rows waiting to be written"""
+        return len(self._queue)
+
+    def flush(self):
+        """
+        Write every queued row now
+
+        Returns:
+            int: Number of rows written
+        """
+        with self._flush_lock:
+            with self._lock:
+                rows, self._queue = self._queue, []
+                self._oldest = None
+            if not rows:
+                return 0
+
+            try:
+                with self.app.app_context():
+                    self.write(rows)
+            except Exception:
+                self._failures += 1
+                if self._failures < self.flush_retries:
+                    logger.exception('Brain state flush failed (%d/%d), re-queueing %d rows',
+                                     self._failures, self.flush_retries, len(rows))
+                    with self._lock:
+                        self._queue[:0] = rows
+                        overflow = len(self._queue) - self.buffer_max
+                        if overflow > 0:
+                            del self._queue[-overflow:]
+                            self._drop(overflow, 'buffer full after re-queue')
+                        self._oldest = time.monotonic()
+                    return 0
+                logger.exception('Brain state flush failed %d times, writing %d rows one by one',
+                                 self._failures, len(rows))
+                rows = self._salvage(rows)
+
+            self._failures = 0
+            self.flushes += 1
+            self.rows_written += len(rows)
+            return len(rows)
+
+    def _salvage(self, rows):
+        """Write rows individually, dropping the ones that fail, and return the written ones"""
+        written = []
+        with self.app.app_context():
+            for row in rows:
+                try:
+                    self.write([row])
+                except Exception:
+                    logger.exception('Dropping brain state row that cannot be written: %r', row)
+                    self.dropped += 1
+                else:
+                    written.append(row)
+        return written
+
+    def _drop(self, count, reason):
+        # Warn on the first drop and then once per 1000
+        if self.dropped == 0 or self.dropped // 1000 != (self.dropped + count) // 1000:
+            logger.warning('Dropping brain state rows (%s), %d dropped so far', reason, self.dropped + count)
+        self.dropped += count
+
+    def write(self, rows):
+        """Store readings, their daily rollups and each child's current_state in one transaction"""
+        from app.models import BrainState, Child
+        from app.storage import rollups
+        from app.storage.engine import engine_profile
+        from app.storage.episodes import append_episodes
+        from app.storage.result_cache import analytics_cache
+
+        latest = {}
+        for row in rows:
+            latest[row['child_id']] = row['state']
+
+        with engine_profile.write_engine().begin() as connection:
+            if self.storage == 'episodes':
+                credits = append_episodes(connection, rows, self.episode_max_gap,
+                                          timedelta(seconds=self.update_interval))
+            else:
+                connection.execute(BrainState.__table__.insert(), rows)
+                credits = [(row, self.update_interval) for row in rows]
+            rollups.record(connection, [
+                rollups.rollup_row(row['child_id'], row['timestamp'], rollups.BRAIN_STATE, row['state'],
+                                   seconds=seconds, value=row['frequency'])
+                for row, seconds in credits
+            ])
+            connection.execute(
+                Child.__table__.update()
+                .where(Child.__table__.c.id == db.bindparam('child_id'))
+                .values(current_state=db.bindparam('state')),
+                [{'child_id': child_id, 'state': state} for child_id, state in latest.items()]
+            )
+
+        for child_id in latest:
+            analytics_cache.invalidate(child_id, 'analytics')
+
+    def _flush_periodically(self):
+        while True:
+            socketio.sleep(self.flush_interval / 2)
+            oldest = self._oldest
+            if oldest is not None and time.monotonic() - oldest >= self.flush_interval:
+                self.flush()
+
+
+brain_state_writer = BrainStateWriter()
@@ -0,0 +1,181 @@
+"""
+Microbenchmarks for app/eeg_processor
+
+Sweeps window length, sampling rate, channel count and batch size over
+the classifier stages, recording time per call and peak traced
+allocations. Runs offline on synthetic signals, no database or server.
+
+    python -m benchmarks.eeg_dsp --output bench.json
+    python -m benchmarks.eeg_dsp --compare bench.json --threshold 0.15
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+import scipy
+from scipy import signal
+
+from app.eeg_processor.classifier import EEGClassifier
+from app.eeg_processor.fast_path import FastSpectrumPath
+from app.eeg_processor.synthetic import SyntheticEEG
+
+WINDOWS = (256, 1024, 4096, 16384)
+SAMPLING_RATES = (128, 256, 512)
+CHANNELS = (1, 8, 16)
+BATCHES = (1, 4, 16)
+
+QUICK_WINDOWS = (256, 4096)
+QUICK_SAMPLING_RATES = (256,)
+QUICK_CHANNELS = (8,)
+QUICK_BATCHES = (4,)
+
+
+def measure(fn, min_time=0.2, max_repeats=2000):
+    """
+    Time a callable and trace its peak allocation
+
+    Returns:
+        dict: median and min microseconds per call, repeats, peak KiB
+    """
+    fn()  # warm caches (filter bank, band projections, workspaces)
+
+    timings = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < max_repeats and (len(timings) < 5 or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = np.asarray(timings) * 1e6
+    return {
+        'median_us': round(float(np.median(timings)), 2),
+        'min_us': round(float(timings.min()), 2),
+        'repeats': len(timings),
+        'peak_kib': round(peak / 1024, 2)
+    }
+
+
+def single_signal_cases(classifier, fast_path, windows, sampling_rates):
+    """Stages of process_eeg_signal on one 1-D window"""
+    for fs in sampling_rates:
+        for n in windows:
+            raw = SyntheticEEG(sampling_rate=fs, seed=n).generate(n).astype(float)
+            sos = classifier.filter_bank.get_sos(fs, classifier.filter_band, classifier.filter_order)
+            filtered = signal.sosfiltfilt(sos, raw)
+            frequencies, _ = classifier.band_projection(n, fs)
+            power = np.abs(np.fft.rfft(filtered)[1:frequencies.size + 1]) ** 2
+            dominant = float(frequencies[np.argmax(power)])
+            yield from _stage_cases(classifier, fast_path, raw, filtered, frequencies, power,
+                                    dominant, sos, fs, f'n={n},fs={fs}')
+
+
+def _stage_cases(classifier, fast_path, raw, filtered, frequencies, power, dominant, sos, fs, tag):
+    yield f'filter[{tag}]', lambda: signal.sosfiltfilt(sos, raw)
+    yield f'analyze_spectrum[{tag}]', lambda: classifier.analyze_spectrum(filtered, fs)
+    yield f'calculate_band_powers[{tag}]', lambda: classifier.calculate_band_powers(frequencies, power)
+    yield f'classify_frequency[{tag}]', lambda: classifier.classify_frequency(dominant)
+    yield f'process_eeg_signal[{tag}]', lambda: classifier.process_eeg_signal(raw, fs)
+    yield f'fast_path[{tag}]', lambda: fast_path.process(raw, fs)
+
+
+def batch_cases(classifier, windows, channels, batches, fs):
+    """process_batch over (windows x channels x samples) arrays"""
+    for n in windows:
+        for ch in channels:
+            for batch in batches:
+                generator = SyntheticEEG(sampling_rate=fs, seed=n + ch)
+                data = np.stack([
+                    np.stack([generator.generate(n) for _ in range(ch)]) for _ in range(batch)
+                ]).astype(float)
+                if batch == 1:
+                    data = data[0]
+                yield f'process_batch[n={n},fs={fs},ch={ch},batch={batch}]', \
+                    lambda data=data: classifier.process_batch(data, fs)
+
+
+def run(quick=False, min_time=0.2):
+    classifier = EEGClassifier()
+    fast_path = FastSpectrumPath(classifier)
+    windows = QUICK_WINDOWS if quick else WINDOWS
+    sampling_rates = QUICK_SAMPLING_RATES if quick else SAMPLING_RATES
+    channels = QUICK_CHANNELS if quick else CHANNELS
+    batches = QUICK_BATCHES if quick else BATCHES
+
+    results = {}
+    cases = list(single_signal_cases(classifier, fast_path, windows, sampling_rates))
+    cases += list(batch_cases(classifier, windows, channels, batches, classifier.sampling_rate))
+    for name, fn in cases:
+        results[name] = measure(fn, min_time)
+        print(f'{name:60s} {results[name]["median_us"]:>12.1f} us {results[name]["peak_kib"]:>10.1f} KiB',
+              file=sys.stderr)
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'scipy': scipy.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'quick': quick,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S')
+        },
+        'results': results
+    }
+
+
+def compare(current, baseline, threshold):
+    """
+    Flag cases slower or hungrier than the baseline by more than `threshold`
+
+    Returns:
+        list: (case, metric, baseline value, current value) per regression
+    """
+    regressions = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        for metric in ('median_us', 'peak_kib'):
+            if base[metric] > 0 and result[metric] > base[metric] * (1 + threshold):
+                regressions.append((name, metric, base[metric], result[metric]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', help='Write results to this JSON file')
+    parser.add_argument('--compare', help='Baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='Allowed relative slowdown/growth before flagging (default 0.15)')
+    parser.add_argument('--quick', action='store_true', help='Reduced sweep')
+    parser.add_argument('--min-time', type=float, default=0.2, help='Seconds to time each case')
+    args = parser.parse_args(argv)
+
+    current = run(args.quick, args.min_time)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        for name, metric, before, after in regressions:
+            print(f'REGRESSION {name} {metric}: {before} -> {after} '
+                  f'(+{(after / before - 1) * 100:.0f}%)')
+        if regressions:
+            return 1
+        print(f'No regressions beyond {args.threshold:.0%}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -8,16 +8,90 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'autism_platform.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Migrations and backfills run with `flask schema upgrade`; set this to also apply them in create_app.
+    # Off by default so importing the app (e.g. for a CLI command) never rewrites the database
+    SCHEMA_AUTO_UPGRADE = os.environ.get('SCHEMA_AUTO_UPGRADE', '').lower() in ('1', 'true', 'yes')
+    
+    # Engine profile, picked by the URL: PostgreSQL (postgresql://...) uses a plain pool; file-based
+    # SQLite gets these pragmas on every connection and, with SINGLE_WRITER, one queued writer connection
+    DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE', 5))  # read connections
+    DATABASE_MAX_OVERFLOW = 10
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',  # readers no longer block the writer
+        'synchronous': 'NORMAL',  # fsync at checkpoints only, safe with WAL
+        'busy_timeout': 5000,  # ms to wait for a lock held by another process
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -32 * 1024,  # negative means KiB, per connection
+    }
+    SQLITE_SINGLE_WRITER = True
+    SQLITE_WRITE_TIMEOUT = 30  # seconds a write waits for the writer connection
+    
+    # Brain state storage: 'samples' (one row per frame) or 'episodes' (one row per run of a state)
+    BRAIN_STATE_STORAGE = os.environ.get('BRAIN_STATE_STORAGE') or 'samples'
+    BRAIN_STATE_EPISODE_MAX_GAP = 60  # seconds of silence that close an episode
+    
+    # Write-behind for brain state rows: bulk insert every N rows or T ms
+    BRAIN_STATE_WRITE_BEHIND = os.environ.get('BRAIN_STATE_WRITE_BEHIND', '').lower() in ('1', 'true', 'yes')
+    BRAIN_STATE_FLUSH_SIZE = 200  # rows
+    BRAIN_STATE_FLUSH_INTERVAL_MS = 1000  # durability window
+    BRAIN_STATE_FLUSH_RETRIES = 3  # failed flushes before rows are written one by one and bad ones dropped
+    BRAIN_STATE_BUFFER_MAX = 10000  # queued rows; readings beyond this are dropped
+    
+    # Retention: full resolution for RAW_DAYS, per-minute summaries to MINUTE_DAYS, per-hour after that
+    BRAIN_STATE_COMPACTION = os.environ.get('BRAIN_STATE_COMPACTION', '').lower() in ('1', 'true', 'yes')
+    BRAIN_STATE_RAW_DAYS = 7
+    BRAIN_STATE_MINUTE_DAYS = 90
+    BRAIN_STATE_COMPACTION_BATCH = 5000  # rows per transaction
+    BRAIN_STATE_COMPACTION_INTERVAL = 3600  # seconds between background runs
+    BRAIN_STATE_COMPACTION_VACUUM = False  # SQLite only; holds the write lock for the whole rewrite
+    
+    # brain_state_update broadcasting: send on change or heartbeat, coalesce bursts per room
+    BRAIN_STATE_HEARTBEAT_SECONDS = 10
+    BRAIN_STATE_COALESCE_MS = 250
+    
+    # Per-child cache of computed dashboard/analytics results, dropped on writes
+    ANALYTICS_CACHE_SIZE = 512  # entries, least recently used evicted first
+    ANALYTICS_CACHE_TTL = 60  # seconds, bounds staleness from writes in other workers
+    
+    # Time-range analytics API: finer buckets are coarsened past MAX_BUCKETS, series thinned to MAX_POINTS
+    ANALYTICS_SERIES_MAX_BUCKETS = 2000
+    ANALYTICS_SERIES_MAX_POINTS = 1000
     
     # Session configuration
     PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
     
     # SocketIO configuration
     SOCKETIO_ASYNC_MODE = 'eventlet'
+    # Multi-process mode: workers share rooms and emits through a message queue
+    # (redis://..., amqp://..., or local://<name> for in-process tests)
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+    SOCKETIO_CHANNEL = 'autism-platform'
+    SOCKETIO_WORKERS = int(os.environ.get('SOCKETIO_WORKERS') or 1)
+    SOCKETIO_WORKER_INDEX = int(os.environ.get('SOCKETIO_WORKER_INDEX') or 0)
+    SOCKETIO_WORKER_BASE_PORT = int(os.environ.get('SOCKETIO_WORKER_BASE_PORT') or 5000)  # worker i listens on base + i
     
     # EEG Configuration
     EEG_SAMPLING_RATE = 256  # Hz
     EEG_UPDATE_INTERVAL = 1  # seconds
+    EEG_FILTER_BAND = (0.5, 50)  # Hz, bandpass applied before the FFT
+    EEG_FILTER_ORDER = 4
+    EEG_FAST_PATH = os.environ.get('EEG_FAST_PATH', '').lower() in ('1', 'true', 'yes')  # float32 rfft path
+    
+    # Streaming ingest: devices send only new samples, classified from a sliding window
+    EEG_STREAM_WINDOW = 512  # samples kept per child (2 s at 256 Hz)
+    EEG_STREAM_HOP = 64  # new samples between classifications
+    EEG_STREAM_IDLE_TIMEOUT = 300  # seconds before an idle child's stream is dropped
+    
+    # Raw EEG archive: per-child float32 segment files, read back through np.memmap
+    EEG_ARCHIVE_ENABLED = os.environ.get('EEG_ARCHIVE_ENABLED', '').lower() in ('1', 'true', 'yes')
+    EEG_ARCHIVE_DIR = os.environ.get('EEG_ARCHIVE_DIR') or os.path.join(basedir, 'eeg_archive')
+    EEG_ARCHIVE_SEGMENT_SECONDS = 3600
+    EEG_REPROCESS_BATCH = 1024  # windows classified per process_batch call when reprocessing
+    
+    # DSP executor: keeps filtering/FFT work off the eventlet hub
+    EEG_DSP_EXECUTOR = os.environ.get('EEG_DSP_EXECUTOR') or 'tpool'  # inline, tpool or process
+    EEG_DSP_WORKERS = int(os.environ.get('EEG_DSP_WORKERS') or 4)
+    EEG_DSP_MAX_PENDING = 64  # jobs queued or running before ingest answers 503
     
     # Brain State Thresholds
     BRAIN_STATES = {
@@ -1,8 +1,10 @@
 from app import create_app, socketio, db
-from app.models import User, Child, Content
+from app.models import User, Child, Content, ContentState
 from flask import redirect, url_for
 import os
 from app.models import Quiz, QuizQuestion, QuizAttempt
+from app.realtime.serve import serve_workers
+from config import Config
 
 app = create_app()
 
@@ -19,6 +21,7 @@ def init_sample_data():
     """Initialize sample content for testing"""
     with app.app_context():
         # Clear existing content (optional - remove these lines if you want to keep existing data)
+        ContentState.query.delete()
         Content.query.delete()
         db.session.commit()
         
@@ -378,7 +381,11 @@ if __name__ == '__main__':
     init_sample_data()
     init_sample_quizzes()  # Add this line
     print(" * Starting Autism Assistive Platform")
-    socketio.run(app, debug=True, host='0.0.0.0', port=5000)
+    if Config.SOCKETIO_WORKERS > 1:
+        # Workers never migrate, see serve_workers
+        serve_workers(Config.SOCKETIO_WORKERS)
+    else:
+        socketio.run(app, debug=True, host='0.0.0.0', port=5000)
 
 
 # if __name__ == '__main__':
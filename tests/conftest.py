@@ -0,0 +1,29 @@
+import pytest
+from config import Config
+from app import create_app, db
+
+
+class TestConfig(Config):
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
+@pytest.fixture
+def app():
+    app = create_app(TestConfig)
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+@pytest.fixture
+def login(app):
+    """Log a test client in as a user, returns the client"""
+    def login_as(user_id):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+        return client
+    return login_as
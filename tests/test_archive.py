@@ -0,0 +1,59 @@
+import json
+from datetime import datetime
+import numpy as np
+import pytest
+from app.eeg_processor.archive import EEGArchive
+from app.eeg_processor.classifier import EEGClassifier
+from app.eeg_processor.synthetic import SyntheticEEG, state_mixture
+
+SAMPLING_RATE = 256
+START = 1_700_000_000.0
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = EEGArchive(str(tmp_path))
+    generator = SyntheticEEG(state_mixture('alpha'), SAMPLING_RATE, seed=1)
+    # Ten one-second chunks, appended as a streaming device would
+    for second in range(10):
+        archive.append(3, generator.generate(SAMPLING_RATE), SAMPLING_RATE, timestamp=START + second)
+    return archive
+
+
+def test_read_round_trips_samples(archive):
+    (view_start, sampling_rate, samples), = archive.read(3)
+    assert view_start == START
+    assert sampling_rate == SAMPLING_RATE
+    assert samples.dtype == np.float32 and samples.size == 10 * SAMPLING_RATE
+
+    (view_start, _, part), = archive.read(3, START + 2, START + 4)
+    assert view_start == START + 2
+    np.testing.assert_array_equal(part, samples[2 * SAMPLING_RATE:4 * SAMPLING_RATE])
+
+
+def test_reprocess_batches_match_one_call(archive):
+    classifier = EEGClassifier()
+    batches = list(archive.reprocess(3, classifier, window_size=512, hop_size=128, batch_size=7))
+    (whole_times, whole), = archive.reprocess(3, classifier, window_size=512, hop_size=128, batch_size=10**6)
+
+    assert [len(times) for times, _ in batches] == [7, 7, 3]
+    np.testing.assert_array_equal(np.concatenate([times for times, _ in batches]), whole_times)
+    assert np.concatenate([result['brain_state'] for _, result in batches]).tolist() == whole['brain_state'].tolist()
+
+
+def test_reprocess_command_writes_ndjson(app, archive, tmp_path):
+    output = tmp_path / 'states.ndjson'
+    result = app.test_cli_runner().invoke(args=[
+        'child', 'reprocess', '3', '--archive-dir', archive.root, '--window', '512',
+        '--batch-size', '4', '--from', '2023-11-14 22:13:22', '--output', str(output)
+    ])
+    assert result.exit_code == 0, result.output
+
+    lines = [json.loads(line) for line in output.read_text().splitlines()]
+    # Windows start at 22:13:22 (two seconds in), one every 512 samples
+    assert len(lines) == 4
+    assert lines[0]['timestamp'] == datetime.utcfromtimestamp(START + 2).isoformat()
+    assert lines[1]['timestamp'] == datetime.utcfromtimestamp(START + 4).isoformat()
+    assert {line['brain_state'] for line in lines} == {'alpha'}
+    assert set(lines[0]['band_powers']) == set(EEGClassifier().brain_states)
+    assert 'Reprocessed 4 windows' in result.output
@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+from app.eeg_processor.classifier import EEGClassifier
+
+
+@pytest.fixture(scope='module')
+def classifier():
+    return EEGClassifier()
+
+
+@pytest.mark.parametrize('frequency, state', [
+    (0.0, 'delta'), (3.99, 'delta'), (4.0, 'theta'), (8.0, 'alpha'),
+    (12.5, 'gamma'),  # between alpha and beta, falls back to gamma
+    (13.0, 'beta'), (30.0, 'gamma'), (150.0, 'gamma'), (-1.0, 'gamma')
+])
+def test_classify_frequency(classifier, frequency, state):
+    assert classifier.classify_frequency(frequency) == state
+
+
+def test_classify_frequency_matches_vectorized(classifier):
+    frequencies = np.round(np.arange(-2.0, 110.0, 0.25), 2)
+    expected = classifier.state_names[classifier.classify_frequencies(frequencies)]
+    assert [classifier.classify_frequency(f) for f in frequencies.tolist()] == expected.tolist()
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event
+from app import db
+from app.models import ActivityLog, Child, MoodLog, User
+from app.storage.result_cache import analytics_cache
+
+
+def make_parent(app, name, n_children):
+    """Create a parent with n children, each with two moods and an activity today"""
+    with app.app_context():
+        return _make_parent(name, n_children)
+
+
+def _make_parent(name, n_children):
+    parent = User(username=name, email=f'{name}@example.com')
+    parent.set_password('secret')
+    db.session.add(parent)
+    db.session.flush()
+    now = datetime.utcnow()
+    for i in range(n_children):
+        child = Child(name=f'{name} child {i}', parent_id=parent.id)
+        db.session.add(child)
+        db.session.flush()
+        for minutes in (5, 30):
+            db.session.add(MoodLog(child_id=child.id, mood='happy' if minutes == 5 else 'calm',
+                                   intensity=3, timestamp=now - timedelta(minutes=minutes)))
+        db.session.add(ActivityLog(child_id=child.id, activity_type='game', duration_seconds=60,
+                                   completion_rate=100.0, timestamp=now))
+    db.session.commit()
+    return parent.id
+
+
+def count_statements(app, client, path):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(path)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert response.status_code == 200
+    return len(statements)
+
+
+@pytest.mark.parametrize('n_children', [5, 25])
+def test_dashboard_statement_count_does_not_grow_with_children(app, login, n_children):
+    single = login(make_parent(app, 'single', 1))
+    many = login(make_parent(app, 'many', n_children))
+
+    analytics_cache.clear()
+    cold_single = count_statements(app, single, '/parent/dashboard')
+    cold_many = count_statements(app, many, '/parent/dashboard')
+    assert cold_many == cold_single
+
+    warm_single = count_statements(app, single, '/parent/dashboard')
+    warm_many = count_statements(app, many, '/parent/dashboard')
+    assert warm_many == warm_single
+    assert warm_many < cold_many
+
+
+def test_dashboard_shows_latest_mood(app, login):
+    client = login(make_parent(app, 'moods', 2))
+    body = client.get('/parent/dashboard').get_data(as_text=True)
+    assert 'happy' in body
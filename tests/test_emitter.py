@@ -0,0 +1,99 @@
+import pytest
+from app import socketio
+from app.realtime import emitter as emitter_module
+from app.realtime.emitter import BrainStateEmitter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(emitter_module.time, 'monotonic', lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    sent = []
+    monkeypatch.setattr(socketio, 'emit', lambda event, payload, room: sent.append(payload['brain_state']))
+    return sent
+
+
+@pytest.fixture
+def scheduled(monkeypatch):
+    # Deferred sends are collected and run by the test instead of a background task
+    scheduled = []
+    monkeypatch.setattr(socketio, 'start_background_task', lambda fn, *args: scheduled.append((fn, args)))
+    monkeypatch.setattr(socketio, 'sleep', lambda seconds: None)
+    return scheduled
+
+
+def make_emitter(window):
+    emitter = BrainStateEmitter()
+    emitter.heartbeat = 10.0
+    emitter.window = window
+    return emitter
+
+
+def test_unchanged_states_are_suppressed_until_the_heartbeat(clock, sent, scheduled):
+    emitter = make_emitter(window=0)
+    for seconds, state in [(0, 'alpha'), (1, 'alpha'), (2, 'alpha'), (3, 'beta'), (4, 'beta'), (13, 'beta')]:
+        clock[0] = 100.0 + seconds
+        emitter.publish(1, {'brain_state': state})
+
+    # beta repeats at 13 s, ten seconds after it was last sent, as a heartbeat
+    assert sent == ['alpha', 'beta', 'beta']
+    assert emitter.stats()['suppressed'] == 3
+    assert emitter.last_update(1) == {'brain_state': 'beta'}
+    assert scheduled == []
+
+
+def test_rooms_are_tracked_separately(clock, sent, scheduled):
+    emitter = make_emitter(window=0)
+    emitter.publish(1, {'brain_state': 'alpha'})
+    emitter.publish(2, {'brain_state': 'alpha'})
+    assert sent == ['alpha', 'alpha']
+
+
+def test_burst_within_the_window_sends_only_the_newest(clock, sent, scheduled):
+    emitter = make_emitter(window=0.25)
+    emitter.publish(1, {'brain_state': 'alpha'})
+    clock[0] += 0.1
+    emitter.publish(1, {'brain_state': 'beta'})
+    clock[0] += 0.05
+    emitter.publish(1, {'brain_state': 'gamma'})
+    assert sent == ['alpha']
+    assert len(scheduled) == 1
+
+    fn, args = scheduled.pop()
+    clock[0] += 0.1
+    fn(*args)
+    assert sent == ['alpha', 'gamma']
+    assert emitter.stats()['coalesced'] == 1
+
+
+def test_burst_settling_on_the_shown_state_is_dropped(clock, sent, scheduled):
+    emitter = make_emitter(window=0.25)
+    emitter.publish(1, {'brain_state': 'alpha'})
+    clock[0] += 0.1
+    emitter.publish(1, {'brain_state': 'beta'})
+    emitter.publish(1, {'brain_state': 'alpha'})
+    fn, args = scheduled.pop()
+    fn(*args)
+    assert sent == ['alpha']
+
+
+def test_manual_updates_are_never_suppressed(clock, sent, scheduled):
+    emitter = make_emitter(window=0.25)
+    emitter.publish(1, {'brain_state': 'alpha'})
+    clock[0] += 1
+    emitter.publish(1, {'brain_state': 'alpha', 'source': 'manual'})
+    assert sent == ['alpha', 'alpha']
+
+
+def test_listeners_see_sent_updates_only(clock, sent, scheduled):
+    emitter = make_emitter(window=0)
+    seen = []
+    emitter.add_listener(lambda room, payload: seen.append((room, payload['brain_state'])))
+    emitter.publish(5, {'brain_state': 'theta'})
+    emitter.publish(5, {'brain_state': 'theta'})
+    assert seen == [('child_5', 'theta')]
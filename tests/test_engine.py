@@ -0,0 +1,38 @@
+import sqlite3
+from sqlalchemy import text
+from config import Config
+from app import create_app, db
+from app.models import User
+from app.storage.engine import engine_profile
+
+
+def journal_mode(path):
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute('PRAGMA journal_mode').fetchone()[0]
+    finally:
+        connection.close()
+
+
+def test_writer_switches_file_to_wal_and_reads_do_not(tmp_path):
+    path = tmp_path / 'app.db'
+
+    class FileConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+
+    app = create_app(FileConfig)
+    with app.app_context():
+        assert engine_profile.writer is not None
+        assert db.session.execute(text('PRAGMA busy_timeout')).scalar() == Config.SQLITE_PRAGMAS['busy_timeout']
+        User.query.count()
+        db.session.remove()
+    assert journal_mode(path) == 'delete'
+
+    with app.app_context():
+        user = User(username='wal', email='wal@example.com')
+        user.set_password('secret')
+        db.session.add(user)
+        db.session.commit()
+    assert journal_mode(path) == 'wal'
+    engine_profile.writer.dispose()
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import select
+from app import db
+from app.models import Child, User
+from app.storage.episodes import append_episodes, episode_durations, episodes
+
+T0 = datetime(2024, 3, 1, 12, 0, 0)
+MAX_GAP = timedelta(seconds=60)
+INTERVAL = timedelta(seconds=1)
+
+
+@pytest.fixture
+def child_id(app):
+    with app.app_context():
+        parent = User(username='episodes', email='episodes@example.com')
+        parent.set_password('secret')
+        db.session.add(parent)
+        db.session.flush()
+        child = Child(name='Episode child', parent_id=parent.id)
+        db.session.add(child)
+        db.session.commit()
+        return child.id
+
+
+def reading(child_id, seconds, state, frequency=None, source='eeg'):
+    return {'child_id': child_id, 'state': state, 'frequency': frequency, 'source': source,
+            'timestamp': T0 + timedelta(seconds=seconds)}
+
+
+def append(app, rows):
+    with app.app_context():
+        with db.engine.begin() as connection:
+            credits = append_episodes(connection, rows, MAX_GAP, INTERVAL)
+        stored = db.session.execute(
+            select(episodes.c.state, episodes.c.source, episodes.c.start_time, episodes.c.end_time,
+                   episodes.c.sample_count, episodes.c.mean_frequency).order_by(episodes.c.start_time)
+        ).all()
+    return [seconds for _, seconds in credits], [tuple(row) for row in stored]
+
+
+def test_same_state_extends_the_episode(app, child_id):
+    credits, stored = append(app, [reading(child_id, s, 'alpha', f) for s, f in [(0, 10.0), (1, 11.0), (3, None)]])
+    assert stored == [('alpha', 'eeg', T0, T0 + timedelta(seconds=3), 3, 10.5)]
+    # The first reading covers one interval, later ones the time they add to the episode
+    assert credits == [1.0, 1.0, 2.0]
+
+
+def test_state_or_source_change_closes_the_episode(app, child_id):
+    credits, stored = append(app, [
+        reading(child_id, 0, 'alpha', 10.0), reading(child_id, 1, 'alpha', 10.0),
+        reading(child_id, 2, 'beta', 20.0), reading(child_id, 3, 'beta', source='manual')
+    ])
+    assert [(state, source, sample_count) for state, source, _, _, sample_count, _ in stored] == [
+        ('alpha', 'eeg', 2), ('beta', 'eeg', 1), ('beta', 'manual', 1)
+    ]
+    assert credits == [1.0, 1.0, 1.0, 1.0]
+
+
+def test_gap_splits_the_episode(app, child_id):
+    _, stored = append(app, [reading(child_id, 0, 'alpha'), reading(child_id, 60, 'alpha'),
+                             reading(child_id, 121, 'alpha')])
+    # 60 s is within the gap, 61 s is not
+    assert [(start, end, count) for _, _, start, end, count, _ in stored] == [
+        (T0, T0 + timedelta(seconds=60), 2),
+        (T0 + timedelta(seconds=121), T0 + timedelta(seconds=121), 1)
+    ]
+
+
+def test_later_batches_continue_the_open_episode(app, child_id):
+    append(app, [reading(child_id, 0, 'alpha', 8.0)])
+    credits, stored = append(app, [reading(child_id, 5, 'alpha', 12.0), reading(child_id, 6, 'theta')])
+    assert stored[0] == ('alpha', 'eeg', T0, T0 + timedelta(seconds=5), 2, 10.0)
+    assert stored[1][0] == 'theta'
+    assert credits == [5.0, 1.0]
+
+
+def test_episode_durations_clip_to_the_window(app, child_id):
+    append(app, [reading(child_id, s, 'alpha') for s in range(0, 10)] +
+           [reading(child_id, s, 'beta') for s in range(10, 20)])
+    with app.app_context():
+        durations = episode_durations(child_id, T0 + timedelta(seconds=5), T0 + timedelta(seconds=15), 1)
+    assert durations == {'alpha': 5.0, 'beta': 5.0}
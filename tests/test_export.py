@@ -0,0 +1,94 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.models import ActivityLog, BrainState, Child, MoodLog, User
+
+T0 = datetime(2024, 5, 1, 9, 0, 0)
+
+
+@pytest.fixture
+def family(app):
+    with app.app_context():
+        parent = User(username='export', email='export@example.com')
+        parent.set_password('secret')
+        other = User(username='stranger', email='stranger@example.com')
+        other.set_password('secret')
+        db.session.add_all([parent, other])
+        db.session.flush()
+        child = Child(name='Export child', parent_id=parent.id)
+        db.session.add(child)
+        db.session.flush()
+        for minutes in range(5):
+            db.session.add(MoodLog(child_id=child.id, mood='calm', intensity=minutes,
+                                   timestamp=T0 + timedelta(minutes=minutes)))
+            db.session.add(BrainState(child_id=child.id, state='alpha', frequency=10.0 + minutes,
+                                      source='eeg', timestamp=T0 + timedelta(minutes=minutes)))
+        db.session.add(ActivityLog(child_id=child.id, activity_type='game', duration_seconds=60,
+                                   completion_rate=90.0, timestamp=T0))
+        db.session.commit()
+        return parent.id, other.id, child.id
+
+
+def export(login, family, **params):
+    parent_id, _, child_id = family
+    return login(parent_id).get(f'/parent/api/child/{child_id}/export', query_string=params)
+
+
+def test_ndjson_exports_every_table_in_time_order(login, family):
+    response = export(login, family)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    by_table = {}
+    for row in rows:
+        by_table.setdefault(row['table'], []).append(row)
+    assert {t: len(r) for t, r in by_table.items()} == {'brain_states': 5, 'mood_logs': 5, 'activity_logs': 1}
+    assert [row['intensity'] for row in by_table['mood_logs']] == [0, 1, 2, 3, 4]
+    assert by_table['brain_states'][0]['timestamp'] == T0.isoformat()
+
+
+def test_tables_filter_and_time_range(login, family):
+    response = export(login, family, tables='mood_logs', **{
+        'from': (T0 + timedelta(minutes=1)).isoformat(), 'to': (T0 + timedelta(minutes=3)).isoformat()
+    })
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert {row['table'] for row in rows} == {'mood_logs'}
+    assert [row['intensity'] for row in rows] == [1, 2]
+
+
+def test_csv_export_has_a_header_and_one_row_per_record(login, family):
+    response = export(login, family, format='csv', tables='brain_states')
+    assert response.mimetype == 'text/csv'
+    assert 'child_' in response.headers['Content-Disposition']
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(rows) == 5
+    assert [float(row['frequency']) for row in rows] == [10.0, 11.0, 12.0, 13.0, 14.0]
+
+
+def test_gzip_stream_decompresses_to_the_plain_export(login, family):
+    plain = export(login, family).get_data()
+    compressed = export(login, family, gzip='1')
+    assert compressed.mimetype == 'application/gzip'
+    assert compressed.headers['Content-Disposition'].endswith('.ndjson.gz')
+    assert gzip.decompress(compressed.get_data()) == plain
+
+
+@pytest.mark.parametrize('params', [
+    {'format': 'xml'},
+    {'tables': 'brain_states,passwords'},
+    {'format': 'csv'},  # csv takes exactly one table
+    {'from': 'yesterday'}
+])
+def test_bad_parameters_answer_400(login, family, params):
+    response = export(login, family, **params)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_other_parents_child_is_refused(login, family):
+    _, other_id, child_id = family
+    assert login(other_id).get(f'/parent/api/child/{child_id}/export').status_code == 403
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from scipy import signal
+from config import Config
+from app.eeg_processor.classifier import EEGClassifier
+from app.eeg_processor.fast_path import FastSpectrumPath
+from app.eeg_processor.synthetic import SyntheticEEG, state_mixture
+
+# Band powers are percentages; float32 filtering and FFT may move them this far
+BAND_POWER_TOLERANCE = 0.05
+
+
+@pytest.fixture(scope='module')
+def classifier():
+    classifier = EEGClassifier()
+    classifier.fast_path = None  # reference float64 path, whatever EEG_FAST_PATH says
+    return classifier
+
+
+def synthetic_frames(sampling_rate, length):
+    for seed, state in enumerate(Config.BRAIN_STATES):
+        generator = SyntheticEEG(state_mixture(state), sampling_rate, seed=seed, artifact_rate=0.5)
+        for _ in range(3):
+            yield generator.generate(length)
+
+
+@pytest.mark.parametrize('sampling_rate', [128, 256, 500])
+@pytest.mark.parametrize('length', [256, 512, 1000, 2048])
+def test_fast_path_matches_float64_path(classifier, sampling_rate, length):
+    fast = FastSpectrumPath(classifier)
+    for frame in synthetic_frames(sampling_rate, length):
+        expected = classifier.process_eeg_signal(frame, sampling_rate)
+        result = fast.process(frame, sampling_rate)
+
+        assert result['dominant_frequency'] == expected['dominant_frequency']
+        assert result['brain_state'] == expected['brain_state']
+        assert result['band_powers'].keys() == expected['band_powers'].keys()
+        for state, power in expected['band_powers'].items():
+            assert result['band_powers'][state] == pytest.approx(power, abs=BAND_POWER_TOLERANCE)
+
+
+def test_fast_path_reuses_workspace_across_frames(classifier):
+    fast = FastSpectrumPath(classifier)
+    frames = list(synthetic_frames(256, 512))
+    first = [fast.process(frame, 256) for frame in frames]
+    again = [fast.process(frame, 256) for frame in frames]
+    assert first == again
+
+
+# Relative to the frame's peak; float32 scipy sosfiltfilt stays within 3e-4 of float64 too
+FILTER_TOLERANCE = 1e-3
+
+
+@pytest.mark.parametrize('sampling_rate', [128, 256, 500])
+@pytest.mark.parametrize('length', [64, 256, 1000])
+def test_filtfilt_matches_sosfiltfilt(classifier, sampling_rate, length):
+    fast = FastSpectrumPath(classifier)
+    ws = fast._workspace(length, sampling_rate)
+    sos = classifier.filter_bank.get_sos(sampling_rate, classifier.filter_band, classifier.filter_order)
+    for frame in synthetic_frames(sampling_rate, length):
+        np.copyto(ws.samples, frame, casting='unsafe')
+        expected = signal.sosfiltfilt(sos, np.asarray(frame, dtype=float))
+        result = fast._filtfilt(ws)
+        assert result.dtype == np.float32
+        np.testing.assert_allclose(result, expected, rtol=0, atol=FILTER_TOLERANCE * np.abs(expected).max())
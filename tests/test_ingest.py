@@ -0,0 +1,65 @@
+import io
+import numpy as np
+import pytest
+from app import db
+from app.eeg_processor.ingest import decode_float32, decode_npy
+from app.models import Child, User
+
+
+def npy_bytes(array, version=None):
+    buffer = io.BytesIO()
+    np.lib.format.write_array(buffer, array, version=version)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize('version', [(1, 0), (2, 0), (3, 0)])
+@pytest.mark.parametrize('array', [
+    np.arange(16, dtype='<f4'),
+    np.arange(24, dtype='<f8').reshape(3, 8),
+    np.asfortranarray(np.arange(24, dtype='<f4').reshape(4, 6))
+])
+def test_decode_npy_versions(version, array):
+    decoded = decode_npy(npy_bytes(array, version))
+    np.testing.assert_array_equal(decoded, array)
+    assert decoded.dtype == array.dtype
+
+
+def test_decode_npy_rejects_unknown_version():
+    body = bytearray(npy_bytes(np.zeros(4, dtype='<f4'), (1, 0)))
+    body[6] = 4  # major version byte after the magic string
+    with pytest.raises(ValueError, match='version 4.0'):
+        decode_npy(bytes(body))
+
+
+@pytest.mark.parametrize('array, message', [
+    (np.zeros(4, dtype='<i4'), 'dtype'),
+    (np.zeros((2, 2, 2), dtype='<f4'), 'shape')
+])
+def test_decode_npy_rejects_unsupported_arrays(array, message):
+    with pytest.raises(ValueError, match=message):
+        decode_npy(npy_bytes(array))
+
+
+def test_decode_float32():
+    assert decode_float32(np.arange(4, dtype='<f4').tobytes()).tolist() == [0.0, 1.0, 2.0, 3.0]
+    with pytest.raises(ValueError):
+        decode_float32(b'\x00' * 5)
+
+
+def test_eeg_input_answers_400_for_unknown_npy_version(app, login):
+    with app.app_context():
+        parent = User(username='device', email='device@example.com')
+        parent.set_password('secret')
+        db.session.add(parent)
+        db.session.flush()
+        child = Child(name='Device child', parent_id=parent.id)
+        db.session.add(child)
+        db.session.commit()
+        parent_id, child_id = parent.id, child.id
+
+    body = bytearray(npy_bytes(np.zeros(256, dtype='<f4'), (3, 0)))
+    body[6] = 9
+    response = login(parent_id).post('/child/api/eeg-input', data=bytes(body), content_type='application/x-npy',
+                                     headers={'X-Child-Id': str(child_id), 'X-Sampling-Rate': '256'})
+    assert response.status_code == 400
+    assert 'version 9.0' in response.get_json()['error']
@@ -0,0 +1,51 @@
+from sqlalchemy import inspect
+from config import Config
+from app import create_app, db
+from app.storage.migrations import pending_migrations
+
+
+class AutoUpgradeConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SCHEMA_AUTO_UPGRADE = True
+
+
+def test_create_app_leaves_schema_versions_alone(app):
+    with app.app_context():
+        assert 'schema_versions' not in inspect(db.engine).get_table_names()
+
+
+def test_schema_upgrade_command(app):
+    result = app.test_cli_runner().invoke(args=['schema', 'upgrade'])
+    assert 'Applied 1:' in result.output
+    with app.app_context():
+        assert pending_migrations(db.engine) == []
+    assert 'up to date' in app.test_cli_runner().invoke(args=['schema', 'upgrade']).output
+
+
+def test_auto_upgrade_applies_every_migration():
+    app = create_app(AutoUpgradeConfig)
+    with app.app_context():
+        assert pending_migrations(db.engine) == []
+        db.drop_all()
+
+
+def test_existing_database_is_left_to_schema_upgrade(tmp_path):
+    class FileConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'app.db'}"
+
+    app = create_app(FileConfig)
+    with app.app_context():
+        db.metadata.tables['daily_rollups'].drop(db.engine)
+
+    # An existing database loses nothing and gains nothing on create_app
+    app = create_app(FileConfig)
+    with app.app_context():
+        assert 'daily_rollups' not in inspect(db.engine).get_table_names()
+
+    result = app.test_cli_runner().invoke(args=['schema', 'upgrade'])
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        assert 'daily_rollups' in inspect(db.engine).get_table_names()
+        assert pending_migrations(db.engine) == []
@@ -0,0 +1,57 @@
+import pytest
+from sqlalchemy import select
+from app import db
+from app.models import Child, Quiz, User
+from app.storage import quiz_stats, rollups
+from app.storage.engine import engine_profile
+from app.storage.migrations import build_quiz_stats
+
+
+@pytest.fixture
+def family(app):
+    with app.app_context():
+        parent = User(username='quizzer', email='quizzer@example.com')
+        parent.set_password('secret')
+        db.session.add(parent)
+        db.session.flush()
+        children = [Child(name=f'Quiz child {i}', parent_id=parent.id) for i in range(2)]
+        quizzes = [Quiz(title='Colors'), Quiz(title='Animals')]
+        db.session.add_all(children + quizzes)
+        db.session.commit()
+        return parent.id, [c.id for c in children], [q.id for q in quizzes]
+
+
+def snapshot(app):
+    table = quiz_stats.quiz_stats
+    with app.app_context():
+        rows = db.session.execute(select(table).order_by(table.c.child_id, table.c.quiz_id)).mappings()
+        return [{k: round(v, 6) if isinstance(v, float) else v for k, v in row.items() if k != 'id'}
+                for row in rows]
+
+
+@pytest.mark.parametrize('fallback', [False, True], ids=['on-conflict', 'update-or-insert'])
+def test_incremental_stats_match_rebuild(app, login, family, monkeypatch, fallback):
+    if fallback:
+        monkeypatch.setattr(quiz_stats, 'upsert', rollups._update_or_insert)
+    parent_id, child_ids, quiz_ids = family
+    client = login(parent_id)
+    attempts = [(0, 0, 60.0), (0, 0, 90.0), (0, 0, 75.0), (0, 1, 40.0), (1, 0, 100.0), (1, 1, 0.0), (1, 1, 55.5)]
+    for child, quiz, percentage in attempts:
+        response = client.post('/child/api/quiz-attempt', json={
+            'child_id': child_ids[child], 'quiz_id': quiz_ids[quiz], 'score': 0, 'total_questions': 5,
+            'percentage': percentage, 'time_taken_seconds': 30, 'answers': '[]'
+        })
+        assert response.status_code == 200
+
+    incremental = snapshot(app)
+    first = incremental[0]
+    assert (first['attempts'], first['avg_score'], first['best_score']) == (3, 75.0, 90.0)
+
+    with app.app_context():
+        with engine_profile.write_engine().begin() as connection:
+            build_quiz_stats(connection)
+    assert snapshot(app) == incremental
+
+    with app.app_context():
+        stats = quiz_stats.for_child(db.session, child_ids[1])
+    assert [(s['title'], s['attempts']) for s in stats] == [('Animals', 2), ('Colors', 1)]
@@ -0,0 +1,94 @@
+import pickle
+import queue
+import threading
+import pytest
+import socketio as python_socketio
+from app import db
+from app.models import Child, User
+from app.realtime.broker import LocalBroker, LocalPubSubManager
+from app.realtime.routing import WorkerRouter, worker_router
+
+
+def test_broker_delivers_each_message_once_per_subscriber():
+    broker = LocalBroker()
+    first, second, other = queue.Queue(), queue.Queue(), queue.Queue()
+    broker.subscribe('updates', first)
+    broker.subscribe('updates', second)
+    broker.subscribe('elsewhere', other)
+
+    broker.publish('updates', {'state': 'alpha'})
+    broker.unsubscribe('updates', second)
+    broker.publish('updates', {'state': 'beta'})
+
+    assert [pickle.loads(first.get_nowait()) for _ in range(2)] == [{'state': 'alpha'}, {'state': 'beta'}]
+    assert pickle.loads(second.get_nowait()) == {'state': 'alpha'}
+    assert second.empty() and other.empty()
+
+
+def test_broker_rejects_unpicklable_payloads():
+    with pytest.raises((pickle.PicklingError, AttributeError)):
+        LocalBroker().publish('updates', {'callback': lambda: None})
+
+
+def make_server(broker):
+    server = python_socketio.Server(async_mode='threading',
+                                    client_manager=LocalPubSubManager(channel='test', broker=broker))
+    server.manager.initialize()
+    return server
+
+
+def test_room_emit_fans_out_to_other_servers():
+    broker = LocalBroker()
+    sender, receiver = make_server(broker), make_server(broker)
+    sid = receiver.manager.connect('eio-1', '/')
+    receiver.manager.enter_room(sid, '/', 'child_7')
+
+    delivered = []
+    received = threading.Event()
+
+    def send(eio_sid, packet):
+        delivered.append((eio_sid, packet.data))
+        received.set()
+    receiver._send_eio_packet = send
+
+    sender.emit('brain_state_update', {'brain_state': 'theta'}, room='child_7')
+    assert received.wait(2)
+    assert delivered[0][0] == 'eio-1'
+    assert 'brain_state_update' in delivered[0][1] and 'theta' in delivered[0][1]
+
+
+def test_owner_is_stable_and_moves_few_children():
+    routers = {}
+    for workers in (3, 4):
+        router = WorkerRouter()
+        router.workers = workers
+        routers[workers] = router
+    owners = [routers[3].owner(child_id) for child_id in range(1000)]
+
+    assert owners == [routers[3].owner(child_id) for child_id in range(1000)]
+    assert set(owners) == {0, 1, 2}
+    # Adding a worker only moves children onto the new worker
+    moved = [child_id for child_id in range(1000) if routers[4].owner(child_id) != owners[child_id]]
+    assert all(routers[4].owner(child_id) == 3 for child_id in moved)
+    assert 150 < len(moved) < 350
+
+
+def test_samples_for_another_workers_child_are_redirected(app, login, monkeypatch):
+    monkeypatch.setattr(worker_router, 'workers', 2)
+    monkeypatch.setattr(worker_router, 'index', 0)
+    monkeypatch.setattr(worker_router, 'base_port', 6000)
+    with app.app_context():
+        parent = User(username='router', email='router@example.com')
+        parent.set_password('secret')
+        db.session.add(parent)
+        db.session.flush()
+        children = [Child(name=f'child {i}', parent_id=parent.id) for i in range(8)]
+        db.session.add_all(children)
+        db.session.commit()
+        parent_id = parent.id
+        foreign = next(child.id for child in children if worker_router.owner(child.id) == 1)
+
+    response = login(parent_id).post('/child/api/eeg-input', json={'child_id': foreign, 'samples': [0.0] * 64})
+    assert response.status_code == 421
+    assert response.get_json()['worker'] == 1
+    assert response.get_json()['port'] == 6001
@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.models import Child, Quiz, User
+from app.storage import result_cache
+from app.storage.result_cache import ResultCache, analytics_cache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ResultCache()
+    cache.ttl = 60
+    cache.set(1, 'analytics', 'week', value={'moods': 1})
+
+    clock[0] += 59
+    assert cache.get(1, 'analytics', 'week') == {'moods': 1}
+    clock[0] += 1
+    assert cache.get(1, 'analytics', 'week') is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache()
+    cache.max_entries = 2
+    cache.set(1, 'analytics', value='a')
+    cache.set(2, 'analytics', value='b')
+    cache.get(1, 'analytics')
+    cache.set(3, 'analytics', value='c')
+    assert cache.get(2, 'analytics') is None
+    assert cache.get(1, 'analytics') == 'a' and cache.get(3, 'analytics') == 'c'
+
+
+def test_invalidate_drops_only_the_childs_named_views():
+    cache = ResultCache()
+    cache.set(1, 'analytics', value='a')
+    cache.set(1, 'dashboard', value='d')
+    cache.set(2, 'analytics', value='other child')
+    cache.invalidate(1, 'analytics')
+    assert cache.get(1, 'analytics') is None
+    assert cache.get(1, 'dashboard') == 'd'
+    assert cache.get(2, 'analytics') == 'other child'
+
+
+@pytest.fixture
+def family(app):
+    with app.app_context():
+        parent = User(username='cache', email='cache@example.com')
+        parent.set_password('secret')
+        db.session.add(parent)
+        db.session.flush()
+        child = Child(name='Cache child', parent_id=parent.id)
+        quiz = Quiz(title='Colors')
+        db.session.add_all([child, quiz])
+        db.session.commit()
+        return parent.id, child.id, quiz.id
+
+
+def cached_views(child_id):
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    since = datetime.utcnow().date() - timedelta(days=6)
+    return (analytics_cache.get(child_id, 'dashboard', today),
+            analytics_cache.get(child_id, 'analytics', since))
+
+
+def warm(client, child_id):
+    analytics_cache.clear()
+    assert client.get('/parent/dashboard').status_code == 200
+    assert client.get(f'/parent/child/{child_id}/analytics').status_code == 200
+    dashboard, analytics = cached_views(child_id)
+    assert dashboard is not None and analytics is not None
+
+
+def test_mood_write_evicts_dashboard_and_analytics(login, family):
+    parent_id, child_id, _ = family
+    client = login(parent_id)
+    warm(client, child_id)
+
+    client.post('/child/api/mood-log', json={'child_id': child_id, 'mood': 'happy', 'intensity': 4})
+    assert cached_views(child_id) == (None, None)
+
+    client.get('/parent/dashboard')
+    client.get(f'/parent/child/{child_id}/analytics')
+    dashboard, analytics = cached_views(child_id)
+    assert dashboard['latest_mood'] == 'happy'
+    assert analytics['mood_counts'] == {'happy': 1}
+
+
+def test_activity_write_evicts_dashboard_and_analytics(login, family):
+    parent_id, child_id, _ = family
+    client = login(parent_id)
+    warm(client, child_id)
+
+    client.post('/child/api/activity-log', json={'child_id': child_id, 'activity_type': 'game',
+                                                 'duration_seconds': 30, 'completion_rate': 80})
+    assert cached_views(child_id) == (None, None)
+
+    client.get('/parent/dashboard')
+    client.get(f'/parent/child/{child_id}/analytics')
+    dashboard, analytics = cached_views(child_id)
+    assert dashboard['activity_count'] == 1
+    assert [stat['count'] for stat in analytics['activity_stats']] == [1]
+
+
+def test_quiz_write_evicts_analytics(login, family):
+    parent_id, child_id, quiz_id = family
+    client = login(parent_id)
+    warm(client, child_id)
+
+    client.post('/child/api/quiz-attempt', json={
+        'child_id': child_id, 'quiz_id': quiz_id, 'score': 4, 'total_questions': 5,
+        'percentage': 80.0, 'time_taken_seconds': 40, 'answers': '[]'
+    })
+    dashboard, analytics = cached_views(child_id)
+    assert analytics is None
+    assert dashboard is not None  # the dashboard shows no quiz data
+
+    client.get(f'/parent/child/{child_id}/analytics')
+    assert [stat['attempts'] for stat in cached_views(child_id)[1]['quiz_stats']] == [1]
@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+from app import db
+from app.models import BrainState, BrainStateSummary, Child, User
+from app.storage.retention import brain_state_compactor
+
+
+def test_series_coarsens_to_hour_after_manual_compaction(app, login):
+    now = datetime.utcnow().replace(microsecond=0)
+    old = now - timedelta(days=100)
+    with app.app_context():
+        parent = User(username='retention', email='retention@example.com')
+        parent.set_password('secret')
+        db.session.add(parent)
+        db.session.flush()
+        child = Child(name='Retention child', parent_id=parent.id)
+        db.session.add(child)
+        db.session.flush()
+        db.session.add_all(
+            BrainState(child_id=child.id, state='alpha', frequency=10.0, source='eeg',
+                       timestamp=old + timedelta(minutes=minute))
+            for minute in range(0, 120, 7)
+        )
+        db.session.commit()
+        parent_id, child_id = parent.id, child.id
+
+        # As `flask retention compact` does, with the background job disabled
+        assert not brain_state_compactor.enabled
+        brain_state_compactor.run(now)
+        assert BrainState.query.count() == 0
+        assert {s.resolution for s in BrainStateSummary.query} == {'hour'}
+
+    client = login(parent_id)
+    start, end = old - timedelta(hours=1), old + timedelta(hours=3)
+    body = client.get(f'/parent/api/child/{child_id}/series', query_string={
+        'from': start.isoformat(), 'to': end.isoformat(), 'bucket': 'minute'
+    }).get_json()
+    assert body['bucket'] == 'hour'
+    assert sum(point['count'] for point in body['brain_states']) == len(range(0, 120, 7))
+
+    recent = client.get(f'/parent/api/child/{child_id}/series', query_string={
+        'from': (now - timedelta(hours=2)).isoformat(), 'to': now.isoformat(), 'bucket': 'minute'
+    }).get_json()
+    assert recent['bucket'] == 'minute'
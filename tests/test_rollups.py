@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import select
+from app import db
+from app.models import Child, User
+from app.storage import rollups
+from app.storage.engine import engine_profile
+from app.storage.write_behind import brain_state_writer
+
+
+@pytest.fixture
+def family(app):
+    with app.app_context():
+        parent = User(username='rollups', email='rollups@example.com')
+        parent.set_password('secret')
+        db.session.add(parent)
+        db.session.flush()
+        child = Child(name='Rollup child', parent_id=parent.id)
+        db.session.add(child)
+        db.session.commit()
+        return parent.id, child.id
+
+
+def snapshot(app):
+    table = rollups.rollups
+    with app.app_context():
+        rows = db.session.execute(select(table).order_by(*(table.c[k] for k in rollups.KEY))).mappings()
+        return [{k: round(v, 6) if isinstance(v, float) else v for k, v in row.items() if k != 'id'}
+                for row in rows]
+
+
+@pytest.mark.parametrize('fallback', [False, True], ids=['on-conflict', 'update-or-insert'])
+def test_incremental_rollups_match_backfill(app, login, family, monkeypatch, fallback):
+    if fallback:
+        monkeypatch.setattr(rollups, 'upsert', rollups._update_or_insert)
+    parent_id, child_id = family
+    client = login(parent_id)
+
+    # Readings either side of midnight, some without a frequency
+    midnight = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    with app.app_context():
+        for i, (state, frequency) in enumerate([('alpha', 10.0), ('alpha', 11.5), ('beta', None),
+                                                ('beta', 20.0), ('alpha', 9.0), ('theta', None)]):
+            brain_state_writer.add(child_id, state, frequency, timestamp=midnight + timedelta(seconds=10 * i - 25))
+    for mood, intensity in [('happy', 4), ('calm', 2), ('happy', 5)]:
+        client.post('/child/api/mood-log', json={'child_id': child_id, 'mood': mood, 'intensity': intensity})
+    for activity, seconds, rate in [('game', 30, 80), ('game', 45, 100), ('music', 60, 50)]:
+        client.post('/child/api/activity-log', json={'child_id': child_id, 'activity_type': activity,
+                                                     'duration_seconds': seconds, 'completion_rate': rate})
+
+    incremental = snapshot(app)
+    assert {row['metric'] for row in incremental} == {rollups.BRAIN_STATE, rollups.MOOD, rollups.ACTIVITY}
+    assert len({row['day'] for row in incremental}) == 2
+
+    with app.app_context():
+        with engine_profile.write_engine().begin() as connection:
+            rollups.backfill(connection, app.config['EEG_UPDATE_INTERVAL'])
+    assert snapshot(app) == incremental
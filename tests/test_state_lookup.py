@@ -0,0 +1,33 @@
+import pytest
+from app import db
+from app.models import Content, Quiz, QuizQuestion, User
+
+
+@pytest.fixture
+def user_id(app):
+    with app.app_context():
+        user = User(username='lookup', email='lookup@example.com')
+        user.set_password('secret')
+        db.session.add(user)
+        db.session.add(Content(title='Breathing', content_type='exercise', suitable_states='Alpha, THETA'))
+        quiz = Quiz(title='Colors', suitable_states='alpha,Beta')
+        db.session.add(quiz)
+        db.session.flush()
+        db.session.add(QuizQuestion(quiz_id=quiz.id, question_text='Sky?', options='["Blue"]',
+                                    correct_answer='Blue', order_number=1))
+        db.session.add(Quiz(title='Any state'))
+        db.session.commit()
+        return user.id
+
+
+@pytest.mark.parametrize('state', ['theta', 'THETA', 'Alpha'])
+def test_content_lookup_ignores_case(login, user_id, state):
+    response = login(user_id).get(f'/child/api/content/{state}')
+    assert [c['title'] for c in response.get_json()] == ['Breathing']
+
+
+@pytest.mark.parametrize('state', ['beta', 'BETA', 'Alpha'])
+def test_quiz_lookup_ignores_case(login, user_id, state):
+    response = login(user_id).get(f'/child/api/quizzes/{state}')
+    quizzes = {q['title']: q['question_count'] for q in response.get_json()}
+    assert quizzes == {'Colors': 1, 'Any state': 0}
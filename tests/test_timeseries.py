@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from app.storage.timeseries import effective_bucket, lttb
+
+
+@pytest.fixture(scope='module')
+def walk():
+    rng = np.random.default_rng(0)
+    y = np.cumsum(rng.normal(size=1000))
+    return np.arange(1000, dtype=float), y
+
+
+@pytest.mark.parametrize('threshold', [3, 10, 100, 999])
+def test_lttb_keeps_endpoints_within_budget(walk, threshold):
+    x, y = walk
+    kept = lttb(x, y, threshold)
+    assert len(kept) == threshold
+    assert kept[0] == 0 and kept[-1] == len(x) - 1
+    assert np.all(np.diff(kept) > 0)
+
+
+@pytest.mark.parametrize('threshold', [1000, 5000])
+def test_lttb_keeps_everything_when_under_budget(walk, threshold):
+    x, y = walk
+    assert lttb(x, y, threshold).tolist() == list(range(len(x)))
+
+
+def test_lttb_keeps_an_isolated_spike():
+    x = np.arange(500, dtype=float)
+    y = np.zeros(500)
+    y[317] = 50.0
+    assert 317 in lttb(x, y, 20)
+
+
+def test_effective_bucket_coarsens_long_ranges():
+    start = datetime(2024, 1, 1)
+    assert effective_bucket('minute', start, start + timedelta(hours=5), 500) == 'minute'
+    assert effective_bucket('minute', start, start + timedelta(days=7), 500) == 'hour'
+    assert effective_bucket('minute', start, start + timedelta(days=365), 500) == 'day'
+    assert effective_bucket('minute', start, start + timedelta(hours=5), 500, finest='hour') == 'hour'
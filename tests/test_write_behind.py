@@ -0,0 +1,88 @@
+from datetime import datetime
+import pytest
+from app import db, socketio
+from app.models import BrainState, Child, User
+from app.realtime.emitter import brain_state_emitter
+from app.storage.write_behind import BrainStateWriter, brain_state_writer
+
+
+@pytest.fixture
+def child_id(app):
+    with app.app_context():
+        parent = User(username='writer', email='writer@example.com')
+        parent.set_password('secret')
+        db.session.add(parent)
+        db.session.flush()
+        child = Child(name='Writer child', parent_id=parent.id)
+        db.session.add(child)
+        db.session.commit()
+        return child.id
+
+
+@pytest.fixture
+def parent_id(app, child_id):
+    with app.app_context():
+        return db.session.get(Child, child_id).parent_id
+
+
+@pytest.fixture
+def writer(app, monkeypatch):
+    started = []
+    monkeypatch.setattr(socketio, 'start_background_task', lambda target, *a: started.append(target))
+    app.config.update(BRAIN_STATE_WRITE_BEHIND=True, BRAIN_STATE_FLUSH_SIZE=1000,
+                      BRAIN_STATE_FLUSH_RETRIES=3, BRAIN_STATE_BUFFER_MAX=5)
+    writer = BrainStateWriter()
+    writer.started = started
+    writer.init_app(app)
+    return writer
+
+
+def stored(app):
+    with app.app_context():
+        return BrainState.query.count()
+
+
+def test_bad_row_is_dropped_after_retries(app, writer, child_id):
+    writer.add(child_id, 'alpha', 10.0)
+    writer.add(child_id, None, 10.0)  # violates NOT NULL on state
+    writer.add(child_id, 'beta', 20.0)
+
+    assert writer.flush() == 0
+    assert writer.flush() == 0
+    assert writer.pending() == 3
+
+    assert writer.flush() == 2
+    assert writer.pending() == 0
+    assert writer.dropped == 1
+    assert stored(app) == 2
+
+
+def test_queue_is_capped(app, writer, child_id):
+    rows = [writer.add(child_id, 'alpha', 10.0, timestamp=datetime.utcnow()) for _ in range(8)]
+    assert [row is not None for row in rows] == [True] * 5 + [False] * 3
+    assert writer.pending() == 5
+    assert writer.dropped == 3
+    assert writer.flush() == 5
+
+
+def test_init_app_starts_one_flusher(app, writer):
+    writer.init_app(app)
+    writer.init_app(app)
+    assert len(writer.started) == 1
+
+
+def test_full_buffer_is_reported_not_emitted(app, login, child_id, parent_id, monkeypatch):
+    published = []
+    monkeypatch.setattr(brain_state_emitter, 'publish', lambda child_id, update: published.append(update))
+    monkeypatch.setattr(brain_state_writer, 'enabled', True)
+    monkeypatch.setattr(brain_state_writer, 'buffer_max', 0)
+    client = login(parent_id)
+
+    response = client.post('/child/api/manual-input', json={'child_id': child_id, 'state': 'beta'})
+    assert response.status_code == 503
+    response = client.post('/child/api/eeg-input', json={'child_id': child_id, 'frequency': 10.0})
+    assert response.status_code == 503
+
+    assert published == []
+    assert brain_state_writer.pending() == 0
+    assert stored(app) == 0